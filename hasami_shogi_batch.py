@@ -0,0 +1,267 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: A vectorized Hasami Shogi engine that advances many games at once using NumPy arrays.
+
+import numpy as np
+
+from hasami_shogi_game import HasamiShogiGame, _get_captures_to_win
+
+BOARD_SIZE = 9
+EMPTY, BLACK, RED = 0, 1, -1
+UNFINISHED, BLACK_WON, RED_WON = 0, 1, 2
+
+_PLAYER_NAMES = {BLACK: "BLACK", RED: "RED"}
+_GAME_STATE_NAMES = {UNFINISHED: "UNFINISHED", BLACK_WON: "BLACK_WON", RED_WON: "RED_WON"}
+_GAME_STATE_CODES = {name: code for code, name in _GAME_STATE_NAMES.items()}
+_DIRECTIONS = ((0, 1), (0, -1), (-1, 0), (1, 0))
+_LAST = BOARD_SIZE - 1
+_CORNERS = ((0, 0, 1, 1), (0, _LAST, 1, -1), (_LAST, 0, -1, 1), (_LAST, _LAST, -1, -1))
+
+
+class BatchHasamiShogiGame:
+    """
+    A batch of Hasami Shogi games played according to the same rules as HasamiShogiGame, held in NumPy arrays so that
+    one move in every game is applied at once.
+    The boards are a (games, 9, 9) int8 array of EMPTY, BLACK and RED, with row 0 being row "a" and column 0 being
+    column "1". Squares are given as indexes, row * 9 + col, as elsewhere in the engine.
+    Every game in a batch is played on the standard 9x9 board, to the same number of captures.
+    """
+
+    def __init__(self, num_games, captures_to_win=None):
+        """
+        Takes as parameters the number of games in the batch and, optionally, the captures needed to win, defaulting to
+        8.
+        Initializes every game to the starting position.
+        Raises a ValueError if the captures needed to win are not from 1 to 9.
+        """
+        self._captures_to_win = _get_captures_to_win(BOARD_SIZE, captures_to_win)
+        self._boards = np.zeros((num_games, BOARD_SIZE, BOARD_SIZE), dtype=np.int8)
+        self._boards[:, 0, :] = RED
+        self._boards[:, _LAST, :] = BLACK
+        self._active_players = np.full(num_games, BLACK, dtype=np.int8)
+        self._game_states = np.full(num_games, UNFINISHED, dtype=np.int8)
+        self._black_player_captures = np.zeros(num_games, dtype=np.int16)
+        self._red_player_captures = np.zeros(num_games, dtype=np.int16)
+
+    @classmethod
+    def from_games(cls, games):
+        """
+        Takes as a parameter a list of HasamiShogiGame objects.
+        Returns a batch holding a copy of each game's position.
+        Raises a ValueError if a game is not played on the standard 9x9 board, or the games are not all played to the
+        same number of captures.
+        """
+        if any(game.get_board_size() != BOARD_SIZE for game in games):
+            raise ValueError("batches only hold games on the standard %dx%d board" % (BOARD_SIZE, BOARD_SIZE))
+        captures_to_win = {game.get_captures_to_win() for game in games}
+        if len(captures_to_win) > 1:
+            raise ValueError("games in a batch must all be played to the same number of captures")
+        batch = cls(len(games), captures_to_win.pop() if captures_to_win else None)
+        batch._boards[:] = EMPTY
+        for game_index, game in enumerate(games):
+            batch._boards[game_index][batch._square_mask(game, "BLACK")] = BLACK
+            batch._boards[game_index][batch._square_mask(game, "RED")] = RED
+            batch._active_players[game_index] = BLACK if game.get_active_player() == "BLACK" else RED
+            batch._game_states[game_index] = _GAME_STATE_CODES[game.get_game_state()]
+            batch._black_player_captures[game_index] = game.get_num_captured_pieces("BLACK")
+            batch._red_player_captures[game_index] = game.get_num_captured_pieces("RED")
+        return batch
+
+    @staticmethod
+    def _square_mask(game, player):
+        """
+        Takes as parameters a HasamiShogiGame and "BLACK" or "RED".
+        Returns a (9, 9) boolean array of the squares the player occupies in the game.
+        """
+        squares = np.unpackbits(
+            np.frombuffer(game._boards[player].to_bytes(11, "little"), dtype=np.uint8), bitorder="little"
+        )
+        return squares[: BOARD_SIZE * BOARD_SIZE].reshape(BOARD_SIZE, BOARD_SIZE).astype(bool)
+
+    def __len__(self):
+        """
+        Takes no parameters.
+        Returns the number of games in the batch.
+        """
+        return len(self._boards)
+
+    def get_boards(self):
+        """
+        Takes no parameters.
+        Returns the (games, 9, 9) array of boards.
+        """
+        return self._boards
+
+    def get_active_players(self):
+        """
+        Takes no parameters.
+        Returns an array of each game's active player, BLACK or RED.
+        """
+        return self._active_players
+
+    def get_game_states(self):
+        """
+        Takes no parameters.
+        Returns an array of each game's state, UNFINISHED, BLACK_WON or RED_WON.
+        """
+        return self._game_states
+
+    def get_captures_to_win(self):
+        """
+        Takes no parameters.
+        Returns the number of captures needed to win every game in the batch.
+        """
+        return self._captures_to_win
+
+    def get_num_captured_pieces(self, player):
+        """
+        Takes as a parameter "BLACK" or "RED", corresponding to the black or red player, respectively.
+        Returns an array of the number of pieces that player has captured in each game.
+        """
+        if player == "BLACK":
+            return self._black_player_captures
+        else:
+            return self._red_player_captures
+
+    def to_game(self, game_index):
+        """
+        Takes as a parameter the index of a game in the batch.
+        Returns a HasamiShogiGame holding a copy of that game's position.
+        """
+        flat_board = self._boards[game_index].ravel()
+        black_board, red_board = (
+            int.from_bytes(np.packbits(flat_board == player_code, bitorder="little").tobytes(), "little")
+            for player_code in (BLACK, RED)
+        )
+        game = HasamiShogiGame(captures_to_win=self._captures_to_win)
+        game._set_position(
+            black_board,
+            red_board,
+            int(self._black_player_captures[game_index]),
+            int(self._red_player_captures[game_index]),
+            _PLAYER_NAMES[int(self._active_players[game_index])],
+            _GAME_STATE_NAMES[int(self._game_states[game_index])],
+        )
+        return game
+
+    def make_moves(self, squares_moved_from, squares_moved_to):
+        """
+        Takes as parameters arrays of the indexes of the squares each game's active player is moving from and to.
+        Applies each legal move in an unfinished game, capturing applicable pieces and setting the game's captures,
+        state and active player, exactly as HasamiShogiGame.make_move does. Other games are left unchanged.
+        Returns a boolean array of which games' moves were made.
+        Raises a ValueError if any index is not on the board.
+        """
+        squares_moved_from = np.asarray(squares_moved_from, dtype=np.intp)
+        squares_moved_to = np.asarray(squares_moved_to, dtype=np.intp)
+        num_squares = BOARD_SIZE * BOARD_SIZE
+        if np.any((squares_moved_from < 0) | (squares_moved_from >= num_squares)) or np.any(
+            (squares_moved_to < 0) | (squares_moved_to >= num_squares)
+        ):
+            raise ValueError("square index is not on the board")
+        rows_from, cols_from = np.divmod(squares_moved_from, BOARD_SIZE)
+        rows_to, cols_to = np.divmod(squares_moved_to, BOARD_SIZE)
+        legal_moves = self._legal_moves(rows_from, cols_from, rows_to, cols_to)
+
+        games = np.nonzero(legal_moves)[0]
+        rows_from, cols_from, rows_to, cols_to = rows_from[games], cols_from[games], rows_to[games], cols_to[games]
+        active_players = self._active_players[games]
+
+        self._boards[games, rows_from, cols_from] = EMPTY
+        self._boards[games, rows_to, cols_to] = active_players
+
+        captured_squares = self._corner_captures(games, rows_to, cols_to, active_players)
+        captured_squares |= self._non_corner_captures(games, rows_to, cols_to, active_players)
+        self._boards[games] = np.where(captured_squares, EMPTY, self._boards[games])
+        num_captured = captured_squares.sum(axis=(1, 2), dtype=np.int16)
+
+        black_games = active_players == BLACK
+        self._black_player_captures[games[black_games]] += num_captured[black_games]
+        self._red_player_captures[games[~black_games]] += num_captured[~black_games]
+
+        black_won = black_games & (self._black_player_captures[games] >= self._captures_to_win)
+        red_won = ~black_games & (self._red_player_captures[games] >= self._captures_to_win)
+        self._game_states[games[black_won]] = BLACK_WON
+        self._game_states[games[red_won]] = RED_WON
+        self._active_players[games] = -active_players
+
+        return legal_moves
+
+    def _legal_moves(self, rows_from, cols_from, rows_to, cols_to):
+        """
+        Takes as parameters arrays of each game's row and column moved from and row and column moved to.
+        Returns a boolean array of which games are unfinished and have a legal move for the active player.
+        """
+        games = np.arange(len(self._boards))
+        legal_moves = self._game_states == UNFINISHED
+        legal_moves &= self._boards[games, rows_from, cols_from] == self._active_players
+        legal_moves &= (rows_from != rows_to) | (cols_from != cols_to)
+        legal_moves &= (rows_from == rows_to) | (cols_from == cols_to)
+        legal_moves &= self._boards[games, rows_to, cols_to] == EMPTY
+
+        same_row = rows_from == rows_to
+        lines = np.where(
+            same_row[:, None],
+            self._boards[games, rows_from, :],
+            self._boards[games, :, cols_from],
+        )
+        line_from = np.where(same_row, cols_from, rows_from)
+        line_to = np.where(same_row, cols_to, rows_to)
+        positions = np.arange(BOARD_SIZE)
+        between = (positions > np.minimum(line_from, line_to)[:, None]) & (
+            positions < np.maximum(line_from, line_to)[:, None]
+        )
+        legal_moves &= ~np.any((lines != EMPTY) & between, axis=1)
+        return legal_moves
+
+    def _corner_captures(self, games, rows_to, cols_to, active_players):
+        """
+        Takes as parameters arrays of the moving games, their rows and columns moved to and their active players.
+        Returns a (moving games, 9, 9) boolean array of the corners captured by each move.
+        """
+        captured_squares = np.zeros((len(games), BOARD_SIZE, BOARD_SIZE), dtype=bool)
+        for corner_row, corner_col, row_step, col_step in _CORNERS:
+            corner_held_by_opponent = self._boards[games, corner_row, corner_col] == -active_players
+            beside_row, beside_col = corner_row, corner_col + col_step
+            below_row, below_col = corner_row + row_step, corner_col
+            moved_beside = (rows_to == beside_row) & (cols_to == beside_col)
+            moved_below = (rows_to == below_row) & (cols_to == below_col)
+            captured = corner_held_by_opponent & (
+                (moved_beside & (self._boards[games, below_row, below_col] == active_players))
+                | (moved_below & (self._boards[games, beside_row, beside_col] == active_players))
+            )
+            captured_squares[captured, corner_row, corner_col] = True
+        return captured_squares
+
+    def _non_corner_captures(self, games, rows_to, cols_to, active_players):
+        """
+        Takes as parameters arrays of the moving games, their rows and columns moved to and their active players.
+        Returns a (moving games, 9, 9) boolean array of the squares captured by each move along its row and column.
+        A run of the opponent's pieces is captured when the square past its end holds one of the active player's pieces.
+        """
+        captured_squares = np.zeros((len(games), BOARD_SIZE, BOARD_SIZE), dtype=bool)
+        game_indexes = np.arange(len(games))
+        for row_step, col_step in _DIRECTIONS:
+            scanning = np.ones(len(games), dtype=bool)
+            run_lengths = np.zeros(len(games), dtype=np.intp)
+            bracketed = np.zeros(len(games), dtype=bool)
+            for distance in range(1, BOARD_SIZE):
+                rows = rows_to + distance * row_step
+                cols = cols_to + distance * col_step
+                on_board = (rows >= 0) & (rows < BOARD_SIZE) & (cols >= 0) & (cols < BOARD_SIZE)
+                occupants = self._boards[games, np.clip(rows, 0, _LAST), np.clip(cols, 0, _LAST)]
+                scanning &= on_board
+                opponent = scanning & (occupants == -active_players)
+                bracketed |= scanning & (occupants == active_players)
+                run_lengths += opponent
+                scanning &= opponent
+
+            captured = bracketed & (run_lengths > 0)
+            for distance in range(1, BOARD_SIZE - 1):
+                in_run = captured & (run_lengths >= distance)
+                captured_squares[
+                    game_indexes[in_run],
+                    rows_to[in_run] + distance * row_step,
+                    cols_to[in_run] + distance * col_step,
+                ] = True
+        return captured_squares
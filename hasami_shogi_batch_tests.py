@@ -0,0 +1,117 @@
+import random
+import unittest
+import numpy as np
+from hasami_shogi_batch import BLACK, BLACK_WON, RED, UNFINISHED, BatchHasamiShogiGame
+from hasami_shogi_game import HasamiShogiGame
+
+GAMES = [
+    [("i1", "b1"), ("a2", "b2"), ("i3", "b3")],
+    [("i1", "c1"), ("a2", "b2"), ("c1", "b1"), ("a3", "b3"), ("i4", "b4")],
+    [("i1", "b1"), ("a2", "b2"), ("i2", "h2"), ("b2", "b3"), ("h2", "a2")],
+    [("i8", "h8"), ("a9", "h9"), ("h8", "h2"), ("a8", "i8")],
+    [
+        ("i1", "b1"), ("a2", "b2"), ("i2", "h2"), ("a3", "b3"), ("i3", "h3"), ("a4", "b4"), ("i4", "h4"),
+        ("a5", "b5"), ("i5", "h5"), ("a6", "b6"), ("i6", "h6"), ("a7", "b7"), ("i7", "h7"), ("a8", "b8"),
+        ("i9", "b9"), ("a1", "a2"), ("b1", "a1"), ("a9", "a3"), ("h4", "a4"), ("h3", "h4"),
+    ],
+    [("i1", "a1"), ("i1", "h2"), ("i1", "i1"), ("i1", "b1"), ("a1", "c1")],
+]
+
+
+class MyTestCase(unittest.TestCase):
+
+    def assert_batch_matches_games(self, test_batch, test_games):
+        for game_index, test_game in enumerate(test_games):
+            batch_game = test_batch.to_game(game_index)
+            self.assertEqual(test_game._boards, batch_game._boards)
+            self.assertEqual(test_game.get_game_state(), batch_game.get_game_state())
+            self.assertEqual(test_game.get_active_player(), batch_game.get_active_player())
+            for player in ("BLACK", "RED"):
+                self.assertEqual(test_game.get_num_captured_pieces(player), batch_game.get_num_captured_pieces(player))
+
+    def test_starting_position(self):
+        test_batch = BatchHasamiShogiGame(3)
+        self.assertEqual((3, 9, 9), test_batch.get_boards().shape)
+        self.assertEqual([RED] * 9, list(test_batch.get_boards()[0, 0]))
+        self.assertEqual([BLACK] * 9, list(test_batch.get_boards()[2, 8]))
+        self.assertEqual([BLACK] * 3, list(test_batch.get_active_players()))
+        self.assert_batch_matches_games(test_batch, [HasamiShogiGame() for _ in range(3)])
+
+    def test_moves_match_scalar_games(self):
+        test_games = [HasamiShogiGame() for _ in GAMES]
+        test_batch = BatchHasamiShogiGame(len(GAMES))
+        for move_number in range(max(len(moves) for moves in GAMES)):
+            squares_moved_from, squares_moved_to, expected_results = [], [], []
+            for test_game, moves in zip(test_games, GAMES):
+                square_moved_from, square_moved_to = moves[min(move_number, len(moves) - 1)]
+                squares_moved_from.append(test_game._square_to_index(square_moved_from))
+                squares_moved_to.append(test_game._square_to_index(square_moved_to))
+                expected_results.append(test_game.make_move(square_moved_from, square_moved_to))
+            results = test_batch.make_moves(np.array(squares_moved_from), np.array(squares_moved_to))
+            self.assertEqual(expected_results, list(results))
+            self.assert_batch_matches_games(test_batch, test_games)
+        self.assertEqual(BLACK_WON, test_batch.get_game_states()[4])
+        self.assertEqual(UNFINISHED, test_batch.get_game_states()[0])
+        self.assertEqual(9, test_batch.get_num_captured_pieces("BLACK")[4])
+
+    def test_random_moves_match_scalar_games(self):
+        move_chooser = random.Random(11)
+        test_games = [HasamiShogiGame() for _ in range(16)]
+        test_batch = BatchHasamiShogiGame(16)
+        for _ in range(150):
+            squares_moved_from, squares_moved_to = [], []
+            for test_game in test_games:
+                legal_moves = list(test_game._iter_legal_move_indexes())
+                if legal_moves and move_chooser.random() < 0.9:
+                    index_moved_from, index_moved_to = move_chooser.choice(legal_moves)
+                else:
+                    index_moved_from, index_moved_to = move_chooser.randrange(81), move_chooser.randrange(81)
+                squares_moved_from.append(index_moved_from)
+                squares_moved_to.append(index_moved_to)
+                if test_game._game_state == "UNFINISHED" and test_game._legal_move(index_moved_from, index_moved_to):
+                    test_game._apply_move(index_moved_from, index_moved_to)
+            test_batch.make_moves(np.array(squares_moved_from), np.array(squares_moved_to))
+        self.assert_batch_matches_games(test_batch, test_games)
+
+    def test_from_games(self):
+        test_game = HasamiShogiGame()
+        for square_moved_from, square_moved_to in GAMES[1]:
+            test_game.make_move(square_moved_from, square_moved_to)
+        test_batch = BatchHasamiShogiGame.from_games([HasamiShogiGame(), test_game])
+        self.assert_batch_matches_games(test_batch, [HasamiShogiGame(), test_game])
+        self.assertEqual(test_game.get_position_hash(), test_batch.to_game(1).get_position_hash())
+
+    def test_captures_to_win(self):
+        test_games = [HasamiShogiGame(captures_to_win=1), HasamiShogiGame(captures_to_win=1)]
+        test_batch = BatchHasamiShogiGame.from_games(test_games)
+        self.assertEqual(1, test_batch.get_captures_to_win())
+        for square_moved_from, square_moved_to in GAMES[0]:
+            for test_game in test_games:
+                test_game.make_move(square_moved_from, square_moved_to)
+            test_batch.make_moves(
+                np.full(2, test_games[0]._square_to_index(square_moved_from)),
+                np.full(2, test_games[0]._square_to_index(square_moved_to)),
+            )
+        self.assertEqual("BLACK_WON", test_games[0].get_game_state())
+        self.assertEqual([BLACK_WON, BLACK_WON], list(test_batch.get_game_states()))
+        self.assert_batch_matches_games(test_batch, test_games)
+        self.assertEqual(1, test_batch.to_game(0).get_captures_to_win())
+
+    def test_from_games_other_rules(self):
+        with self.assertRaises(ValueError):
+            BatchHasamiShogiGame.from_games([HasamiShogiGame(5)])
+        with self.assertRaises(ValueError):
+            BatchHasamiShogiGame.from_games([HasamiShogiGame(), HasamiShogiGame(captures_to_win=1)])
+        with self.assertRaises(ValueError):
+            BatchHasamiShogiGame(1, captures_to_win=10)
+
+    def test_invalid_square_indexes(self):
+        test_batch = BatchHasamiShogiGame(2)
+        for squares_moved_from, squares_moved_to in (([72, 81], [63, 0]), ([72, -9], [63, 63]), ([72, 73], [63, -1])):
+            with self.assertRaises(ValueError):
+                test_batch.make_moves(np.array(squares_moved_from), np.array(squares_moved_to))
+        self.assert_batch_matches_games(test_batch, [HasamiShogiGame(), HasamiShogiGame()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,350 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: A repeatable benchmark suite for the Hasami Shogi engine's hot paths, with JSON results and baseline
+# comparison.
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_players import GreedyCapturePlayer, RandomPlayer
+
+# Two-sided 95% critical values of Student's t distribution, by degrees of freedom.
+_T_CRITICAL_VALUES = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+    25: 2.060, 30: 2.042,
+}
+
+Benchmark = namedtuple("Benchmark", ["name", "description", "setup"])
+
+
+def _t_critical_value(degrees_of_freedom):
+    """
+    Takes as a parameter the degrees of freedom.
+    Returns the two-sided 95% critical value of Student's t distribution, rounding down to the nearest tabled value.
+    """
+    if degrees_of_freedom > 30:
+        return 1.96
+    return _T_CRITICAL_VALUES[max(value for value in _T_CRITICAL_VALUES if value <= degrees_of_freedom)]
+
+
+def build_game_corpus(num_games=40, seed=0, max_moves=150):
+    """
+    Takes as optional parameters the number of games, the seed for the first game and the maximum moves per game.
+    Returns a list of games, each a list of (index moved from, index moved to) moves, played between a greedy-capture
+    player and a random player. The same parameters always produce the same corpus.
+    """
+    games = []
+    for game_number in range(num_games):
+        players = {
+            "BLACK": GreedyCapturePlayer(seed + 2 * game_number),
+            "RED": RandomPlayer(seed + 2 * game_number + 1),
+        }
+        game = HasamiShogiGame()
+        moves = []
+        while game.get_game_state() == "UNFINISHED" and len(moves) < max_moves:
+            move = players[game.get_active_player()].choose_move(game)
+            if move is None:
+                break
+            index_moved_from, index_moved_to = game.square_to_idx(move[0]), game.square_to_idx(move[1])
+            game.make_move_idx(index_moved_from, index_moved_to)
+            moves.append((index_moved_from, index_moved_to))
+        games.append(moves)
+    return games
+
+
+def build_position_corpus(game_corpus, every=5):
+    """
+    Takes as parameters a game corpus and how many moves apart to take positions.
+    Returns a list of snapshots of the positions reached in the corpus's games.
+    """
+    positions = []
+    for moves in game_corpus:
+        game = HasamiShogiGame()
+        for ply, (index_moved_from, index_moved_to) in enumerate(moves):
+            if ply % every == 0:
+                positions.append(game.to_bytes())
+            game.make_move_idx(index_moved_from, index_moved_to)
+    return positions
+
+
+def _setup_make_and_unmake_move(game_corpus, positions):
+    """
+    Takes as parameters the game and position corpora.
+    Returns a function making and taking back every legal move of every position, and the number of moves it makes.
+    """
+    cases = []
+    for snapshot in positions:
+        game = HasamiShogiGame.from_bytes(snapshot)
+        cases.append((game, [(game.idx_to_square(move[0]), game.idx_to_square(move[1])) for move in
+                             game.iter_legal_moves_idx()]))
+
+    def run():
+        for game, moves in cases:
+            for square_moved_from, square_moved_to in moves:
+                game.make_move(square_moved_from, square_moved_to)
+                game.unmake_move()
+
+    return run, sum(len(moves) for _, moves in cases)
+
+
+def _setup_legal_move(game_corpus, positions):
+    """
+    Takes as parameters the game and position corpora.
+    Returns a function checking every straight-line move of the active player's pieces in every position, legal or not,
+    and the number of moves it checks.
+    """
+    cases = []
+    for snapshot in positions:
+        game = HasamiShogiGame.from_bytes(snapshot)
+        moves = []
+        board_size = game.get_board_size()
+        for index_moved_from in game._iter_squares(game._boards[game.get_active_player()]):
+            row, col = divmod(index_moved_from, board_size)
+            moves += [(index_moved_from, row * board_size + other_col) for other_col in range(board_size)]
+            moves += [(index_moved_from, other_row * board_size + col) for other_row in range(board_size)]
+        cases.append((game, moves))
+
+    def run():
+        for game, moves in cases:
+            legal_move = game._legal_move
+            for index_moved_from, index_moved_to in moves:
+                legal_move(index_moved_from, index_moved_to)
+
+    return run, sum(len(moves) for _, moves in cases)
+
+
+def _capture_cases(positions):
+    """
+    Takes as a parameter the position corpus.
+    Returns a list of (index moved to, active board, opponent board) tuples for every legal move of every position,
+    with the boards as they are after the piece has moved.
+    """
+    cases = []
+    for snapshot in positions:
+        game = HasamiShogiGame.from_bytes(snapshot)
+        active_board = game._boards[game.get_active_player()]
+        opponent_board = game._boards[game._get_opponent_player()]
+        for index_moved_from, index_moved_to in game.iter_legal_moves_idx():
+            moved_board = active_board ^ (1 << index_moved_from) ^ (1 << index_moved_to)
+            cases.append((index_moved_to, moved_board, opponent_board))
+    return cases
+
+
+def _setup_non_corner_capture(game_corpus, positions):
+    """
+    Takes as parameters the game and position corpora.
+    Returns a function finding the custodial captures of every legal move of every position, and the number of moves.
+    """
+    cases = _capture_cases(positions)
+    non_corner_capture = HasamiShogiGame()._non_corner_capture
+
+    def run():
+        for index_moved_to, active_board, opponent_board in cases:
+            non_corner_capture(index_moved_to, active_board, opponent_board)
+
+    return run, len(cases)
+
+
+def _setup_corner_capture(game_corpus, positions):
+    """
+    Takes as parameters the game and position corpora.
+    Returns a function finding the corner captures of every legal move of every position, and the number of moves.
+    """
+    cases = _capture_cases(positions)
+    corner_capture = HasamiShogiGame()._corner_capture
+
+    def run():
+        for index_moved_to, active_board, opponent_board in cases:
+            corner_capture(index_moved_to, active_board, opponent_board)
+
+    return run, len(cases)
+
+
+def _setup_get_square_occupant(game_corpus, positions):
+    """
+    Takes as parameters the game and position corpora.
+    Returns a function reading every square of every position in algebraic notation, and the number of squares read.
+    """
+    games = [HasamiShogiGame.from_bytes(snapshot) for snapshot in positions]
+    squares = [HasamiShogiGame.idx_to_square(index) for index in range(81)]
+
+    def run():
+        for game in games:
+            get_square_occupant = game.get_square_occupant
+            for square in squares:
+                get_square_occupant(square)
+
+    return run, len(games) * len(squares)
+
+
+def _setup_full_game_replay(game_corpus, positions):
+    """
+    Takes as parameters the game and position corpora.
+    Returns a function replaying every game of the corpus from the start with make_move, and the number of games.
+    """
+    games = [
+        [(HasamiShogiGame.idx_to_square(move[0]), HasamiShogiGame.idx_to_square(move[1])) for move in moves]
+        for moves in game_corpus
+    ]
+
+    def run():
+        for moves in games:
+            game = HasamiShogiGame()
+            for square_moved_from, square_moved_to in moves:
+                game.make_move(square_moved_from, square_moved_to)
+
+    return run, len(games)
+
+
+BENCHMARKS = (
+    Benchmark(
+        "make_and_unmake_move",
+        "make_move then unmake_move of every legal move in each position, timed as one operation",
+        _setup_make_and_unmake_move,
+    ),
+    Benchmark("legal_move", "_legal_move on every straight-line move from each active piece", _setup_legal_move),
+    Benchmark("non_corner_capture", "_non_corner_capture for every legal move", _setup_non_corner_capture),
+    Benchmark("corner_capture", "_corner_capture for every legal move", _setup_corner_capture),
+    Benchmark(
+        "get_square_occupant", "get_square_occupant on every square of each position", _setup_get_square_occupant
+    ),
+    Benchmark("full_game_replay", "replaying each corpus game with make_move", _setup_full_game_replay),
+)
+
+
+def summarize_samples(samples):
+    """
+    Takes as a parameter a list of operations-per-second samples.
+    Returns a dictionary of the samples with their mean, standard deviation and 95% confidence interval for the mean.
+    Raises a ValueError if there are fewer than two samples, as the confidence interval needs at least two.
+    """
+    if len(samples) < 2:
+        raise ValueError("at least two samples are needed: %d" % len(samples))
+    mean = statistics.mean(samples)
+    standard_deviation = statistics.stdev(samples)
+    margin = _t_critical_value(len(samples) - 1) * standard_deviation / math.sqrt(len(samples))
+    return {
+        "ops_per_second": mean,
+        "stdev": standard_deviation,
+        "ci95_low": mean - margin,
+        "ci95_high": mean + margin,
+        "samples": samples,
+    }
+
+
+def run_benchmarks(samples=10, names=None, num_games=40, seed=0):
+    """
+    Takes as optional parameters the number of timed samples per benchmark, the names of the benchmarks to run
+    (defaulting to all of them), and the size and seed of the game corpus.
+    Runs each benchmark once to warm up and then the given number of times, timing each run over the whole corpus.
+    Returns a dictionary of the environment and of each benchmark's summarized operations per second.
+    Raises a ValueError if there are fewer than two samples.
+    """
+    if samples < 2:
+        raise ValueError("at least two samples are needed: %d" % samples)
+    game_corpus = build_game_corpus(num_games, seed)
+    positions = build_position_corpus(game_corpus)
+    results = {}
+    for benchmark in BENCHMARKS:
+        if names is not None and benchmark.name not in names:
+            continue
+        run, operations = benchmark.setup(game_corpus, positions)
+        run()
+        ops_per_second = []
+        for _ in range(samples):
+            start_time = time.perf_counter()
+            run()
+            ops_per_second.append(operations / (time.perf_counter() - start_time))
+        results[benchmark.name] = summarize_samples(ops_per_second)
+        results[benchmark.name]["operations"] = operations
+        results[benchmark.name]["description"] = benchmark.description
+
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "corpus": {"games": num_games, "seed": seed, "positions": len(positions)},
+        "benchmarks": results,
+    }
+
+
+def compare_results(results, baseline, threshold=0.05):
+    """
+    Takes as parameters a set of benchmark results, the baseline results to compare them with, and optionally the
+    fractional slowdown that counts as a regression.
+    Returns a dictionary mapping each benchmark in both to a dictionary of its fractional change in operations per
+    second and whether it regressed. A benchmark regresses when it is slower by more than the threshold and its
+    confidence interval lies entirely below the baseline's.
+    Raises a ValueError if the baseline was run on a different corpus, with another number of games, seed or number of
+    positions, as its operations per second would not be comparable.
+    """
+    corpus, baseline_corpus = results.get("corpus", {}), baseline.get("corpus", {})
+    for parameter in ("games", "seed", "positions"):
+        if corpus.get(parameter) != baseline_corpus.get(parameter):
+            raise ValueError("the baseline was run on a different corpus: %s %r, not %r" % (
+                parameter, baseline_corpus.get(parameter), corpus.get(parameter)
+            ))
+    comparison = {}
+    for name, result in results["benchmarks"].items():
+        baseline_result = baseline["benchmarks"].get(name)
+        if baseline_result is None:
+            continue
+        change = result["ops_per_second"] / baseline_result["ops_per_second"] - 1
+        comparison[name] = {
+            "change": change,
+            "regressed": change < -threshold and result["ci95_high"] < baseline_result["ci95_low"],
+        }
+    return comparison
+
+
+def main():
+    """
+    Takes no parameters.
+    Runs the benchmarks described by the command line arguments, prints and optionally saves the results, and compares
+    them with a baseline if one is given, exiting with status 1 if any benchmark regressed.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Hasami Shogi engine.")
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--benchmark", action="append", dest="names", choices=[b.name for b in BENCHMARKS])
+    parser.add_argument("--games", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the game corpus")
+    parser.add_argument("--output", help="path to write the results to as JSON")
+    parser.add_argument("--baseline", help="path of earlier JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.05)
+    arguments = parser.parse_args()
+    if arguments.samples < 2:
+        parser.error("--samples must be at least 2")
+
+    results = run_benchmarks(arguments.samples, arguments.names, arguments.games, arguments.seed)
+    for name, result in results["benchmarks"].items():
+        print("%-20s %12.0f ops/sec  (95%% CI %.0f to %.0f)" % (
+            name, result["ops_per_second"], result["ci95_low"], result["ci95_high"]
+        ))
+
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        try:
+            comparison = compare_results(results, baseline, arguments.threshold)
+        except ValueError as error:
+            parser.error(str(error))
+        for name, change in comparison.items():
+            print("%-20s %+7.1f%%%s" % (name, change["change"] * 100, "  REGRESSION" if change["regressed"] else ""))
+        if any(change["regressed"] for change in comparison.values()):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
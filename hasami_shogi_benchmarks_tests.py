@@ -0,0 +1,65 @@
+import unittest
+from hasami_shogi_benchmarks import (
+    BENCHMARKS, build_game_corpus, build_position_corpus, compare_results, run_benchmarks, summarize_samples
+)
+
+
+class MyTestCase(unittest.TestCase):
+
+    def test_corpora_are_repeatable(self):
+        game_corpus = build_game_corpus(3, seed=5)
+        self.assertEqual(game_corpus, build_game_corpus(3, seed=5))
+        self.assertEqual(build_position_corpus(game_corpus), build_position_corpus(build_game_corpus(3, seed=5)))
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(samples=2, num_games=2)
+        self.assertEqual([benchmark.name for benchmark in BENCHMARKS], list(results["benchmarks"]))
+        for result in results["benchmarks"].values():
+            self.assertEqual(2, len(result["samples"]))
+            self.assertGreater(result["operations"], 0)
+            self.assertLessEqual(result["ci95_low"], result["ops_per_second"])
+            self.assertGreaterEqual(result["ci95_high"], result["ops_per_second"])
+
+    def test_run_named_benchmarks(self):
+        results = run_benchmarks(samples=2, names=["legal_move"], num_games=1)
+        self.assertEqual(["legal_move"], list(results["benchmarks"]))
+
+    def test_too_few_samples(self):
+        for samples in (0, 1):
+            with self.assertRaises(ValueError):
+                run_benchmarks(samples=samples, names=["legal_move"], num_games=1)
+            with self.assertRaises(ValueError):
+                summarize_samples([100.0] * samples)
+
+    def test_summarize_samples(self):
+        summary = summarize_samples([90.0, 100.0, 110.0])
+        self.assertEqual(100.0, summary["ops_per_second"])
+        self.assertEqual(10.0, summary["stdev"])
+        self.assertAlmostEqual(100.0 - 4.303 * 10.0 / 3 ** 0.5, summary["ci95_low"])
+
+    def test_compare_results(self):
+        baseline = {"benchmarks": {
+            "make_and_unmake_move": summarize_samples([1000.0, 1010.0, 990.0]),
+            "legal_move": summarize_samples([1000.0, 1010.0, 990.0]),
+        }}
+        results = {"benchmarks": {
+            "make_and_unmake_move": summarize_samples([800.0, 810.0, 790.0]),
+            "legal_move": summarize_samples([980.0, 990.0, 970.0]),
+            "corner_capture": summarize_samples([1000.0, 1000.0]),
+        }}
+        comparison = compare_results(results, baseline)
+        self.assertEqual(["make_and_unmake_move", "legal_move"], list(comparison))
+        self.assertTrue(comparison["make_and_unmake_move"]["regressed"])
+        self.assertAlmostEqual(-0.2, comparison["make_and_unmake_move"]["change"])
+        self.assertFalse(comparison["legal_move"]["regressed"])
+
+    def test_compare_different_corpora(self):
+        baseline = run_benchmarks(samples=2, names=["legal_move"], num_games=1)
+        self.assertIn("legal_move", compare_results(run_benchmarks(2, ["legal_move"], 1), baseline))
+        for num_games, seed in ((2, 0), (1, 3)):
+            with self.assertRaises(ValueError):
+                compare_results(run_benchmarks(2, ["legal_move"], num_games, seed), baseline)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,257 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: Extracts dense NumPy feature arrays from many Hasami Shogi positions at once, for training models, and
+# writes them in chunks to .npz files, from lists of positions or from replayed move logs.
+
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_replay import replay_games
+
+PositionFeatures = namedtuple("PositionFeatures", ["pieces", "side_to_move", "captures", "mobility", "threats"])
+ExtractionReport = namedtuple("ExtractionReport", ["positions", "paths", "elapsed", "positions_per_second"])
+
+_DIRECTIONS = ((0, 1), (0, -1), (-1, 0), (1, 0))
+
+
+def _shift(planes, row_step, col_step):
+    """
+    Takes as parameters a (positions, rows, columns) array and the number of rows and columns to move it by.
+    Returns the array with each square's value moved that many rows down and columns right, and the squares left
+    behind set to zero.
+    """
+    board_size = planes.shape[1]
+    shifted = np.zeros_like(planes)
+    if abs(row_step) >= board_size or abs(col_step) >= board_size:
+        return shifted
+    rows_to = slice(max(row_step, 0), board_size + min(row_step, 0))
+    rows_from = slice(max(-row_step, 0), board_size + min(-row_step, 0))
+    cols_to = slice(max(col_step, 0), board_size + min(col_step, 0))
+    cols_from = slice(max(-col_step, 0), board_size + min(-col_step, 0))
+    shifted[:, rows_to, cols_to] = planes[:, rows_from, cols_from]
+    return shifted
+
+
+def _unpack_boards(boards, board_size):
+    """
+    Takes as parameters a list of piece masks and the number of rows and columns on the board.
+    Returns a (positions, rows, columns) boolean array of the squares each mask holds.
+    """
+    num_squares = board_size * board_size
+    num_bytes = (num_squares + 7) // 8
+    packed = np.frombuffer(b"".join(board.to_bytes(num_bytes, "little") for board in boards), dtype=np.uint8)
+    squares = np.unpackbits(packed.reshape(len(boards), num_bytes), axis=1, bitorder="little")
+    return squares[:, :num_squares].reshape(len(boards), board_size, board_size).astype(bool)
+
+
+def _destinations(pieces, empty):
+    """
+    Takes as parameters (positions, rows, columns) boolean arrays of one player's pieces and of the empty squares.
+    Returns an array of the number of legal moves the player has in each position, and a boolean array of the squares
+    at least one of their pieces can move to.
+    """
+    board_size = pieces.shape[1]
+    num_moves = np.zeros(len(pieces), dtype=np.int16)
+    reachable = np.zeros_like(pieces)
+    for row_step, col_step in _DIRECTIONS:
+        sliding = pieces
+        for _ in range(1, board_size):
+            sliding = _shift(sliding, row_step, col_step) & empty
+            if not sliding.any():
+                break
+            num_moves += sliding.sum(axis=(1, 2), dtype=np.int16)
+            reachable |= sliding
+    return num_moves, reachable
+
+
+def _threatened(active, opponent, reachable):
+    """
+    Takes as parameters (positions, rows, columns) boolean arrays of the moving player's pieces, their opponent's
+    pieces and the empty squares the moving player can reach.
+    Returns a boolean array of the opponent's pieces that some move to a reachable square would capture, following the
+    same rules as HasamiShogiGame: a run of the opponent's pieces ending in one of the moving player's pieces, or a
+    corner held by the opponent once both squares beside it are the moving player's.
+    """
+    board_size = active.shape[1]
+    threatened = np.zeros_like(opponent)
+
+    for row_step, col_step in _DIRECTIONS:
+        in_run = reachable
+        for run_length in range(1, board_size - 1):
+            in_run = in_run & _shift(opponent, -run_length * row_step, -run_length * col_step)
+            if not in_run.any():
+                break
+            bracketed = in_run & _shift(active, -(run_length + 1) * row_step, -(run_length + 1) * col_step)
+            for distance in range(1, run_length + 1):
+                threatened |= _shift(bracketed, distance * row_step, distance * col_step)
+
+    last = board_size - 1
+    for corner_row, corner_col in ((0, 0), (0, last), (last, 0), (last, last)):
+        row_step = 1 if corner_row == 0 else -1
+        col_step = 1 if corner_col == 0 else -1
+        beside = (slice(None), corner_row, corner_col + col_step)
+        below = (slice(None), corner_row + row_step, corner_col)
+        threatened[:, corner_row, corner_col] |= opponent[:, corner_row, corner_col] & (
+            (reachable[beside] & active[below]) | (reachable[below] & active[beside])
+        )
+    return threatened
+
+
+def extract_features(positions):
+    """
+    Takes as a parameter a list of HasamiShogiGame or GameState positions, all on the same size of board.
+    Computes every position's features at once with NumPy array operations, rather than square by square.
+    Returns PositionFeatures of arrays with one entry per position:
+    pieces, a (positions, 2, rows, columns) uint8 array of the black pieces and the red pieces;
+    side_to_move, a uint8 array of 0 when black is the active player and 1 when red is;
+    captures, a (positions, 2) int16 array of the pieces black and red have captured;
+    mobility, a (positions, 2) int16 array of the number of legal moves black and red would have;
+    threats, a (positions, 2, rows, columns) uint8 array of the black pieces red could capture with their next move
+    and the red pieces black could capture with theirs.
+    Mobility and threats are zero in finished games, as no more moves can be made.
+    Raises a ValueError if there are no positions or they are not all on the same size of board.
+    """
+    states = [position.to_state() if isinstance(position, HasamiShogiGame) else position for position in positions]
+    if not states:
+        raise ValueError("no positions to extract features from")
+    board_size = states[0].board_size
+    if any(state.board_size != board_size for state in states):
+        raise ValueError("positions are not all on the same size of board")
+
+    black = _unpack_boards([state.black_board for state in states], board_size)
+    red = _unpack_boards([state.red_board for state in states], board_size)
+    empty = ~(black | red)
+    unfinished = np.array([state.game_state == "UNFINISHED" for state in states])
+
+    black_moves, black_reachable = _destinations(black, empty)
+    red_moves, red_reachable = _destinations(red, empty)
+    mobility = np.stack([black_moves, red_moves], axis=1) * unfinished[:, None]
+    threats = np.stack([_threatened(red, black, red_reachable), _threatened(black, red, black_reachable)], axis=1)
+    threats &= unfinished[:, None, None, None]
+
+    return PositionFeatures(
+        pieces=np.stack([black, red], axis=1).astype(np.uint8),
+        side_to_move=np.array([state.active_player == "RED" for state in states], dtype=np.uint8),
+        captures=np.array([(state.black_captures, state.red_captures) for state in states], dtype=np.int16),
+        mobility=mobility.astype(np.int16),
+        threats=threats.astype(np.uint8),
+    )
+
+
+def _write_chunk(path_prefix, chunk_number, states, compressed, **extra_arrays):
+    """
+    Takes as parameters the prefix of the files to write, the number of the chunk, a list of GameStates, whether to
+    compress the file and any further arrays to store alongside the features.
+    Writes the features of the states to "<prefix>-<chunk number>.npz".
+    Returns the path written to.
+    """
+    path = "%s-%05d.npz" % (path_prefix, chunk_number)
+    save = np.savez_compressed if compressed else np.savez
+    save(path, **extract_features(states)._asdict(), **extra_arrays)
+    return path
+
+
+def write_features(positions, path_prefix, chunk_size=65536, compressed=False):
+    """
+    Takes as parameters an iterable of HasamiShogiGame or GameState positions, all on the same size of board, the
+    prefix of the files to write and, optionally, the most positions per file and whether to compress the files.
+    Extracts the features of the positions as extract_features does, a chunk at a time, writing each chunk's arrays to
+    "<prefix>-00000.npz", "<prefix>-00001.npz" and so on, so that no more than one chunk is held in memory.
+    Returns an ExtractionReport with the number of positions, the paths written to, the seconds taken and the positions
+    extracted per second.
+    Raises a ValueError if the chunk size is less than 1.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk size must be at least 1")
+    start_time = time.perf_counter()
+    num_positions, paths, states = 0, [], []
+    for position in positions:
+        states.append(position.to_state() if isinstance(position, HasamiShogiGame) else position)
+        if len(states) == chunk_size:
+            paths.append(_write_chunk(path_prefix, len(paths), states, compressed))
+            num_positions += len(states)
+            states = []
+    if states:
+        paths.append(_write_chunk(path_prefix, len(paths), states, compressed))
+        num_positions += len(states)
+
+    elapsed = time.perf_counter() - start_time
+    return ExtractionReport(num_positions, paths, elapsed, num_positions / elapsed if elapsed > 0 else 0.0)
+
+
+def write_archive_features(path, path_prefix, chunk_size=65536, compressed=False, final_only=False, trusted=False):
+    """
+    Takes as parameters the path to a move log, the prefix of the files to write and, optionally, the most positions
+    per file, whether to compress the files, whether to keep only each game's final position rather than every
+    position from the start, and whether to skip checking that moves are legal.
+    Replays the games and writes their positions' features as write_features does, with two more arrays in each file:
+    game_numbers, a uint32 array of each position's game (its zero-based line in the log), and plies, a uint16 array
+    of the number of moves made before it.
+    Returns an ExtractionReport as write_features does.
+    Raises a ReplayError if a move is badly formed or, unless trusted, not legal.
+    Raises a ValueError if the chunk size is less than 1.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk size must be at least 1")
+    start_time = time.perf_counter()
+    num_positions, paths, states, game_numbers, plies = 0, [], [], [], []
+
+    def write_buffered_chunk():
+        paths.append(_write_chunk(
+            path_prefix,
+            len(paths),
+            states,
+            compressed,
+            game_numbers=np.array(game_numbers, dtype=np.uint32),
+            plies=np.array(plies, dtype=np.uint16),
+        ))
+
+    for game_number, ply, game in replay_games(path, trusted, not final_only):
+        states.append(game.to_state())
+        game_numbers.append(game_number)
+        plies.append(ply)
+        if len(states) == chunk_size:
+            write_buffered_chunk()
+            num_positions += len(states)
+            states, game_numbers, plies = [], [], []
+    if states:
+        write_buffered_chunk()
+        num_positions += len(states)
+
+    elapsed = time.perf_counter() - start_time
+    return ExtractionReport(num_positions, paths, elapsed, num_positions / elapsed if elapsed > 0 else 0.0)
+
+
+def main():
+    """
+    Takes no parameters.
+    Writes the features of the positions in the move log named on the command line and prints the report.
+    """
+    parser = argparse.ArgumentParser(description="Extract Hasami Shogi position features from a move log.")
+    parser.add_argument("path")
+    parser.add_argument("path_prefix")
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--compressed", action="store_true")
+    parser.add_argument("--final-only", action="store_true", help="keep only each game's final position")
+    parser.add_argument("--trusted", action="store_true", help="skip checking that moves are legal")
+    arguments = parser.parse_args()
+
+    report = write_archive_features(
+        arguments.path,
+        arguments.path_prefix,
+        arguments.chunk_size,
+        arguments.compressed,
+        arguments.final_only,
+        arguments.trusted,
+    )
+    print("%d positions in %d files in %.3f seconds (%.0f positions/sec)" % (
+        report.positions, len(report.paths), report.elapsed, report.positions_per_second
+    ))
+
+
+if __name__ == "__main__":
+    main()
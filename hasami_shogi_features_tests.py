@@ -0,0 +1,141 @@
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from hasami_shogi_features import extract_features, write_archive_features, write_features
+from hasami_shogi_game import GameState, HasamiShogiGame
+
+MOVE_LOG = [
+    "i1-b1 a2-b2 i3-b3",
+    "i1-c1 a2-b2 c1-b1 a3-b3 i4-b4",
+    "",
+    "i8-h8 a9-h9 h8-h2 a8-i8",
+]
+
+
+def _random_positions(board_size, num_games, seed):
+    """
+    Plays random games, returning a GameState for every position reached.
+    """
+    random_moves = random.Random(seed)
+    positions = []
+    for _ in range(num_games):
+        game = HasamiShogiGame(board_size)
+        positions.append(game.to_state())
+        for _ in range(60):
+            moves = game.legal_moves()
+            if not moves:
+                break
+            game.make_move(*random_moves.choice(moves))
+            positions.append(game.to_state())
+            if game.get_game_state() != "UNFINISHED":
+                break
+    return positions
+
+
+class MyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.output_directory = tempfile.TemporaryDirectory()
+        self.path_prefix = os.path.join(self.output_directory.name, "features")
+
+    def tearDown(self):
+        self.output_directory.cleanup()
+
+    def assert_features_match_games(self, positions):
+        features = extract_features(positions)
+        for position_index, state in enumerate(positions):
+            game = HasamiShogiGame.from_state(state)
+            for player_index, player in enumerate(("BLACK", "RED")):
+                board = state.black_board if player == "BLACK" else state.red_board
+                pieces = np.flatnonzero(features.pieces[position_index, player_index])
+                self.assertEqual(list(game._iter_squares(board)), list(pieces))
+                self.assertEqual(game.get_num_captured_pieces(player), features.captures[position_index, player_index])
+                threatened = np.flatnonzero(features.threats[position_index, player_index])
+                square_names = [game.idx_to_square(index, state.board_size) for index in threatened]
+                self.assertEqual(sorted(game.get_threatened_pieces(player)), sorted(square_names))
+
+                player_to_move = GameState(
+                    state.black_board, state.red_board, state.black_captures, state.red_captures, player,
+                    state.game_state, state.board_size,
+                )
+                num_moves = len(HasamiShogiGame.from_state(player_to_move).legal_moves())
+                self.assertEqual(num_moves, features.mobility[position_index, player_index])
+            self.assertEqual(state.active_player == "RED", features.side_to_move[position_index])
+
+    # --- TEST FEATURES ---
+
+    def test_starting_position(self):
+        features = extract_features([HasamiShogiGame()])
+        self.assertEqual((1, 2, 9, 9), features.pieces.shape)
+        self.assertEqual([1] * 9, list(features.pieces[0, 0, 8]))
+        self.assertEqual([1] * 9, list(features.pieces[0, 1, 0]))
+        self.assertEqual([0], list(features.side_to_move))
+        self.assertEqual([[0, 0]], features.captures.tolist())
+        self.assertEqual([[63, 63]], features.mobility.tolist())
+        self.assertEqual(0, features.threats.sum())
+
+    def test_matches_games(self):
+        self.assert_features_match_games(_random_positions(9, 20, 3))
+
+    def test_matches_games_other_board_sizes(self):
+        self.assert_features_match_games(_random_positions(5, 20, 5))
+        self.assert_features_match_games(_random_positions(12, 3, 7))
+
+    def test_corner_threat(self):
+        test_game = HasamiShogiGame.from_position_notation("R8/B8/9/9/9/9/9/9/1B7 B 7 7")
+        features = extract_features([test_game])
+        self.assertEqual(1, features.threats[0, 1, 0, 0])
+        self.assertEqual(["a1"], test_game.get_threatened_pieces("RED"))
+
+    def test_finished_game(self):
+        features = extract_features([HasamiShogiGame.from_position_notation("R8/B8/9/9/9/9/9/9/1B7 R 8 0")])
+        self.assertEqual([[0, 0]], features.mobility.tolist())
+        self.assertEqual(0, features.threats.sum())
+
+    def test_invalid_positions(self):
+        with self.assertRaises(ValueError):
+            extract_features([])
+        with self.assertRaises(ValueError):
+            extract_features([HasamiShogiGame(), HasamiShogiGame(7)])
+
+    # --- TEST CHUNKED FILES ---
+
+    def test_write_features(self):
+        positions = _random_positions(9, 3, 11)
+        report = write_features(iter(positions), self.path_prefix, chunk_size=25)
+        self.assertEqual(len(positions), report.positions)
+        self.assertEqual(-(-len(positions) // 25), len(report.paths))
+        expected = extract_features(positions)
+        with np.load(report.paths[0]) as chunk:
+            self.assertEqual(25, len(chunk["pieces"]))
+            np.testing.assert_array_equal(expected.threats[:25], chunk["threats"])
+        with np.load(report.paths[-1]) as chunk:
+            np.testing.assert_array_equal(expected.mobility[-len(chunk["mobility"]):], chunk["mobility"])
+        with self.assertRaises(ValueError):
+            write_features(positions, self.path_prefix, chunk_size=0)
+
+    def test_write_archive_features(self):
+        log_path = os.path.join(self.output_directory.name, "games.txt")
+        with open(log_path, "w") as move_log:
+            move_log.write("\n".join(MOVE_LOG) + "\n")
+
+        report = write_archive_features(log_path, self.path_prefix, chunk_size=4, compressed=True)
+        self.assertEqual(16, report.positions)
+        game_numbers, plies = [], []
+        for path in report.paths:
+            with np.load(path) as chunk:
+                game_numbers.extend(chunk["game_numbers"].tolist())
+                plies.extend(chunk["plies"].tolist())
+        self.assertEqual([0] * 4 + [1] * 6 + [2] + [3] * 5, game_numbers)
+        self.assertEqual([0, 1, 2, 3, 0, 1, 2, 3, 4, 5, 0, 0, 1, 2, 3, 4], plies)
+
+        report = write_archive_features(log_path, self.path_prefix + "-final", final_only=True)
+        with np.load(report.paths[0]) as chunk:
+            self.assertEqual([3, 5, 0, 4], chunk["plies"].tolist())
+            self.assertEqual([[1, 0], [2, 0], [0, 0], [0, 1]], chunk["captures"].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
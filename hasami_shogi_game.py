@@ -1,35 +1,465 @@
 # Author: Christopher Wirth
 # Date: 12/02/2021
-# Description: An implementation of the Hasami Shogi game, using the traditional nine-piece variant.
+# Description: An implementation of the Hasami Shogi game, using the traditional nine-piece variant by default, on a
+# board of any size from 3 to 26.
+
+import random
+import string
+import time
+
+from hasami_shogi_instrumentation import MoveInstrumentation
+
+_DIRECTIONS = {"Right": (0, 1), "Left": (0, -1), "Up": (-1, 0), "Down": (1, 0)}
+_MIN_BOARD_SIZE = 3
+_MAX_BOARD_SIZE = 26
+
+
+def _build_zobrist_keys(board_size):
+    """
+    Takes as a parameter the number of rows and columns on the board.
+    Returns a dictionary mapping "BLACK" and "RED" to a tuple, indexed by square, of random 64-bit keys, along with the
+    key for red being the active player.
+    The keys come from a fixed seed so that hashes are the same in every process.
+    """
+    key_generator = random.Random(0x4A5A)
+    zobrist_keys = {}
+    for player in ("BLACK", "RED"):
+        zobrist_keys[player] = tuple(key_generator.getrandbits(64) for _ in range(board_size * board_size))
+    return zobrist_keys, key_generator.getrandbits(64)
+
+
+def _build_column_masks(board_size):
+    """
+    Takes as a parameter the number of rows and columns on the board.
+    Returns a list, indexed by column, of the masks of every square in that column.
+    """
+    column_masks = []
+    for col in range(board_size):
+        column_mask = 0
+        for row in range(board_size):
+            column_mask |= 1 << (row * board_size + col)
+        column_masks.append(column_mask)
+    return column_masks
+
+
+def _build_rays(board_size):
+    """
+    Takes as a parameter the number of rows and columns on the board.
+    Returns a dictionary mapping each direction to a list, indexed by square, of the masks of the squares between that
+    square and the edge of the board in that direction.
+    """
+    rays = {}
+    for direction, (row_step, col_step) in _DIRECTIONS.items():
+        rays[direction] = []
+        for index in range(board_size * board_size):
+            row, col = divmod(index, board_size)
+            ray = 0
+            row, col = row + row_step, col + col_step
+            while 0 <= row < board_size and 0 <= col < board_size:
+                ray |= 1 << (row * board_size + col)
+                row, col = row + row_step, col + col_step
+            rays[direction].append(ray)
+    return rays
+
+
+def _build_corner_captures(board_size):
+    """
+    Takes as a parameter the number of rows and columns on the board.
+    Returns a dictionary mapping each square next to a corner to a tuple of (corner mask, partner square mask) pairs.
+    A player moving to the square captures the corner if they occupy the partner square and their opponent occupies the
+    corner.
+    """
+    last = board_size - 1
+    corner_captures = {}
+    for corner_row, corner_col in ((0, 0), (0, last), (last, 0), (last, last)):
+        row_step = 1 if corner_row == 0 else -1
+        col_step = 1 if corner_col == 0 else -1
+        corner = corner_row * board_size + corner_col
+        beside = corner_row * board_size + corner_col + col_step
+        below = (corner_row + row_step) * board_size + corner_col
+        corner_captures.setdefault(beside, []).append((1 << corner, 1 << below))
+        corner_captures.setdefault(below, []).append((1 << corner, 1 << beside))
+    return {index: tuple(pairs) for index, pairs in corner_captures.items()}
+
+
+class _Geometry:
+    """
+    The lookup tables for one size of board, along with the move and capture calculations that use them.
+    Each size's tables are built once, by _get_geometry, and shared by every game and state of that size.
+    """
+
+    __slots__ = (
+        "board_size",
+        "num_squares",
+        "row_labels",
+        "square_names",
+        "square_indexes",
+        "column_masks",
+        "increasing_rays",
+        "decreasing_rays",
+        "neighbor_masks",
+        "line_masks",
+        "corner_captures",
+        "corner_neighbors",
+        "all_squares",
+        "zobrist_keys",
+        "zobrist_red_to_move",
+        "starting_black_board",
+        "starting_red_board",
+        "player_bytes",
+        "board_bytes",
+        "snapshot_size",
+    )
+
+    def __init__(self, board_size):
+        """
+        Takes as a parameter the number of rows and columns on the board.
+        Builds the tables for a board of that size.
+        """
+        self.board_size = board_size
+        self.num_squares = board_size * board_size
+        self.row_labels = string.ascii_lowercase[:board_size]
+        self.square_names = tuple(
+            row_label + str(col + 1) for row_label in self.row_labels for col in range(board_size)
+        )
+        self.square_indexes = {square: index for index, square in enumerate(self.square_names)}
+        self.column_masks = _build_column_masks(board_size)
+
+        rays = _build_rays(board_size)
+        self.increasing_rays = (rays["Right"], rays["Down"])
+        self.decreasing_rays = (rays["Left"], rays["Up"])
+        self.neighbor_masks = [
+            (right & -right) | (down & -down) | (1 << left.bit_length() >> 1) | (1 << up.bit_length() >> 1)
+            for right, down, left, up in zip(rays["Right"], rays["Down"], rays["Left"], rays["Up"])
+        ]
+        self.line_masks = [
+            right | down | left | up | 1 << index
+            for index, (right, down, left, up) in enumerate(zip(rays["Right"], rays["Down"], rays["Left"], rays["Up"]))
+        ]
+        self.corner_captures = _build_corner_captures(board_size)
+        self.corner_neighbors = sum(1 << index for index in self.corner_captures)
+        self.all_squares = (1 << self.num_squares) - 1
+        self.zobrist_keys, self.zobrist_red_to_move = _build_zobrist_keys(board_size)
+
+        self.starting_black_board = ((1 << board_size) - 1) << (board_size * (board_size - 1))
+        self.starting_red_board = (1 << board_size) - 1
+
+        # A snapshot packs each square into 2 bits (0 empty, 1 black, 2 red), followed by one byte for each player's
+        # captures and one byte holding the active player in bit 0 and the game state in bits 1 and 2.
+        self.player_bytes = (self.num_squares + 7) // 8
+        self.board_bytes = (2 * self.num_squares + 7) // 8
+        self.snapshot_size = self.board_bytes + 3
+
+    def squares_between(self, index_moved_from, index_moved_to):
+        """
+        Takes as parameters the indexes of the squares a player is attempting to move from and to, respectively.
+        Returns a mask of the squares between the two squares, or None if they do not share a row or column.
+        """
+        row_moved_from, col_moved_from = divmod(index_moved_from, self.board_size)
+        row_moved_to, col_moved_to = divmod(index_moved_to, self.board_size)
+        low_index, high_index = sorted((index_moved_from, index_moved_to))
+        squares_between = (1 << high_index) - (1 << (low_index + 1))
+
+        if row_moved_from == row_moved_to:
+            return squares_between
+        elif col_moved_from == col_moved_to:
+            return squares_between & self.column_masks[col_moved_from]
+        else:
+            return None
+
+    def legal_destinations(self, index_moved_from, occupied_squares):
+        """
+        Takes as parameters the index of the square a piece is moving from and a mask of the occupied squares.
+        Returns a mask of the squares the piece can slide to along its row and column.
+        """
+        legal_destinations = 0
+
+        for rays in self.increasing_rays:
+            ray = rays[index_moved_from]
+            blockers = ray & occupied_squares
+            if blockers:
+                legal_destinations |= ray & ((blockers & -blockers) - 1)
+            else:
+                legal_destinations |= ray
+
+        for rays in self.decreasing_rays:
+            ray = rays[index_moved_from]
+            blockers = ray & occupied_squares
+            if blockers:
+                legal_destinations |= ray & ~((1 << blockers.bit_length()) - 1)
+            else:
+                legal_destinations |= ray
+
+        return legal_destinations
+
+    def corner_capture(self, index_moved_to, active_board, opponent_board):
+        """
+        Takes as parameters the index of the square the active player moved to and the masks of the active player's and
+        their opponent's pieces, respectively.
+        Returns a mask of the active player's corner capture, if applicable.
+        """
+        captured_corners = 0
+        for corner, partner in self.corner_captures.get(index_moved_to, ()):
+            if active_board & partner and opponent_board & corner:
+                captured_corners |= corner
+        return captured_corners
+
+    def non_corner_capture(self, index_moved_to, active_board, opponent_board):
+        """
+        Takes as parameters the index of the square the active player moved to and the masks of the active player's and
+        their opponent's pieces, respectively.
+        Returns a mask of the active player's non-corner captures, if applicable.
+        In each direction, the nearest square not held by the opponent must hold one of the active player's pieces for
+        the opponent's pieces in between to be captured.
+        """
+        non_corner_captures = 0
+
+        for rays in self.increasing_rays:
+            ray = rays[index_moved_to]
+            blockers = ray & ~opponent_board
+            nearest_blocker = blockers & -blockers
+            if nearest_blocker & active_board:
+                non_corner_captures |= ray & (nearest_blocker - 1)
+
+        for rays in self.decreasing_rays:
+            ray = rays[index_moved_to]
+            blockers = ray & ~opponent_board
+            if blockers:
+                nearest_blocker = 1 << (blockers.bit_length() - 1)
+                if nearest_blocker & active_board:
+                    non_corner_captures |= ray & ~((nearest_blocker << 1) - 1)
+
+        return non_corner_captures
+
+    def captures(self, index_moved_to, active_board, opponent_board):
+        """
+        Takes as parameters the index of the square the active player moved to and the masks of the active player's and
+        their opponent's pieces, respectively, with the moved piece already on its new square.
+        Returns a mask of every square the move captures.
+        """
+        if not self.neighbor_masks[index_moved_to] & opponent_board:
+            return 0
+        captured_squares = self.corner_capture(index_moved_to, active_board, opponent_board)
+        return captured_squares | self.non_corner_capture(index_moved_to, active_board, opponent_board)
+
+
+_GEOMETRIES = {}
+
+
+def _get_geometry(board_size):
+    """
+    Takes as a parameter the number of rows and columns on the board.
+    Returns the shared _Geometry for boards of that size, building it the first time it is needed.
+    Raises a ValueError if the size is not from 3 to 26, as rows are labelled by letter.
+    """
+    geometry = _GEOMETRIES.get(board_size)
+    if geometry is None:
+        if not isinstance(board_size, int) or not _MIN_BOARD_SIZE <= board_size <= _MAX_BOARD_SIZE:
+            raise ValueError(
+                "board size must be from %d to %d: %r" % (_MIN_BOARD_SIZE, _MAX_BOARD_SIZE, board_size)
+            )
+        geometry = _Geometry(board_size)
+        _GEOMETRIES[board_size] = geometry
+    return geometry
+
+
+def _get_captures_to_win(board_size, captures_to_win):
+    """
+    Takes as parameters the number of rows and columns on the board and the captures needed to win, or None.
+    Returns the captures needed to win, defaulting to all but one of the opponent's pieces.
+    Raises a ValueError if it is not from 1 to the number of pieces each player has.
+    """
+    if captures_to_win is None:
+        return board_size - 1
+    if not isinstance(captures_to_win, int) or not 1 <= captures_to_win <= board_size:
+        raise ValueError("captures to win must be from 1 to %d: %r" % (board_size, captures_to_win))
+    return captures_to_win
+
+
+_STANDARD_GEOMETRY = _get_geometry(9)
+SNAPSHOT_SIZE = _STANDARD_GEOMETRY.snapshot_size
+_GAME_STATE_CODES = {"UNFINISHED": 0, "BLACK_WON": 1, "RED_WON": 2}
+_GAME_STATE_NAMES = {code: game_state for game_state, code in _GAME_STATE_CODES.items()}
+_SPREAD_BYTES = tuple(
+    sum((byte >> bit & 1) << (2 * bit) for bit in range(8)).to_bytes(2, "little") for byte in range(256)
+)
+_GATHER_NIBBLES = tuple(sum((byte >> (2 * bit) & 1) << bit for bit in range(4)) for byte in range(256))
+
+
+class GameState:
+    """
+    An immutable Hasami Shogi position: the masks of the black and red pieces, each player's captures, the active
+    player and the game state, along with the size of the board and the captures needed to win.
+    A state takes far less memory than a HasamiShogiGame, and as it can never change, it can be shared freely between
+    threads and between games. HasamiShogiGame.apply returns the state after a move, sharing every value the move
+    leaves unchanged with the state before it.
+    """
+
+    __slots__ = (
+        "black_board",
+        "red_board",
+        "black_captures",
+        "red_captures",
+        "active_player",
+        "game_state",
+        "board_size",
+        "captures_to_win",
+    )
+
+    def __init__(
+        self,
+        black_board,
+        red_board,
+        black_captures=0,
+        red_captures=0,
+        active_player="BLACK",
+        game_state="UNFINISHED",
+        board_size=9,
+        captures_to_win=None,
+    ):
+        """
+        Takes as parameters the masks of the black and red pieces and, optionally, each player's captures, the active
+        player, the game state, the number of rows and columns on the board and the captures needed to win, which
+        defaults to all but one of the opponent's pieces.
+        Initializes the state.
+        Raises a ValueError if the board size or captures needed to win are not valid.
+        """
+        _get_geometry(board_size)
+        object.__setattr__(self, "black_board", black_board)
+        object.__setattr__(self, "red_board", red_board)
+        object.__setattr__(self, "black_captures", black_captures)
+        object.__setattr__(self, "red_captures", red_captures)
+        object.__setattr__(self, "active_player", active_player)
+        object.__setattr__(self, "game_state", game_state)
+        object.__setattr__(self, "board_size", board_size)
+        object.__setattr__(self, "captures_to_win", _get_captures_to_win(board_size, captures_to_win))
+
+    def __setattr__(self, name, value):
+        """
+        Raises an AttributeError, as states cannot be changed.
+        """
+        raise AttributeError("GameState is immutable")
+
+    def __delattr__(self, name):
+        """
+        Raises an AttributeError, as states cannot be changed.
+        """
+        raise AttributeError("GameState is immutable")
+
+    def __reduce__(self):
+        """
+        Takes no parameters.
+        Returns the class and constructor arguments, so that states can be pickled.
+        """
+        return GameState, self._fields()
+
+    def __eq__(self, other):
+        """
+        Takes as a parameter another object.
+        Returns True if it is a state with the same position, captures, active player and game state.
+        """
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self):
+        """
+        Takes no parameters.
+        Returns a hash of the state, so that states can be used as dictionary keys.
+        """
+        return hash(self._fields())
+
+    def __repr__(self):
+        """
+        Takes no parameters.
+        Returns the state in position notation.
+        """
+        return "GameState(%r)" % HasamiShogiGame.from_state(self).to_position_notation()
+
+    def get_num_captured_pieces(self, player):
+        """
+        Takes as a parameter "BLACK" or "RED".
+        Returns the number of pieces that player has captured.
+        """
+        if player == "BLACK":
+            return self.black_captures
+        else:
+            return self.red_captures
+
+    def get_board_size(self):
+        """
+        Takes no parameters.
+        Returns the number of rows and columns on the board.
+        """
+        return self.board_size
+
+    def get_board_masks(self):
+        """
+        Takes no parameters.
+        Returns the masks of the black and red pieces, with bit row * board size + col set for each piece.
+        """
+        return self.black_board, self.red_board
+
+    def occupant_idx(self, index):
+        """
+        Takes as a parameter the index of a square.
+        Returns "BLACK", "RED", or "NONE" corresponding to a black, red, or no piece, respectively, in the square.
+        Raises a ValueError if the index is not on the board.
+        """
+        if not 0 <= index < self.board_size * self.board_size:
+            raise ValueError("square index is not on the board")
+        if self.black_board >> index & 1:
+            return "BLACK"
+        elif self.red_board >> index & 1:
+            return "RED"
+        else:
+            return "NONE"
+
+    def _fields(self):
+        """
+        Takes no parameters.
+        Returns a tuple of the state's values, in constructor order.
+        """
+        return (
+            self.black_board, self.red_board, self.black_captures, self.red_captures, self.active_player,
+            self.game_state, self.board_size, self.captures_to_win,
+        )
+
+
+STARTING_STATE = GameState(_STANDARD_GEOMETRY.starting_black_board, _STANDARD_GEOMETRY.starting_red_board)
 
 
 class HasamiShogiGame:
     """
     A representation of the Hasami Shogi game.
     This game is played according to the variant 1 rules, provided at https://en.wikipedia.org/wiki/Hasami_shogi.
+    Each player's pieces are stored as a mask, in which bit (row * board size + col) is set if the player occupies that
+    square.
+    The board is 9 by 9 by default, but may be any size from 3 to 26, with each player starting with a full row of
+    pieces. The lookup tables for each size are built once and shared by every game of that size.
     """
 
-    def __init__(self):
+    def __init__(self, board_size=9, captures_to_win=None):
         """
-        Takes no parameters.
+        Takes as optional parameters the number of rows and columns on the board and the captures needed to win, which
+        defaults to all but one of the opponent's pieces.
         Initializes the Hasami Shogi game.
+        Raises a ValueError if the board size is not from 3 to 26, or the captures needed to win are not from 1 to the
+        board size.
         """
+        geometry = _get_geometry(board_size)
+        self._geometry = geometry
+        self._captures_to_win = _get_captures_to_win(board_size, captures_to_win)
         self._game_state = "UNFINISHED"
         self._active_player = "BLACK"
         self._black_player_captures = 0
         self._red_player_captures = 0
-        self._board = [
-            [" ", "1", "2", "3", "4", "5", "6", "7", "8", "9"],
-            ["a", "R", "R", "R", "R", "R", "R", "R", "R", "R"],
-            ["b", ".", ".", ".", ".", ".", ".", ".", ".", "."],
-            ["c", ".", ".", ".", ".", ".", ".", ".", ".", "."],
-            ["d", ".", ".", ".", ".", ".", ".", ".", ".", "."],
-            ["e", ".", ".", ".", ".", ".", ".", ".", ".", "."],
-            ["f", ".", ".", ".", ".", ".", ".", ".", ".", "."],
-            ["g", ".", ".", ".", ".", ".", ".", ".", ".", "."],
-            ["h", ".", ".", ".", ".", ".", ".", ".", ".", "."],
-            ["i", "B", "B", "B", "B", "B", "B", "B", "B", "B"],
-        ]
+        self._boards = {"BLACK": geometry.starting_black_board, "RED": geometry.starting_red_board}
+        self._move_history = []
+        self._position_hash = self._compute_position_hash()
+        self._instrumentation = None
+        self._capture_threats = None
+        self._capture_threats_dirty = 0
 
     def get_game_state(self):
         """
@@ -55,69 +485,706 @@ class HasamiShogiGame:
         else:
             return self._red_player_captures
 
+    def get_board_size(self):
+        """
+        Takes no parameters.
+        Returns the number of rows and columns on the board.
+        """
+        return self._geometry.board_size
+
+    def get_captures_to_win(self):
+        """
+        Takes no parameters.
+        Returns the number of captures a player needs to win.
+        """
+        return self._captures_to_win
+
+    def get_board_masks(self):
+        """
+        Takes no parameters.
+        Returns the masks of the black and red pieces, with bit row * board size + col set for each piece.
+        """
+        return self._boards["BLACK"], self._boards["RED"]
+
+    def get_last_move(self):
+        """
+        Takes no parameters.
+        Returns the most recent move that can still be taken back as a (player who made it, square moved from, square
+        moved to, list of squares captured) tuple in algebraic notation, or None if there is none.
+        """
+        if not self._move_history:
+            return None
+        index_moved_from, index_moved_to, captured_squares, _, player = self._move_history[-1]
+        square_names = self._geometry.square_names
+        return (
+            player,
+            square_names[index_moved_from],
+            square_names[index_moved_to],
+            [square_names[index] for index in self._iter_squares(captured_squares)],
+        )
+
+    def get_position_hash(self):
+        """
+        Takes no parameters.
+        Returns a 64-bit hash of the pieces on the board and the active player.
+        The hash is kept up to date as pieces are added and removed, rather than recomputed for each position.
+        """
+        return self._position_hash
+
+    def enable_instrumentation(self, instrumentation=None):
+        """
+        Takes as an optional parameter a MoveInstrumentation to record into, which may be shared between games,
+        defaulting to a new one.
+        Has make_move time each phase of every move and count the moves not made by reason, until disabled.
+        Returns the MoveInstrumentation.
+        """
+        if instrumentation is None:
+            instrumentation = MoveInstrumentation()
+        self._instrumentation = instrumentation
+        return instrumentation
+
+    def disable_instrumentation(self):
+        """
+        Takes no parameters.
+        Stops recording timings and counts for make_move.
+        """
+        self._instrumentation = None
+
+    def get_instrumentation(self):
+        """
+        Takes no parameters.
+        Returns the MoveInstrumentation make_move is recording into, or None if instrumentation is disabled.
+        """
+        return self._instrumentation
+
     def get_square_occupant(self, square):
         """
         Takes as a parameter a square in algebraic notation.
         Returns "BLACK", "RED", or "NONE" corresponding to a black, red, or no piece, respectively, in the square.
         """
-        row, col = self._square_to_indexes(square)
-        square_occupant = self._board[row][col]
-        if square_occupant == "B":
+        return self._occupant_index(self._square_to_index(square))
+
+    def occupant_idx(self, index):
+        """
+        Takes as a parameter the index of a square, row * board size + col, where row 0 is "a" and col 0 is "1".
+        Returns "BLACK", "RED", or "NONE" corresponding to a black, red, or no piece, respectively, in the square.
+        Raises a ValueError if the index is not on the board.
+        """
+        if not 0 <= index < self._geometry.num_squares:
+            raise ValueError("square index is not on the board")
+        return self._occupant_index(index)
+
+    def _occupant_index(self, index):
+        """
+        Takes as a parameter the index of a square on the board.
+        Returns "BLACK", "RED", or "NONE" corresponding to a black, red, or no piece, respectively, in the square.
+        """
+        if self._boards["BLACK"] >> index & 1:
             return "BLACK"
-        elif square_occupant == "R":
+        elif self._boards["RED"] >> index & 1:
             return "RED"
         else:
             return "NONE"
 
+    @staticmethod
+    def square_to_idx(square, board_size=9):
+        """
+        Takes as a parameter a square in algebraic notation and, optionally, the number of rows and columns on the
+        board.
+        Returns the index of the square, as used by the integer square methods.
+        Raises a ValueError if the square is not on the board.
+        """
+        try:
+            return _get_geometry(board_size).square_indexes[square]
+        except KeyError:
+            raise ValueError("square is not on the board: " + str(square)) from None
+
+    @staticmethod
+    def get_square_names(board_size=9):
+        """
+        Takes as an optional parameter the number of rows and columns on the board.
+        Returns a tuple of every square on the board in algebraic notation, by index.
+        Raises a ValueError if the size is not from 3 to 26.
+        """
+        return _get_geometry(board_size).square_names
+
+    @staticmethod
+    def idx_to_square(index, board_size=9):
+        """
+        Takes as a parameter the index of a square and, optionally, the number of rows and columns on the board.
+        Returns the square in algebraic notation.
+        """
+        return _get_geometry(board_size).square_names[index]
+
+    def to_bytes(self):
+        """
+        Takes no parameters.
+        Returns a fixed-size snapshot of the board, capture counts, active player and game state, SNAPSHOT_SIZE bytes
+        long on the standard board.
+        The moves leading to the position are not included, so they cannot be taken back after restoring it.
+        """
+        board = self._spread_squares(self._boards["BLACK"]) | self._spread_squares(self._boards["RED"]) << 1
+        flags = (self._active_player == "RED") | _GAME_STATE_CODES[self._game_state] << 1
+        return board.to_bytes(self._geometry.board_bytes, "little") + bytes(
+            (self._black_player_captures, self._red_player_captures, flags)
+        )
+
+    @classmethod
+    def from_bytes(cls, snapshot, board_size=9, captures_to_win=None):
+        """
+        Takes as a parameter a snapshot returned by to_bytes and, optionally, the number of rows and columns on the
+        board and the captures needed to win, as given to the game the snapshot was taken from.
+        Returns a game in the snapshot's position, without replaying any moves.
+        Raises a ValueError if the snapshot is not valid.
+        """
+        game = cls(board_size, captures_to_win)
+        geometry = game._geometry
+        if len(snapshot) != geometry.snapshot_size:
+            raise ValueError("snapshot must be " + str(geometry.snapshot_size) + " bytes")
+        board = int.from_bytes(snapshot[:geometry.board_bytes], "little")
+        black_captures, red_captures, flags = snapshot[geometry.board_bytes:]
+        if board >> (2 * geometry.num_squares) or flags >> 3 or flags >> 1 not in _GAME_STATE_NAMES:
+            raise ValueError("snapshot is not valid")
+
+        black_board = game._gather_squares(board)
+        red_board = game._gather_squares(board >> 1)
+        if black_board & red_board:
+            raise ValueError("snapshot is not valid")
+
+        game._set_position(
+            black_board,
+            red_board,
+            black_captures,
+            red_captures,
+            "RED" if flags & 1 else "BLACK",
+            _GAME_STATE_NAMES[flags >> 1],
+        )
+        return game
+
+    def to_state(self):
+        """
+        Takes no parameters.
+        Returns an immutable GameState of the position, without the moves leading to it.
+        """
+        return GameState(
+            self._boards["BLACK"],
+            self._boards["RED"],
+            self._black_player_captures,
+            self._red_player_captures,
+            self._active_player,
+            self._game_state,
+            self._geometry.board_size,
+            self._captures_to_win,
+        )
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Takes as a parameter a GameState.
+        Returns a game in the state's position, on a board of the state's size.
+        """
+        game = cls(state.board_size, state.captures_to_win)
+        game._set_position(
+            state.black_board,
+            state.red_board,
+            state.black_captures,
+            state.red_captures,
+            state.active_player,
+            state.game_state,
+        )
+        return game
+
+    @staticmethod
+    def apply(state, move):
+        """
+        Takes as parameters a GameState and a (square moved from, square moved to) move in algebraic notation.
+        Returns the GameState after the move, leaving the given state as it was, without creating a game.
+        Raises a ValueError if the move is not legal.
+        """
+        return HasamiShogiGame.apply_idx(
+            state,
+            HasamiShogiGame.square_to_idx(move[0], state.board_size),
+            HasamiShogiGame.square_to_idx(move[1], state.board_size),
+        )
+
+    @staticmethod
+    def apply_idx(state, index_moved_from, index_moved_to):
+        """
+        Takes as parameters a GameState and the indexes of the squares moved from and to, respectively.
+        Returns the GameState after the move, as apply does.
+        Raises a ValueError if the move is not legal.
+        """
+        geometry = _get_geometry(state.board_size)
+        if not (0 <= index_moved_from < geometry.num_squares and 0 <= index_moved_to < geometry.num_squares):
+            raise ValueError("square index is not on the board")
+        if state.game_state != "UNFINISHED":
+            raise ValueError("the game is finished")
+
+        if state.active_player == "BLACK":
+            active_board, opponent_board, captures = state.black_board, state.red_board, state.black_captures
+        else:
+            active_board, opponent_board, captures = state.red_board, state.black_board, state.red_captures
+        legal_destinations = geometry.legal_destinations(index_moved_from, active_board | opponent_board)
+        if not (active_board >> index_moved_from & 1 and legal_destinations >> index_moved_to & 1):
+            raise ValueError(
+                "illegal move: %s-%s" % (geometry.square_names[index_moved_from], geometry.square_names[index_moved_to])
+            )
+
+        active_board ^= 1 << index_moved_from | 1 << index_moved_to
+        game_state = "UNFINISHED"
+        captured_squares = geometry.captures(index_moved_to, active_board, opponent_board)
+        if captured_squares:
+            opponent_board &= ~captured_squares
+            captures += HasamiShogiGame._count_squares(captured_squares)
+            if captures >= state.captures_to_win:
+                game_state = state.active_player + "_WON"
+
+        if state.active_player == "BLACK":
+            return GameState(
+                active_board, opponent_board, captures, state.red_captures, "RED", game_state, state.board_size,
+                state.captures_to_win,
+            )
+        return GameState(
+            opponent_board, active_board, state.black_captures, captures, "BLACK", game_state, state.board_size,
+            state.captures_to_win,
+        )
+
+    def to_position_notation(self):
+        """
+        Takes no parameters.
+        Returns the position as a line of text: the rows from "a" down separated by "/", with "B" and "R" for pieces
+        and a number for each run of empty squares, then "B" or "R" for the active player, then each player's captures.
+        For example, the starting position is "RRRRRRRRR/9/9/9/9/9/9/9/BBBBBBBBB B 0 0".
+        """
+        board_size = self._geometry.board_size
+        rows = []
+        for row in range(board_size):
+            row_text, empty_squares = "", 0
+            for index in range(row * board_size, (row + 1) * board_size):
+                occupant = self._occupant_index(index)
+                if occupant == "NONE":
+                    empty_squares += 1
+                    continue
+                if empty_squares:
+                    row_text += str(empty_squares)
+                    empty_squares = 0
+                row_text += occupant[0]
+            if empty_squares:
+                row_text += str(empty_squares)
+            rows.append(row_text)
+
+        return "%s %s %d %d" % (
+            "/".join(rows),
+            self._active_player[0],
+            self._black_player_captures,
+            self._red_player_captures,
+        )
+
+    @classmethod
+    def from_position_notation(cls, notation, captures_to_win=None):
+        """
+        Takes as a parameter a position in the notation returned by to_position_notation and, optionally, the captures
+        needed to win.
+        Returns a game in that position, on a board with as many columns as the notation has rows, with the game state
+        set from the capture counts.
+        Raises a ValueError if the notation is not valid.
+        """
+        fields = notation.split()
+        if len(fields) != 4 or fields[1] not in ("B", "R"):
+            raise ValueError("position notation is not valid: " + notation)
+        rows = fields[0].split("/")
+        board_size = len(rows)
+        if not _MIN_BOARD_SIZE <= board_size <= _MAX_BOARD_SIZE:
+            raise ValueError("position notation is not valid: " + notation)
+        game = cls(board_size, captures_to_win)
+
+        boards = {"B": 0, "R": 0}
+        for row, row_text in enumerate(rows):
+            col, empty_squares = 0, ""
+            for character in row_text + "/":
+                if character.isdigit() and (empty_squares or character != "0"):
+                    empty_squares += character
+                    continue
+                col += int(empty_squares or 0)
+                empty_squares = ""
+                if character in boards and col < board_size:
+                    boards[character] |= 1 << (row * board_size + col)
+                    col += 1
+                elif character != "/":
+                    raise ValueError("position notation is not valid: " + notation)
+            if col != board_size:
+                raise ValueError("position notation is not valid: " + notation)
+
+        black_captures, red_captures = int(fields[2]), int(fields[3])
+        if black_captures >= game._captures_to_win:
+            game_state = "BLACK_WON"
+        elif red_captures >= game._captures_to_win:
+            game_state = "RED_WON"
+        else:
+            game_state = "UNFINISHED"
+
+        game._set_position(
+            boards["B"],
+            boards["R"],
+            black_captures,
+            red_captures,
+            "BLACK" if fields[1] == "B" else "RED",
+            game_state,
+        )
+        return game
+
     def make_move(self, square_moved_from, square_moved_to):
         """
         Takes as parameters the squares a player is attempting to move from and to, respectively, in algebraic notation.
         Determines if the move is valid and legal.
         If it is not, returns False.
         If it is, moves the player, captures applicable pieces, sets the game state and active player, and returns True.
+        A square that is not on the board, such as "a0" or "a10", makes the move invalid rather than raising an error.
         """
-        if self._game_state != "UNFINISHED":
+        try:
+            index_moved_from = self._square_to_index(square_moved_from)
+            index_moved_to = self._square_to_index(square_moved_to)
+        except ValueError:
             return False
-        elif not self._legal_move(square_moved_from, square_moved_to):
+        return self._make_move_index(index_moved_from, index_moved_to)
+
+    def make_move_idx(self, index_moved_from, index_moved_to):
+        """
+        Takes as parameters the indexes of the squares a player is attempting to move from and to, respectively.
+        Makes the move as make_move does, without converting from algebraic notation.
+        Returns True if the move was made, else returns False.
+        Raises a ValueError if either index is not on the board.
+        """
+        num_squares = self._geometry.num_squares
+        if not (0 <= index_moved_from < num_squares and 0 <= index_moved_to < num_squares):
+            raise ValueError("square index is not on the board")
+        return self._make_move_index(index_moved_from, index_moved_to)
+
+    def unmake_move(self):
+        """
+        Takes no parameters.
+        Takes back the most recent move, restoring the moved piece, any captured pieces, the capture count, the game
+        state and the active player.
+        Returns True if a move was taken back, or False if no moves have been made.
+        """
+        if not self._move_history:
             return False
-        else:
-            self._set_board("REMOVE", square_moved_from)
-            self._set_board("ADD", square_moved_to)
-            self._capture_pieces(square_moved_from, square_moved_to)
-            self._set_game_state()
+
+        (
+            index_moved_from,
+            index_moved_to,
+            captured_squares,
+            previous_game_state,
+            previous_active_player,
+        ) = self._move_history.pop()
+
+        if self._active_player != previous_active_player:
             self._set_active_player()
-            return True
+        self._game_state = previous_game_state
+
+        if captured_squares:
+            self._set_num_captured_pieces(-self._count_squares(captured_squares))
+            self._set_board("ADD", captured_squares, self._get_opponent_player())
+        self._set_board("REMOVE", 1 << index_moved_to)
+        self._set_board("ADD", 1 << index_moved_from)
+        return True
+
+    def push(self, square_moved_from, square_moved_to):
+        """
+        Takes as parameters the squares a player is attempting to move from and to, respectively, in algebraic notation.
+        Makes the move as make_move does, so that pop can later take it back.
+        Returns True if the move was made, else returns False.
+        """
+        return self.make_move(square_moved_from, square_moved_to)
+
+    def pop(self):
+        """
+        Takes no parameters.
+        Takes back the most recent move, as unmake_move does.
+        Returns the move taken back as a (square moved from, square moved to) pair in algebraic notation.
+        Raises an IndexError if no moves have been made.
+        """
+        if not self._move_history:
+            raise IndexError("pop from a game with no moves")
+
+        index_moved_from, index_moved_to = self._move_history[-1][:2]
+        self.unmake_move()
+        square_names = self._geometry.square_names
+        return square_names[index_moved_from], square_names[index_moved_to]
+
+    def forget_moves(self, moves_to_keep=0):
+        """
+        Takes as an optional parameter the number of most recent moves to keep.
+        Forgets every older move, so that it can no longer be taken back, bounding the memory a long-lived game holds.
+        """
+        del self._move_history[:max(0, len(self._move_history) - moves_to_keep)]
+
+    def iter_legal_moves(self, square=None):
+        """
+        Takes as an optional parameter a square in algebraic notation.
+        Yields each legal move for the active player as a (square moved from, square moved to) pair in algebraic
+        notation, limited to moves from the provided square if one is given.
+        Yields nothing once the game is finished.
+        """
+        if square is None:
+            squares_moved_from = None
+        else:
+            squares_moved_from = 1 << self._square_to_index(square)
+
+        square_names = self._geometry.square_names
+        for index_moved_from, index_moved_to in self._iter_legal_move_indexes(squares_moved_from):
+            yield square_names[index_moved_from], square_names[index_moved_to]
+
+    def iter_legal_moves_idx(self, index=None):
+        """
+        Takes as an optional parameter the index of a square.
+        Yields each legal move for the active player as a (index moved from, index moved to) pair, limited to moves from
+        the provided square if one is given.
+        Yields nothing once the game is finished.
+        Raises a ValueError if the index is not on the board.
+        """
+        if index is None:
+            return self._iter_legal_move_indexes()
+        if not 0 <= index < self._geometry.num_squares:
+            raise ValueError("square index is not on the board")
+        return self._iter_legal_move_indexes(1 << index)
+
+    def legal_moves(self, square=None):
+        """
+        Takes as an optional parameter a square in algebraic notation.
+        Returns a list of the legal moves for the active player, as described in iter_legal_moves.
+        """
+        return list(self.iter_legal_moves(square))
+
+    def get_capture_threats(self, player=None):
+        """
+        Takes as an optional parameter "BLACK" or "RED", defaulting to the active player.
+        Returns a dictionary mapping each empty square, in algebraic notation, that one of the player's pieces could
+        move to and capture from, to a sorted list of the squares that would be captured.
+        Returns an empty dictionary once the game is finished.
+        """
+        square_names = self._geometry.square_names
+        return {
+            square_names[index]: [square_names[captured] for captured in self._iter_squares(captured_squares)]
+            for index, captured_squares in self.capture_threats_idx(player).items()
+        }
+
+    def capture_threats_idx(self, player=None):
+        """
+        Takes as an optional parameter "BLACK" or "RED", defaulting to the active player.
+        Returns a dictionary mapping the index of each empty square that one of the player's pieces could move to and
+        capture from, to a mask of the squares that would be captured.
+        Returns an empty dictionary once the game is finished.
+        """
+        if self._game_state != "UNFINISHED":
+            return {}
+        self._update_capture_threats()
+        capture_threats = self._capture_threats[player or self._active_player]
+        return {index: captured_squares for index, captured_squares in enumerate(capture_threats) if captured_squares}
+
+    def get_threatened_pieces(self, player=None):
+        """
+        Takes as an optional parameter "BLACK" or "RED", defaulting to the active player.
+        Returns a sorted list of the player's pieces, in algebraic notation, that their opponent could capture with
+        their next move.
+        Returns an empty list once the game is finished.
+        """
+        if player is None:
+            player = self._active_player
+        opponent = "RED" if player == "BLACK" else "BLACK"
+        threatened_squares = 0
+        for captured_squares in self.capture_threats_idx(opponent).values():
+            threatened_squares |= captured_squares
+        return [self._geometry.square_names[index] for index in self._iter_squares(threatened_squares)]
 
     def print_board(self):
         """
         Takes no parameters.
         Prints the board in an easy-to-read format.
         """
-        for row in self._board:
-            print(" ".join(row))
+        board_size = self._geometry.board_size
+        width = len(str(board_size))
+        print("  " + " ".join(str(col).rjust(width) for col in range(1, board_size + 1)))
+        for row, row_label in enumerate(self._geometry.row_labels):
+            squares = [row_label]
+            for index in range(row * board_size, (row + 1) * board_size):
+                if self._boards["BLACK"] >> index & 1:
+                    squares.append("B".rjust(width))
+                elif self._boards["RED"] >> index & 1:
+                    squares.append("R".rjust(width))
+                else:
+                    squares.append(".".rjust(width))
+            print(" ".join(squares))
 
-    @staticmethod
-    def _square_to_indexes(square):
+    def _square_to_index(self, square):
         """
         Takes as a parameter a square in algebraic notation.
-        Returns the index of the row and column corresponding to the square.
+        Returns the index of the square's bit in the board masks.
+        Raises a ValueError if the square is not on the board.
+        """
+        try:
+            return self._geometry.square_indexes[square]
+        except KeyError:
+            raise ValueError("square is not on the board: " + str(square)) from None
+
+    def _set_position(self, black_board, red_board, black_captures, red_captures, active_player, game_state):
+        """
+        Takes as parameters the masks of the black and red pieces, each player's captures, the active player and the
+        game state.
+        Sets the game to that position, forgetting any moves made so far.
+        """
+        self._boards = {"BLACK": black_board, "RED": red_board}
+        self._black_player_captures = black_captures
+        self._red_player_captures = red_captures
+        self._active_player = active_player
+        self._game_state = game_state
+        self._move_history = []
+        self._position_hash = self._compute_position_hash()
+        self._capture_threats = None
+        self._capture_threats_dirty = 0
+
+    def _spread_squares(self, squares):
+        """
+        Takes as a parameter a mask of squares.
+        Returns the mask with the bit for square i moved to bit 2 * i.
+        """
+        return int.from_bytes(
+            b"".join(_SPREAD_BYTES[byte] for byte in squares.to_bytes(self._geometry.player_bytes, "little")), "little"
+        )
+
+    def _gather_squares(self, spread_squares):
+        """
+        Takes as a parameter a mask with the bit for square i at bit 2 * i, as returned by _spread_squares.
+        Returns the mask of squares, ignoring the odd bits.
+        """
+        spread_bytes = spread_squares.to_bytes(2 * self._geometry.player_bytes + 1, "little")
+        return int.from_bytes(
+            bytes(
+                _GATHER_NIBBLES[low_byte] | _GATHER_NIBBLES[high_byte] << 4
+                for low_byte, high_byte in zip(spread_bytes[0::2], spread_bytes[1::2])
+            ),
+            "little",
+        )
+
+    def _make_move_index(self, index_moved_from, index_moved_to):
+        """
+        Takes as parameters the indexes of the squares a player is attempting to move from and to, respectively.
+        Determines if the move is legal and, if it is, makes it.
+        Returns True if the move was made, else returns False.
+        """
+        if self._instrumentation is not None:
+            return self._make_move_instrumented(index_moved_from, index_moved_to)
+        elif self._game_state != "UNFINISHED":
+            return False
+        elif not self._legal_move(index_moved_from, index_moved_to):
+            return False
+        else:
+            self._apply_move(index_moved_from, index_moved_to)
+            return True
+
+    def _make_move_instrumented(self, index_moved_from, index_moved_to):
+        """
+        Takes as parameters the indexes of the squares a player is attempting to move from and to, respectively.
+        Makes the move as _make_move_index does, recording the time taken by each phase and the reason the move is not
+        legal, if it is not, into the game's instrumentation. The move goes through the same steps as _apply_move, with
+        the clock read between them.
+        Returns True if the move was made, else returns False.
+        """
+        instrumentation = self._instrumentation
+        clock = time.perf_counter
+
+        start_time = clock()
+        if self._game_state != "UNFINISHED":
+            rejection_reason = "GAME_OVER"
+        else:
+            rejection_reason = self._illegal_move_reason(index_moved_from, index_moved_to)
+        instrumentation.record_phase("LEGALITY", clock() - start_time)
+        if rejection_reason is not None:
+            instrumentation.record_rejection(rejection_reason)
+            return False
+
+        previous_game_state = self._game_state
+        previous_active_player = self._active_player
+
+        start_time = clock()
+        self._move_piece(index_moved_from, index_moved_to)
+        board_update_seconds = clock() - start_time
+
+        active_board = self._boards[self._active_player]
+        opponent_board = self._boards[self._get_opponent_player()]
+        start_time = clock()
+        captured_squares = self._corner_capture(index_moved_to, active_board, opponent_board)
+        instrumentation.record_phase("CORNER_CAPTURE", clock() - start_time)
+        start_time = clock()
+        captured_squares |= self._non_corner_capture(index_moved_to, active_board, opponent_board)
+        instrumentation.record_phase("NON_CORNER_CAPTURE", clock() - start_time)
+
+        start_time = clock()
+        self._remove_captured_pieces(captured_squares)
+        instrumentation.record_phase("BOARD_UPDATE", board_update_seconds + clock() - start_time)
+
+        start_time = clock()
+        self._end_move(index_moved_from, index_moved_to, captured_squares, previous_game_state, previous_active_player)
+        instrumentation.record_phase("GAME_STATE_UPDATE", clock() - start_time)
+
+        instrumentation.record_move()
+        return True
+
+    def _illegal_move_reason(self, index_moved_from, index_moved_to):
+        """
+        Takes as parameters the indexes of the squares a player is attempting to move from and to, respectively.
+        Returns the first reason that the move is not legal, or None if it is.
+        """
+        if not self._boards[self._active_player] >> index_moved_from & 1:
+            return "NOT_ACTIVE_PLAYER_PIECE"
+
+        if index_moved_from == index_moved_to:
+            return "SAME_SQUARE"
+
+        occupied_squares = self._boards["BLACK"] | self._boards["RED"]
+        if occupied_squares >> index_moved_to & 1:
+            return "OCCUPIED_DESTINATION"
+
+        squares_between = self._squares_between(index_moved_from, index_moved_to)
+        if squares_between is None:
+            return "NOT_STRAIGHT_LINE"
+        elif squares_between & occupied_squares:
+            return "PATH_BLOCKED"
+
+        return None
+
+    @staticmethod
+    def _iter_squares(squares):
+        """
+        Takes as a parameter a mask of squares.
+        Yields the index of each square in the mask, in ascending order.
         """
-        row = [" ", "a", "b", "c", "d", "e", "f", "g", "h", "i"].index(square[0])
-        col = int(square[1])
-        return row, col
+        while squares:
+            lowest_square = squares & -squares
+            yield lowest_square.bit_length() - 1
+            squares ^= lowest_square
 
     @staticmethod
-    def _rows_and_cols_to_squares(rows, cols):
+    def _count_squares(squares):
         """
-        Takes as parameters a list of rows and a list of columns, respectively.
-        Converts the row and column at the same index in each list to a single square.
-        Returns a list of the corresponding squares.
+        Takes as a parameter a mask of squares.
+        Returns the number of squares in the mask.
         """
-        squares = []
-        for row in rows:
-            for col in cols:
-                squares.append(str([" ", "a", "b", "c", "d", "e", "f", "g", "h", "i"][row]) + str(col))
-        return squares
+        return bin(squares).count("1")
+
+    def _compute_position_hash(self):
+        """
+        Takes no parameters.
+        Returns the hash of the current position, computed from every piece on the board.
+        """
+        geometry = self._geometry
+        position_hash = 0
+        for player in ("BLACK", "RED"):
+            for index in self._iter_squares(self._boards[player]):
+                position_hash ^= geometry.zobrist_keys[player][index]
+        if self._active_player == "RED":
+            position_hash ^= geometry.zobrist_red_to_move
+        return position_hash
 
     def _set_game_state(self):
         """
@@ -125,9 +1192,9 @@ class HasamiShogiGame:
         Sets the game state to "BLACK_WON" or "RED_WON", if applicable.
         If no player has won, the game state will remain "UNFINISHED".
         """
-        if self._active_player == "BLACK" and self._black_player_captures >= 8:
+        if self._active_player == "BLACK" and self._black_player_captures >= self._captures_to_win:
             self._game_state = "BLACK_WON"
-        elif self._active_player == "RED" and self._red_player_captures >= 8:
+        elif self._active_player == "RED" and self._red_player_captures >= self._captures_to_win:
             self._game_state = "RED_WON"
 
     def _set_active_player(self):
@@ -136,6 +1203,7 @@ class HasamiShogiGame:
         Sets the active player to the previously-inactive player, effectively swapping the active player.
         """
         self._active_player = self._get_opponent_player()
+        self._position_hash ^= self._geometry.zobrist_red_to_move
 
     def _get_opponent_player(self):
         """
@@ -157,194 +1225,212 @@ class HasamiShogiGame:
         else:
             self._red_player_captures += pieces_captured
 
-    def _set_board(self, action, square):
+    def _set_board(self, action, squares, player=None):
         """
-        Takes as parameters the action "REMOVE" or "ADD" and the corresponding square.
-        If the action is "REMOVE", removes the player present in the provided square.
-        If the action is "ADD", adds the active player to the provided square.
+        Takes as parameters the action "REMOVE" or "ADD", a mask of the corresponding squares and, optionally, the
+        player to add.
+        If the action is "REMOVE", removes the players present in the provided squares.
+        If the action is "ADD", adds the provided player, or the active player by default, to the provided squares.
+        Updates the position hash for each square that changes, and marks the squares as changed for the capture threat
+        index, if it has been built.
         """
-        row, col = self._square_to_indexes(square)
+        zobrist_keys = self._geometry.zobrist_keys
+        if self._capture_threats is not None:
+            self._capture_threats_dirty |= squares
         if action == "REMOVE":
-            self._board[row][col] = "."
+            for player in ("BLACK", "RED"):
+                for index in self._iter_squares(self._boards[player] & squares):
+                    self._position_hash ^= zobrist_keys[player][index]
+                self._boards[player] &= ~squares
         elif action == "ADD":
-            if self._active_player == "BLACK":
-                self._board[row][col] = "B"
-            else:
-                self._board[row][col] = "R"
+            player = player or self._active_player
+            for index in self._iter_squares(squares & ~self._boards[player]):
+                self._position_hash ^= zobrist_keys[player][index]
+            self._boards[player] |= squares
 
-    def _player_direction(self, square_moved_from, square_moved_to):
+    def _apply_move(self, index_moved_from, index_moved_to):
         """
-        Takes as parameters the squares a player is attempting to move from and to, respectively, in algebraic notation.
-        Returns the direction of the player's movement.
+        Takes as parameters the indexes of the squares the active player is moving from and to, respectively.
+        Moves the player without checking that the move is legal, captures applicable pieces, sets the game state and
+        active player, and records what changed so that unmake_move can take the move back.
+        Returns a mask of the captured squares.
         """
-        row_moved_from, col_moved_from = self._square_to_indexes(square_moved_from)
-        row_moved_to, col_moved_to = self._square_to_indexes(square_moved_to)
+        previous_game_state = self._game_state
+        previous_active_player = self._active_player
 
-        if row_moved_from == row_moved_to:
-            if col_moved_from < col_moved_to:
-                return "Right"
-            else:
-                return "Left"
-        elif col_moved_from == col_moved_to:
-            if row_moved_from > row_moved_to:
-                return "Up"
-            else:
-                return "Down"
+        self._move_piece(index_moved_from, index_moved_to)
+        captured_squares = self._capture_pieces(index_moved_to)
+        self._end_move(index_moved_from, index_moved_to, captured_squares, previous_game_state, previous_active_player)
+        return captured_squares
 
-    def _squares_to_check_for_legal_move(self, square_moved_from, square_moved_to):
+    def _move_piece(self, index_moved_from, index_moved_to):
         """
-        Takes as parameters the squares a player is attempting to move from and to, respectively, in algebraic notation.
-        Returns a list of the squares in the provided direction between the square moved from and the square moved to.
+        Takes as parameters the indexes of the squares the active player is moving from and to, respectively.
+        Moves the active player's piece between the squares.
         """
-        rows_to_check, cols_to_check = [], []
+        self._set_board("REMOVE", 1 << index_moved_from)
+        self._set_board("ADD", 1 << index_moved_to)
 
-        player_direction = self._player_direction(square_moved_from, square_moved_to)
-        row_moved_from, col_moved_from = self._square_to_indexes(square_moved_from)
-        row_moved_to, col_moved_to = self._square_to_indexes(square_moved_to)
-
-        if player_direction == "Right":
-            rows_to_check.append(row_moved_from)
-            cols_to_check += list(range(col_moved_from + 1, col_moved_to))
-        elif player_direction == "Left":
-            rows_to_check.append(row_moved_from)
-            cols_to_check += list(range(col_moved_to, col_moved_from))
-        elif player_direction == "Up":
-            cols_to_check.append(col_moved_from)
-            rows_to_check += list(range(row_moved_to, row_moved_from))
-        elif player_direction == "Down":
-            cols_to_check.append(col_moved_from)
-            rows_to_check += list(range(row_moved_from + 1, row_moved_to))
+    def _end_move(self, index_moved_from, index_moved_to, captured_squares, previous_game_state,
+                  previous_active_player):
+        """
+        Takes as parameters the indexes of the squares moved from and to, a mask of the squares captured, and the game
+        state and active player before the move.
+        Sets the game state and active player, and records the move so that unmake_move can take it back.
+        """
+        self._set_game_state()
+        self._set_active_player()
+        self._move_history.append(
+            (index_moved_from, index_moved_to, captured_squares, previous_game_state, previous_active_player)
+        )
 
-        return self._rows_and_cols_to_squares(rows_to_check, cols_to_check)
+    def _squares_between(self, index_moved_from, index_moved_to):
+        """
+        Takes as parameters the indexes of the squares a player is attempting to move from and to, respectively.
+        Returns a mask of the squares between the two squares, or None if they do not share a row or column.
+        """
+        return self._geometry.squares_between(index_moved_from, index_moved_to)
 
-    def _legal_move(self, square_moved_from, square_moved_to):
+    def _legal_move(self, index_moved_from, index_moved_to):
         """
-        Takes as parameters the squares a player is attempting to move from and to, respectively, in algebraic notation.
+        Takes as parameters the indexes of the squares a player is attempting to move from and to, respectively.
         Returns True if the move is legal, else returns False.
         """
-        if self.get_square_occupant(square_moved_from) != self._active_player:
-            return False
-
-        if square_moved_from == square_moved_to:
-            return False
+        return self._illegal_move_reason(index_moved_from, index_moved_to) is None
 
-        row_moved_from, col_moved_from = self._square_to_indexes(square_moved_from)
-        row_moved_to, col_moved_to = self._square_to_indexes(square_moved_to)
-        if row_moved_from != row_moved_to and col_moved_from != col_moved_to:
-            return False
+    def _legal_destinations(self, index_moved_from, occupied_squares):
+        """
+        Takes as parameters the index of the square a piece is moving from and a mask of the occupied squares.
+        Returns a mask of the squares the piece can slide to along its row and column.
+        """
+        return self._geometry.legal_destinations(index_moved_from, occupied_squares)
 
-        if self.get_square_occupant(square_moved_to) != "NONE":
-            return False
+    def _iter_legal_move_indexes(self, squares_moved_from=None):
+        """
+        Takes as an optional parameter a mask of the squares to move from, defaulting to every square.
+        Yields each legal move for the active player as a (index moved from, index moved to) pair.
+        Yields nothing once the game is finished.
+        """
+        if self._game_state != "UNFINISHED":
+            return
 
-        for square in self._squares_to_check_for_legal_move(square_moved_from, square_moved_to):
-            if self.get_square_occupant(square) != "NONE":
-                return False
+        active_board = self._boards[self._active_player]
+        if squares_moved_from is not None:
+            active_board &= squares_moved_from
+        occupied_squares = self._boards["BLACK"] | self._boards["RED"]
 
-        return True
+        legal_destinations = self._geometry.legal_destinations
+        for index_moved_from in self._iter_squares(active_board):
+            for index_moved_to in self._iter_squares(legal_destinations(index_moved_from, occupied_squares)):
+                yield index_moved_from, index_moved_to
 
-    def _corner_capture(self, square_moved_to):
+    def _corner_capture(self, index_moved_to, active_board, opponent_board):
         """
-        Takes as a parameter the square the active player moved to, in algebraic notation.
-        Returns the active player's corner capture, if applicable.
+        Takes as parameters the index of the square the active player moved to and the masks of the active player's and
+        their opponent's pieces, respectively.
+        Returns a mask of the active player's corner capture, if applicable.
         """
-        corners_and_capture_locations = {"a1": ("a2", "b1"), "a9": ("a8", "b9"), "i1": ("h1", "i2"), "i9": ("h9", "i8")}
+        return self._geometry.corner_capture(index_moved_to, active_board, opponent_board)
 
-        for corner, capture_location in corners_and_capture_locations.items():
-            if square_moved_to == capture_location[0]:
-                if self.get_square_occupant(capture_location[1]) == self._active_player:
-                    if self.get_square_occupant(corner) == self._get_opponent_player():
-                        return corner
-            elif square_moved_to == capture_location[1]:
-                if self.get_square_occupant(capture_location[0]) == self._active_player:
-                    if self.get_square_occupant(corner) == self._get_opponent_player():
-                        return corner
-
-    def _squares_to_check_for_non_corner_capture(self, direction_to_check, square_moved_to):
+    def _non_corner_capture(self, index_moved_to, active_board, opponent_board):
         """
-        Takes as parameters the direction to check and the square the active player moved to, in algebraic notation.
-        Returns a list of the squares in the provided direction between the square moved to and the edge of the board.
+        Takes as parameters the index of the square the active player moved to and the masks of the active player's and
+        their opponent's pieces, respectively.
+        Returns a mask of the active player's non-corner captures, if applicable.
         """
-        row_moved_to, col_moved_to = self._square_to_indexes(square_moved_to)
-
-        rows_to_check, cols_to_check = [], []
-
-        if direction_to_check == "Right":
-            rows_to_check.append(row_moved_to)
-            cols_to_check += list(range(col_moved_to + 1, 10))
-        elif direction_to_check == "Left":
-            rows_to_check.append(row_moved_to)
-            cols_to_check += list(range(col_moved_to - 1, 0, -1))
-        elif direction_to_check == "Up":
-            rows_to_check += list(range(row_moved_to - 1, 0, -1))
-            cols_to_check.append(col_moved_to)
-        elif direction_to_check == "Down":
-            rows_to_check += list(range(row_moved_to + 1, 10))
-            cols_to_check.append(col_moved_to)
+        return self._geometry.non_corner_capture(index_moved_to, active_board, opponent_board)
 
-        return self._rows_and_cols_to_squares(rows_to_check, cols_to_check)
-
-    def _directions_to_check_for_non_corner_capture(self, square_moved_from, square_moved_to):
+    def _captures_for_move(self, index_moved_from, index_moved_to):
         """
-        Takes as parameters the squares the active player moved from and to, respectively, in algebraic notation.
-        Returns a dictionary containing the squares to check for captures in each applicable direction.
+        Takes as parameters the indexes of the squares the active player would move from and to, respectively.
+        Returns a mask of the squares the move would capture, without making the move.
         """
-        player_direction = self._player_direction(square_moved_from, square_moved_to)
-        directions_to_check = {"Right": [], "Left": [], "Down": [], "Up": []}
+        active_board = self._boards[self._active_player] ^ (1 << index_moved_from) ^ (1 << index_moved_to)
+        return self._geometry.captures(index_moved_to, active_board, self._boards[self._get_opponent_player()])
 
-        if player_direction == "Right":
-            del directions_to_check["Left"]
-        elif player_direction == "Left":
-            del directions_to_check["Right"]
-        elif player_direction == "Up":
-            del directions_to_check["Down"]
-        elif player_direction == "Down":
-            del directions_to_check["Up"]
+    def _update_capture_threats(self):
+        """
+        Takes no parameters.
+        Brings the capture threat index up to date with the board, recomputing only the squares whose row or column
+        holds a square that has changed since the last update, along with the squares next to the corners.
+        The index is built on first use, so that games which never ask for capture threats do not hold it or keep it up
+        to date.
+        """
+        if self._capture_threats is None:
+            num_squares = self._geometry.num_squares
+            self._capture_threats = {"BLACK": [0] * num_squares, "RED": [0] * num_squares}
+            self._capture_threats_dirty = self._geometry.all_squares
+        changed_squares = self._capture_threats_dirty
+        if not changed_squares:
+            return
+        self._capture_threats_dirty = 0
 
-        for direction in directions_to_check:
-            directions_to_check[direction] = self._squares_to_check_for_non_corner_capture(direction, square_moved_to)
+        geometry = self._geometry
+        squares_to_update = geometry.corner_neighbors
+        for index in self._iter_squares(changed_squares):
+            squares_to_update |= geometry.line_masks[index]
 
-        return directions_to_check
+        occupied_squares = self._boards["BLACK"] | self._boards["RED"]
+        for player, opponent in (("BLACK", "RED"), ("RED", "BLACK")):
+            capture_threats = self._capture_threats[player]
+            active_board = self._boards[player]
+            opponent_board = self._boards[opponent]
+            for index in self._iter_squares(squares_to_update & occupied_squares):
+                capture_threats[index] = 0
+            for index in self._iter_squares(squares_to_update & ~occupied_squares):
+                if geometry.neighbor_masks[index] & opponent_board:
+                    capture_threats[index] = self._capture_threat(index, active_board, opponent_board, occupied_squares)
+                else:
+                    capture_threats[index] = 0
 
-    def _non_corner_capture(self, square_moved_from, square_moved_to):
+    def _capture_threat(self, index, active_board, opponent_board, occupied_squares):
         """
-        Takes as parameters the squares the active player moved from and to, respectively, in algebraic notation.
-        Returns the active player's non-corner captures, if applicable.
+        Takes as parameters the index of a square and the masks of a player's pieces, their opponent's pieces and every
+        occupied square.
+        Returns a mask of the squares the player would capture by moving one of their pieces to the empty square, or 0
+        if none of their pieces can reach it.
+        The capture does not depend on which piece moves, as the square it leaves is never part of the capture.
         """
-        non_corner_captures = []
-
-        directions_to_check = self._directions_to_check_for_non_corner_capture(square_moved_from, square_moved_to)
-
-        for squares_to_check in directions_to_check.values():
-            potential_captured_squares = []
-            for square_to_check in squares_to_check:
-                square_occupant = self.get_square_occupant(square_to_check)
-                if square_occupant == self._get_opponent_player():
-                    potential_captured_squares.append(square_to_check)
-                elif square_occupant == self._active_player:
-                    non_corner_captures += potential_captured_squares
-                    break
-                elif square_occupant == "NONE":
+        geometry = self._geometry
+        reachable = False
+        for rays in geometry.increasing_rays:
+            blockers = rays[index] & occupied_squares
+            if blockers & -blockers & active_board:
+                reachable = True
+                break
+        else:
+            for rays in geometry.decreasing_rays:
+                blockers = rays[index] & occupied_squares
+                if blockers and 1 << (blockers.bit_length() - 1) & active_board:
+                    reachable = True
                     break
+        if not reachable:
+            return 0
 
-        return non_corner_captures
+        active_board |= 1 << index
+        captured_squares = geometry.corner_capture(index, active_board, opponent_board)
+        captured_squares |= geometry.non_corner_capture(index, active_board, opponent_board)
+        return captured_squares
 
-    def _capture_pieces(self, square_moved_from, square_moved_to):
+    def _capture_pieces(self, index_moved_to):
         """
-        Takes as parameters the squares the active player moved from and to, respectively, in algebraic notation.
+        Takes as a parameter the index of the square the active player moved to.
         Determines whether any of the opponents pieces were captured following the legal move.
         If so, clears the pieces from the board and accordingly increases the active player's number of captured pieces.
+        Returns a mask of the captured squares.
         """
-        captured_squares = []
-
-        captured_corner = self._corner_capture(square_moved_to)
-        if captured_corner:
-            captured_squares.append(captured_corner)
-
-        captured_non_corners = self._non_corner_capture(square_moved_from, square_moved_to)
-        if captured_non_corners:
-            captured_squares += captured_non_corners
+        active_board = self._boards[self._active_player]
+        opponent_board = self._boards[self._get_opponent_player()]
 
-        self._set_num_captured_pieces(len(captured_squares))
+        captured_squares = self._geometry.captures(index_moved_to, active_board, opponent_board)
+        self._remove_captured_pieces(captured_squares)
+        return captured_squares
 
-        for square in captured_squares:
-            self._set_board("REMOVE", square)
+    def _remove_captured_pieces(self, captured_squares):
+        """
+        Takes as a parameter a mask of the squares the active player has captured.
+        Clears the squares and increases the active player's number of captured pieces accordingly.
+        """
+        if captured_squares:
+            self._set_num_captured_pieces(self._count_squares(captured_squares))
+            self._set_board("REMOVE", captured_squares)
@@ -1,5 +1,8 @@
+import io
+import pickle
 import unittest
-from hasami_shogi_game import HasamiShogiGame
+from contextlib import redirect_stdout
+from hasami_shogi_game import SNAPSHOT_SIZE, STARTING_STATE, GameState, HasamiShogiGame
 
 
 class MyTestCase(unittest.TestCase):
@@ -84,6 +87,442 @@ class MyTestCase(unittest.TestCase):
         game_state = test_game.get_game_state()
         self.assertEqual("RED_WON", game_state)
 
+    def test_print_board(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i1", "b1")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            test_game.print_board()
+        self.assertEqual(
+            "  1 2 3 4 5 6 7 8 9\n"
+            "a R R R R R R R R R\n"
+            "b B . . . . . . . .\n"
+            "c . . . . . . . . .\n"
+            "d . . . . . . . . .\n"
+            "e . . . . . . . . .\n"
+            "f . . . . . . . . .\n"
+            "g . . . . . . . . .\n"
+            "h . . . . . . . . .\n"
+            "i . B B B B B B B B\n",
+            output.getvalue(),
+        )
+
+    # --- TEST INTEGER SQUARES ---
+
+    def test_square_index_conversion(self):
+        self.assertEqual(0, HasamiShogiGame.square_to_idx("a1"))
+        self.assertEqual(80, HasamiShogiGame.square_to_idx("i9"))
+        self.assertEqual(13, HasamiShogiGame.square_to_idx("b5"))
+        self.assertEqual("b5", HasamiShogiGame.idx_to_square(13))
+        with self.assertRaises(ValueError):
+            HasamiShogiGame.square_to_idx("j1")
+        with self.assertRaises(ValueError):
+            HasamiShogiGame.square_to_idx("a0")
+        self.assertEqual(("a1", "a2", "a3", "b1", "b2", "b3", "c1", "c2", "c3"), HasamiShogiGame.get_square_names(3))
+        self.assertEqual("b5", HasamiShogiGame.get_square_names()[13])
+        with self.assertRaises(ValueError):
+            HasamiShogiGame.get_square_names(27)
+
+    def test_board_masks(self):
+        test_game = HasamiShogiGame()
+        black_board, red_board = test_game.get_board_masks()
+        self.assertEqual(0x1FF << 72, black_board)
+        self.assertEqual(0x1FF, red_board)
+        self.assertEqual(test_game.get_board_masks(), STARTING_STATE.get_board_masks())
+        self.assertEqual(9, STARTING_STATE.get_board_size())
+
+    def test_occupant_idx(self):
+        test_game = HasamiShogiGame()
+        self.assertEqual("RED", test_game.occupant_idx(4))
+        self.assertEqual("NONE", test_game.occupant_idx(40))
+        self.assertEqual("BLACK", test_game.occupant_idx(76))
+        for index in (-1, 81):
+            with self.assertRaises(ValueError):
+                test_game.occupant_idx(index)
+            with self.assertRaises(ValueError):
+                STARTING_STATE.occupant_idx(index)
+        self.assertEqual("BLACK", HasamiShogiGame(11).occupant_idx(120))
+
+    def test_make_move_idx(self):
+        test_game = HasamiShogiGame()
+        self.assertEqual(True, test_game.make_move_idx(72, 9))
+        self.assertEqual(True, test_game.make_move_idx(1, 10))
+        self.assertEqual(False, test_game.make_move_idx(1, 10))
+        self.assertEqual(True, test_game.make_move_idx(74, 11))
+        self.assertEqual(1, test_game.get_num_captured_pieces("BLACK"))
+        self.assertEqual("NONE", test_game.get_square_occupant("b2"))
+        with self.assertRaises(ValueError):
+            test_game.make_move_idx(2, 81)
+
+    def test_iter_legal_moves_idx(self):
+        test_game = HasamiShogiGame()
+        legal_moves = [
+            (test_game.square_to_idx(square_moved_from), test_game.square_to_idx(square_moved_to))
+            for square_moved_from, square_moved_to in test_game.legal_moves()
+        ]
+        self.assertEqual(legal_moves, list(test_game.iter_legal_moves_idx()))
+        self.assertEqual([(72, index) for index in range(9, 72, 9)], list(test_game.iter_legal_moves_idx(72)))
+        for index in (-1, 81):
+            with self.assertRaises(ValueError):
+                test_game.iter_legal_moves_idx(index)
+
+    # --- TEST SNAPSHOTS ---
+
+    def test_bytes_round_trip(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i1", "c1")
+        test_game.make_move("a2", "b2")
+        test_game.make_move("c1", "b1")
+        test_game.make_move("a3", "b3")
+        test_game.make_move("i4", "b4")
+        snapshot = test_game.to_bytes()
+        self.assertEqual(SNAPSHOT_SIZE, len(snapshot))
+        self.assertEqual(24, SNAPSHOT_SIZE)
+        restored_game = HasamiShogiGame.from_bytes(snapshot)
+        self.assertEqual(test_game._boards, restored_game._boards)
+        self.assertEqual(2, restored_game.get_num_captured_pieces("BLACK"))
+        self.assertEqual("RED", restored_game.get_active_player())
+        self.assertEqual(test_game.get_position_hash(), restored_game.get_position_hash())
+        self.assertEqual(test_game.legal_moves(), restored_game.legal_moves())
+        self.assertEqual(False, restored_game.unmake_move())
+
+    def test_bytes_round_trip_game_over(self):
+        test_game = HasamiShogiGame()
+        test_game._game_state = "RED_WON"
+        test_game._red_player_captures = 8
+        restored_game = HasamiShogiGame.from_bytes(test_game.to_bytes())
+        self.assertEqual("RED_WON", restored_game.get_game_state())
+        self.assertEqual(8, restored_game.get_num_captured_pieces("RED"))
+
+    def test_invalid_bytes(self):
+        snapshot = HasamiShogiGame().to_bytes()
+        with self.assertRaises(ValueError):
+            HasamiShogiGame.from_bytes(snapshot[:-1])
+        with self.assertRaises(ValueError):
+            HasamiShogiGame.from_bytes(b"\x03" + snapshot[1:])
+        with self.assertRaises(ValueError):
+            HasamiShogiGame.from_bytes(snapshot[:-1] + b"\x06")
+
+    def test_position_notation(self):
+        test_game = HasamiShogiGame()
+        self.assertEqual("RRRRRRRRR/9/9/9/9/9/9/9/BBBBBBBBB B 0 0", test_game.to_position_notation())
+        test_game.make_move("i1", "b1")
+        test_game.make_move("a2", "b2")
+        test_game.make_move("i3", "b3")
+        notation = test_game.to_position_notation()
+        self.assertEqual("R1RRRRRRR/B1B6/9/9/9/9/9/9/1B1BBBBBB R 1 0", notation)
+        restored_game = HasamiShogiGame.from_position_notation(notation)
+        self.assertEqual(test_game._boards, restored_game._boards)
+        self.assertEqual("RED", restored_game.get_active_player())
+        self.assertEqual(1, restored_game.get_num_captured_pieces("BLACK"))
+
+    def test_invalid_position_notation(self):
+        for notation in (
+            "RRRRRRRRR/9/9/9/9/9/9/9/BBBBBBBBB X 0 0",
+            "RRRRRRRRR/9/9/9/9/9/9/BBBBBBBBB B 0 0",
+            "RRRRRRRR/9/9/9/9/9/9/9/BBBBBBBBB B 0 0",
+            "RRRRRRRRR/9/9/9/9/9/9/9/BBBBBBBBBB B 0 0",
+            "RRRRRRRRR/9/9/9/9/9/9/9/BBBBBBBBB B 0",
+        ):
+            with self.assertRaises(ValueError):
+                HasamiShogiGame.from_position_notation(notation)
+
+    # --- TEST GAME STATES ---
+
+    def test_apply_matches_make_move(self):
+        test_game = HasamiShogiGame()
+        state = STARTING_STATE
+        self.assertEqual(test_game.to_state(), state)
+        for move in (("i1", "c1"), ("a2", "b2"), ("c1", "b1"), ("a3", "b3"), ("i4", "b4")):
+            state = HasamiShogiGame.apply(state, move)
+            test_game.make_move(*move)
+            self.assertEqual(test_game.to_state(), state)
+        self.assertEqual(2, state.get_num_captured_pieces("BLACK"))
+        self.assertEqual("RED", state.active_player)
+        self.assertEqual("NONE", state.occupant_idx(HasamiShogiGame.square_to_idx("b2")))
+
+    def test_apply_leaves_state_unchanged(self):
+        state = HasamiShogiGame.apply(STARTING_STATE, ("i1", "h1"))
+        self.assertEqual(STARTING_STATE, HasamiShogiGame().to_state())
+        self.assertIs(STARTING_STATE.red_board, state.red_board)
+        with self.assertRaises(AttributeError):
+            state.active_player = "BLACK"
+        with self.assertRaises(AttributeError):
+            state.extra = 1
+
+    def test_apply_illegal_moves(self):
+        for move in (("a1", "b1"), ("i1", "i1"), ("i1", "g2"), ("i1", "j1")):
+            with self.assertRaises(ValueError):
+                HasamiShogiGame.apply(STARTING_STATE, move)
+        finished_state = HasamiShogiGame.from_position_notation("R8/B8/9/9/9/9/9/9/1B7 R 8 0").to_state()
+        self.assertEqual("BLACK_WON", finished_state.game_state)
+        with self.assertRaises(ValueError):
+            HasamiShogiGame.apply(finished_state, ("a1", "a2"))
+
+    def test_state_round_trip(self):
+        test_game = HasamiShogiGame.from_position_notation("R7R/B8/9/9/9/9/9/9/1B7 B 7 7")
+        state = HasamiShogiGame.apply(test_game.to_state(), ("i2", "a2"))
+        self.assertEqual("BLACK_WON", state.game_state)
+        restored_game = HasamiShogiGame.from_state(state)
+        self.assertEqual("BLACK_WON", restored_game.get_game_state())
+        self.assertEqual(8, restored_game.get_num_captured_pieces("BLACK"))
+        self.assertEqual(state, pickle.loads(pickle.dumps(state)))
+        self.assertEqual(1, len({state, GameState(*state._fields())}))
+
+    # --- TEST BOARD SIZES ---
+
+    def test_standard_board_size(self):
+        test_game = HasamiShogiGame()
+        self.assertEqual(9, test_game.get_board_size())
+        self.assertEqual(8, test_game.get_captures_to_win())
+
+    def test_small_board(self):
+        test_game = HasamiShogiGame(5)
+        self.assertEqual(4, test_game.get_captures_to_win())
+        self.assertEqual("RRRRR/5/5/5/BBBBB B 0 0", test_game.to_position_notation())
+        self.assertEqual(15, len(test_game.legal_moves()))
+        self.assertFalse(test_game.make_move("e1", "a1"))
+        self.assertFalse(test_game.make_move("e1", "f1"))
+        self.assertTrue(test_game.make_move("e1", "b1"))
+        self.assertEqual("BLACK", test_game.get_square_occupant("b1"))
+        state = HasamiShogiGame.apply(HasamiShogiGame(5).to_state(), ("e1", "b1"))
+        self.assertEqual(test_game.to_state(), state)
+
+    def test_captures_to_win(self):
+        test_game = HasamiShogiGame(captures_to_win=1)
+        test_game.make_move("i1", "b1")
+        test_game.make_move("a2", "b2")
+        test_game.make_move("i3", "b3")
+        self.assertEqual("BLACK_WON", test_game.get_game_state())
+
+    def test_large_board_round_trip(self):
+        test_game = HasamiShogiGame(11)
+        test_game.make_move("k1", "c1")
+        notation = test_game.to_position_notation()
+        self.assertEqual("RRRRRRRRRRR/11/B10/11/11/11/11/11/11/11/1BBBBBBBBBB R 0 0", notation)
+        restored_game = HasamiShogiGame.from_position_notation(notation)
+        self.assertEqual(11, restored_game.get_board_size())
+        self.assertEqual(test_game.to_bytes(), restored_game.to_bytes())
+        self.assertEqual(test_game.to_bytes(), HasamiShogiGame.from_bytes(test_game.to_bytes(), 11).to_bytes())
+
+    def test_geometry_shared_by_size(self):
+        self.assertIs(HasamiShogiGame(7)._geometry, HasamiShogiGame(7)._geometry)
+        self.assertIsNot(HasamiShogiGame(7)._geometry, HasamiShogiGame(9)._geometry)
+
+    def test_invalid_board_size(self):
+        for board_size, captures_to_win in ((2, None), (27, None), (9, 0), (9, 10)):
+            with self.assertRaises(ValueError):
+                HasamiShogiGame(board_size, captures_to_win)
+
+    # --- TEST LEGAL MOVES ---
+
+    def test_legal_moves_opening(self):
+        test_game = HasamiShogiGame()
+        legal_moves = test_game.legal_moves()
+        self.assertEqual(63, len(legal_moves))
+        self.assertIn(("i1", "b1"), legal_moves)
+        self.assertNotIn(("a1", "b1"), legal_moves)
+
+    def test_iter_legal_moves_from_square(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i5", "e5")
+        test_game.make_move("a5", "c5")
+        legal_moves = list(test_game.iter_legal_moves("e5"))
+        expected_moves = [("e5", "d5")] + [("e5", "e" + str(col)) for col in (1, 2, 3, 4, 6, 7, 8, 9)]
+        expected_moves += [("e5", "f5"), ("e5", "g5"), ("e5", "h5"), ("e5", "i5")]
+        self.assertEqual(expected_moves, legal_moves)
+        self.assertEqual([], test_game.legal_moves("c5"))
+
+    def test_legal_moves_match_make_move(self):
+        test_game = HasamiShogiGame()
+        for square_moved_from, square_moved_to in (("i1", "c1"), ("a2", "b2"), ("i3", "b3"), ("a4", "d4")):
+            test_game.make_move(square_moved_from, square_moved_to)
+        squares = [row + str(col) for row in "abcdefghi" for col in range(1, 10)]
+        expected_moves = []
+        for square_moved_from in squares:
+            for square_moved_to in squares:
+                if test_game._legal_move(
+                    test_game._square_to_index(square_moved_from), test_game._square_to_index(square_moved_to)
+                ):
+                    expected_moves.append((square_moved_from, square_moved_to))
+        self.assertEqual(expected_moves, test_game.legal_moves())
+
+    def test_legal_moves_after_game_over(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i1", "b1")
+        test_game.make_move("a2", "b2")
+        test_game.make_move("i2", "h2")
+        test_game.make_move("a3", "b3")
+        test_game.make_move("i3", "h3")
+        test_game.make_move("a4", "b4")
+        test_game.make_move("i4", "h4")
+        test_game.make_move("a5", "b5")
+        test_game.make_move("i5", "h5")
+        test_game.make_move("a6", "b6")
+        test_game.make_move("i6", "h6")
+        test_game.make_move("a7", "b7")
+        test_game.make_move("i7", "h7")
+        test_game.make_move("a8", "b8")
+        test_game.make_move("i9", "b9")
+        test_game.make_move("a1", "a2")
+        test_game.make_move("b1", "a1")
+        test_game.make_move("a9", "a3")
+        test_game.make_move("h4", "a4")
+        self.assertEqual([], test_game.legal_moves())
+
+    # --- TEST TAKING BACK MOVES ---
+
+    def test_unmake_move_restores_capture(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i1", "c1")
+        test_game.make_move("a2", "b2")
+        test_game.make_move("c1", "b1")
+        test_game.make_move("a3", "b3")
+        test_game.make_move("i4", "b4")
+        self.assertEqual(2, test_game.get_num_captured_pieces("BLACK"))
+        self.assertEqual(True, test_game.unmake_move())
+        self.assertEqual(0, test_game.get_num_captured_pieces("BLACK"))
+        self.assertEqual("RED", test_game.get_square_occupant("b2"))
+        self.assertEqual("RED", test_game.get_square_occupant("b3"))
+        self.assertEqual("NONE", test_game.get_square_occupant("b4"))
+        self.assertEqual("BLACK", test_game.get_square_occupant("i4"))
+        self.assertEqual("BLACK", test_game.get_active_player())
+
+    def test_unmake_move_restores_game_state(self):
+        test_game = HasamiShogiGame()
+        moves = [
+            ("i1", "b1"), ("a2", "b2"), ("i2", "h2"), ("a3", "b3"), ("i3", "h3"), ("a4", "b4"), ("i4", "h4"),
+            ("a5", "b5"), ("i5", "h5"), ("a6", "b6"), ("i6", "h6"), ("a7", "b7"), ("i7", "h7"), ("a8", "b8"),
+            ("i9", "b9"), ("a1", "a2"), ("b1", "a1"), ("a9", "a3"), ("h4", "a4"),
+        ]
+        for square_moved_from, square_moved_to in moves:
+            test_game.make_move(square_moved_from, square_moved_to)
+        self.assertEqual("BLACK_WON", test_game.get_game_state())
+        test_game.unmake_move()
+        self.assertEqual("UNFINISHED", test_game.get_game_state())
+        self.assertEqual("BLACK", test_game.get_active_player())
+        for _ in moves[:-1]:
+            test_game.unmake_move()
+        self.assertEqual(False, test_game.unmake_move())
+        self.assertEqual(HasamiShogiGame()._boards, test_game._boards)
+        self.assertEqual(0, test_game.get_num_captured_pieces("BLACK"))
+
+    def test_push_and_pop(self):
+        test_game = HasamiShogiGame()
+        self.assertEqual(True, test_game.push("i1", "b1"))
+        self.assertEqual(False, test_game.push("i2", "h2"))
+        self.assertEqual(("i1", "b1"), test_game.pop())
+        self.assertEqual("BLACK", test_game.get_square_occupant("i1"))
+        with self.assertRaises(IndexError):
+            test_game.pop()
+
+    def test_forget_moves(self):
+        test_game = HasamiShogiGame()
+        for move in (("i1", "b1"), ("a2", "b2"), ("i3", "b3")):
+            test_game.make_move(*move)
+        test_game.forget_moves(1)
+        self.assertEqual(("i3", "b3"), test_game.pop())
+        self.assertEqual(False, test_game.unmake_move())
+        self.assertEqual("BLACK", test_game.get_square_occupant("b1"))
+        test_game.make_move("i3", "b3")
+        test_game.forget_moves()
+        self.assertEqual(False, test_game.unmake_move())
+        self.assertEqual(1, test_game.get_num_captured_pieces("BLACK"))
+
+    def test_get_last_move(self):
+        test_game = HasamiShogiGame()
+        self.assertIsNone(test_game.get_last_move())
+        for move in (("i1", "c1"), ("a2", "b2"), ("c1", "b1"), ("a3", "b3"), ("i4", "b4")):
+            test_game.make_move(*move)
+        self.assertEqual(("BLACK", "i4", "b4", ["b2", "b3"]), test_game.get_last_move())
+        test_game.unmake_move()
+        self.assertEqual(("RED", "a3", "b3", []), test_game.get_last_move())
+        test_game.forget_moves()
+        self.assertIsNone(test_game.get_last_move())
+
+    # --- TEST POSITION HASH ---
+
+    def test_position_hash_matches_recomputed_hash(self):
+        test_game = HasamiShogiGame()
+        moves = (("i1", "c1"), ("a2", "b2"), ("c1", "b1"), ("a3", "b3"), ("i4", "b4"))
+        for square_moved_from, square_moved_to in moves:
+            test_game.make_move(square_moved_from, square_moved_to)
+            self.assertEqual(test_game._compute_position_hash(), test_game.get_position_hash())
+        test_game.unmake_move()
+        self.assertEqual(test_game._compute_position_hash(), test_game.get_position_hash())
+
+    def test_position_hash_independent_of_move_order(self):
+        test_game_one = HasamiShogiGame()
+        test_game_two = HasamiShogiGame()
+        for square_moved_from, square_moved_to in (("i1", "h1"), ("a1", "b1"), ("i2", "h2"), ("a2", "b2")):
+            test_game_one.make_move(square_moved_from, square_moved_to)
+        for square_moved_from, square_moved_to in (("i2", "h2"), ("a2", "b2"), ("i1", "h1"), ("a1", "b1")):
+            test_game_two.make_move(square_moved_from, square_moved_to)
+        self.assertEqual(test_game_one.get_position_hash(), test_game_two.get_position_hash())
+        test_game_one.make_move("h1", "g1")
+        self.assertNotEqual(test_game_one.get_position_hash(), test_game_two.get_position_hash())
+
+    def test_position_hash_includes_active_player(self):
+        test_game = HasamiShogiGame()
+        initial_hash = test_game.get_position_hash()
+        test_game.make_move("i1", "h1")
+        test_game.make_move("a1", "b1")
+        test_game.make_move("h1", "i1")
+        test_game.make_move("b1", "a1")
+        self.assertEqual(initial_hash, test_game.get_position_hash())
+        test_game._set_active_player()
+        self.assertNotEqual(initial_hash, test_game.get_position_hash())
+        self.assertEqual(test_game._compute_position_hash(), test_game.get_position_hash())
+
+    # --- TEST CAPTURE THREATS ---
+    def test_no_capture_threats_at_start(self):
+        test_game = HasamiShogiGame()
+        self.assertEqual({}, test_game.get_capture_threats("BLACK"))
+        self.assertEqual({}, test_game.get_capture_threats("RED"))
+        self.assertEqual([], test_game.get_threatened_pieces())
+
+    def test_capture_threats(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i1", "b1")
+        test_game.make_move("a2", "b2")
+        self.assertEqual({"b3": ["b2"]}, test_game.get_capture_threats())
+        self.assertEqual({}, test_game.get_capture_threats("RED"))
+        self.assertEqual({11: 1 << 10}, test_game.capture_threats_idx())
+        self.assertEqual(["b2"], test_game.get_threatened_pieces("RED"))
+        self.assertEqual([], test_game.get_threatened_pieces("BLACK"))
+
+    def test_capture_threats_follow_moves(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i1", "b1")
+        test_game.make_move("a2", "b2")
+        test_game.make_move("i3", "b3")
+        self.assertEqual({"a2": ["a1"]}, test_game.get_capture_threats("BLACK"))
+        test_game.unmake_move()
+        self.assertEqual({"b3": ["b2"]}, test_game.get_capture_threats("BLACK"))
+
+    def test_capture_threats_built_on_first_use(self):
+        test_game, moves = HasamiShogiGame(), (("i1", "b1"), ("a2", "b2"), ("i3", "b3"), ("a4", "b4"))
+        for move in moves[:2]:
+            test_game.make_move(*move)
+        self.assertIsNone(test_game._capture_threats)
+        self.assertEqual({"b3": ["b2"]}, test_game.get_capture_threats())
+        for move in moves[2:]:
+            test_game.make_move(*move)
+        fresh_game = HasamiShogiGame.from_state(test_game.to_state())
+        self.assertIsNone(fresh_game._capture_threats)
+        for player in ("BLACK", "RED"):
+            self.assertEqual(fresh_game.get_capture_threats(player), test_game.get_capture_threats(player))
+
+    def test_corner_capture_threat(self):
+        test_game = HasamiShogiGame.from_position_notation("R8/B8/9/9/9/9/9/9/1B7 B 0 0")
+        self.assertEqual({"a2": ["a1"]}, test_game.get_capture_threats())
+        self.assertEqual(["a1"], test_game.get_threatened_pieces("RED"))
+
+    def test_no_capture_threats_when_finished(self):
+        test_game = HasamiShogiGame.from_position_notation("R8/B8/9/9/9/9/9/9/1B7 R 8 0")
+        self.assertEqual({}, test_game.get_capture_threats("BLACK"))
+        self.assertEqual([], test_game.get_threatened_pieces("RED"))
+
     # --- TEST INVALID MOVES ---
 
     def test_same_player_moving_twice(self):
@@ -136,6 +575,15 @@ class MyTestCase(unittest.TestCase):
         test_game.make_move("h4", "a4")
         move_after_game_over = test_game.make_move("h3", "h4")
         self.assertEqual(False, move_after_game_over)
+        self.assertEqual(False, test_game.make_move("a0", "h4"))
+
+    def test_squares_not_on_board(self):
+        test_game = HasamiShogiGame()
+        for square_moved_from, square_moved_to in (("a0", "b1"), ("i1", "a10"), ("j1", "h1"), ("i1", "i"), ("", "h1")):
+            self.assertEqual(False, test_game.make_move(square_moved_from, square_moved_to))
+            self.assertEqual(False, test_game.push(square_moved_from, square_moved_to))
+        self.assertEqual(HasamiShogiGame().to_state(), test_game.to_state())
+        self.assertEqual(True, test_game.make_move("i1", "h1"))
 
     # --- TEST CAPTURES ---
 
@@ -175,6 +623,31 @@ class MyTestCase(unittest.TestCase):
         square_occupant = test_game.get_square_occupant("a1")
         self.assertEqual("NONE", square_occupant)
 
+    def test_corner_capture_opposite_corner(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i8", "h8")
+        test_game.make_move("a9", "h9")
+        test_game.make_move("h8", "h2")
+        test_game.make_move("a8", "i8")
+        num_captured_pieces_red = test_game.get_num_captured_pieces("RED")
+        self.assertEqual(1, num_captured_pieces_red)
+        square_occupant = test_game.get_square_occupant("i9")
+        self.assertEqual("NONE", square_occupant)
+
+    def test_capture_in_multiple_directions(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i1", "c1")
+        test_game.make_move("a2", "c2")
+        test_game.make_move("i3", "e3")
+        test_game.make_move("a3", "d3")
+        test_game.make_move("i9", "c9")
+        test_game.make_move("a5", "b5")
+        test_game.make_move("c9", "c3")
+        num_captured_pieces_black = test_game.get_num_captured_pieces("BLACK")
+        self.assertEqual(2, num_captured_pieces_black)
+        self.assertEqual("NONE", test_game.get_square_occupant("c2"))
+        self.assertEqual("NONE", test_game.get_square_occupant("d3"))
+
     def test_num_captured_pieces_one(self):
         test_game = HasamiShogiGame()
         test_game.make_move("i1", "b1")
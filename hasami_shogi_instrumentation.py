@@ -0,0 +1,136 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: Records per-phase timings and counters for moves made on a Hasami Shogi game, for export as a dictionary
+# or as Prometheus text.
+
+PHASES = ("LEGALITY", "BOARD_UPDATE", "CORNER_CAPTURE", "NON_CORNER_CAPTURE", "GAME_STATE_UPDATE")
+REJECTION_REASONS = (
+    "GAME_OVER",
+    "NOT_ACTIVE_PLAYER_PIECE",
+    "SAME_SQUARE",
+    "OCCUPIED_DESTINATION",
+    "NOT_STRAIGHT_LINE",
+    "PATH_BLOCKED",
+)
+
+
+class MoveInstrumentation:
+    """
+    Counters and timings for the moves attempted on one or more games, filled in by HasamiShogiGame.make_move once
+    enabled with enable_instrumentation.
+    Each phase of a move records how many times it ran, the total seconds spent in it and the longest single run, and
+    each move that is not made is counted by the first reason it is not legal.
+    """
+
+    def __init__(self):
+        """
+        Takes no parameters.
+        Initializes every counter and timing to zero.
+        """
+        self._moves_made = 0
+        self._phase_calls = {}
+        self._phase_seconds = {}
+        self._phase_max_seconds = {}
+        self._rejections = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Takes no parameters.
+        Sets every counter and timing back to zero.
+        """
+        self._moves_made = 0
+        self._phase_calls = dict.fromkeys(PHASES, 0)
+        self._phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self._phase_max_seconds = dict.fromkeys(PHASES, 0.0)
+        self._rejections = dict.fromkeys(REJECTION_REASONS, 0)
+
+    def record_phase(self, phase, seconds):
+        """
+        Takes as parameters one of PHASES and the seconds it took.
+        Adds the run to the phase's timings.
+        """
+        self._phase_calls[phase] += 1
+        self._phase_seconds[phase] += seconds
+        if seconds > self._phase_max_seconds[phase]:
+            self._phase_max_seconds[phase] = seconds
+
+    def record_move(self):
+        """
+        Takes no parameters.
+        Counts a move that was made.
+        """
+        self._moves_made += 1
+
+    def record_rejection(self, reason):
+        """
+        Takes as a parameter one of REJECTION_REASONS.
+        Counts a move that was not made for that reason.
+        """
+        self._rejections[reason] += 1
+
+    def get_moves_made(self):
+        """
+        Takes no parameters.
+        Returns the number of moves made.
+        """
+        return self._moves_made
+
+    def get_rejections(self, reason=None):
+        """
+        Takes as an optional parameter one of REJECTION_REASONS.
+        Returns the number of moves not made for that reason, or for any reason by default.
+        """
+        if reason is None:
+            return sum(self._rejections.values())
+        return self._rejections[reason]
+
+    def to_dict(self):
+        """
+        Takes no parameters.
+        Returns a dictionary of the moves made, each phase's calls, total seconds, mean seconds and longest run, and the
+        moves not made by reason.
+        """
+        return {
+            "moves_made": self._moves_made,
+            "phases": {
+                phase: {
+                    "calls": self._phase_calls[phase],
+                    "seconds": self._phase_seconds[phase],
+                    "mean_seconds": (
+                        self._phase_seconds[phase] / self._phase_calls[phase] if self._phase_calls[phase] else 0.0
+                    ),
+                    "max_seconds": self._phase_max_seconds[phase],
+                }
+                for phase in PHASES
+            },
+            "rejections": dict(self._rejections),
+        }
+
+    def to_prometheus_text(self, prefix="hasami_shogi_make_move"):
+        """
+        Takes as an optional parameter the prefix for the metric names.
+        Returns the counters and timings in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP %s_moves_total Moves made." % prefix,
+            "# TYPE %s_moves_total counter" % prefix,
+            "%s_moves_total %d" % (prefix, self._moves_made),
+            "# HELP %s_rejections_total Moves not made, by reason." % prefix,
+            "# TYPE %s_rejections_total counter" % prefix,
+        ]
+        lines += [
+            '%s_rejections_total{reason="%s"} %d' % (prefix, reason, self._rejections[reason])
+            for reason in REJECTION_REASONS
+        ]
+
+        for name, help_text, metric_type, values in (
+            ("phase_calls_total", "Runs of each phase of make_move.", "counter", self._phase_calls),
+            ("phase_seconds_total", "Seconds spent in each phase of make_move.", "counter", self._phase_seconds),
+            ("phase_max_seconds", "Longest single run of each phase of make_move.", "gauge", self._phase_max_seconds),
+        ):
+            lines.append("# HELP %s_%s %s" % (prefix, name, help_text))
+            lines.append("# TYPE %s_%s %s" % (prefix, name, metric_type))
+            lines += ['%s_%s{phase="%s"} %r' % (prefix, name, phase, values[phase]) for phase in PHASES]
+
+        return "\n".join(lines) + "\n"
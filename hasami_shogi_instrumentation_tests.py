@@ -0,0 +1,105 @@
+import unittest
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_instrumentation import PHASES, MoveInstrumentation
+
+
+class MyTestCase(unittest.TestCase):
+
+    # --- TEST INSTRUMENTED MOVES ---
+    def test_disabled_by_default(self):
+        game = HasamiShogiGame()
+        self.assertIsNone(game.get_instrumentation())
+
+    def test_instrumented_moves_match_plain_moves(self):
+        moves = [("i1", "b1"), ("a2", "b2"), ("i3", "b3"), ("a9", "b9"), ("i2", "h2"), ("a3", "a4")]
+        game = HasamiShogiGame()
+        instrumented_game = HasamiShogiGame()
+        instrumentation = instrumented_game.enable_instrumentation()
+        for square_moved_from, square_moved_to in moves:
+            self.assertEqual(
+                game.make_move(square_moved_from, square_moved_to),
+                instrumented_game.make_move(square_moved_from, square_moved_to),
+            )
+            self.assertEqual(game.to_bytes(), instrumented_game.to_bytes())
+            self.assertEqual(game.get_position_hash(), instrumented_game.get_position_hash())
+
+        self.assertEqual(1, instrumented_game.get_num_captured_pieces("BLACK"))
+        self.assertEqual(5, instrumentation.get_moves_made())
+        self.assertEqual(1, instrumentation.get_rejections("OCCUPIED_DESTINATION"))
+        while instrumented_game.unmake_move():
+            pass
+        self.assertEqual(HasamiShogiGame().to_bytes(), instrumented_game.to_bytes())
+
+    def test_rejection_reasons(self):
+        game = HasamiShogiGame()
+        instrumentation = game.enable_instrumentation()
+        self.assertFalse(game.make_move("a1", "b1"))
+        self.assertFalse(game.make_move("i1", "i1"))
+        self.assertFalse(game.make_move("i1", "i2"))
+        self.assertFalse(game.make_move("i1", "h2"))
+        game.make_move("i2", "h2")
+        game.make_move("a1", "b1")
+        self.assertFalse(game.make_move("i1", "a1"))
+        self.assertFalse(game.make_move("b1", "c1"))
+        self.assertEqual(
+            {
+                "GAME_OVER": 0,
+                "NOT_ACTIVE_PLAYER_PIECE": 2,
+                "SAME_SQUARE": 1,
+                "OCCUPIED_DESTINATION": 1,
+                "NOT_STRAIGHT_LINE": 1,
+                "PATH_BLOCKED": 1,
+            },
+            instrumentation.to_dict()["rejections"],
+        )
+
+    def test_game_over_rejection(self):
+        game = HasamiShogiGame.from_position_notation("R8/9/9/9/9/9/9/9/B8 B 8 0")
+        instrumentation = game.enable_instrumentation()
+        self.assertFalse(game.make_move("i1", "h1"))
+        self.assertEqual(1, instrumentation.get_rejections("GAME_OVER"))
+        self.assertEqual(1, instrumentation.get_rejections())
+
+    def test_shared_instrumentation_and_disable(self):
+        instrumentation = MoveInstrumentation()
+        first_game, second_game = HasamiShogiGame(), HasamiShogiGame()
+        first_game.enable_instrumentation(instrumentation)
+        second_game.enable_instrumentation(instrumentation)
+        first_game.make_move("i1", "h1")
+        second_game.make_move("i2", "h2")
+        second_game.disable_instrumentation()
+        second_game.make_move("a1", "b1")
+        self.assertEqual(2, instrumentation.get_moves_made())
+        self.assertIsNone(second_game.get_instrumentation())
+
+    # --- TEST EXPORTS ---
+    def test_to_dict(self):
+        game = HasamiShogiGame()
+        instrumentation = game.enable_instrumentation()
+        game.make_move("i1", "h1")
+        game.make_move("a1", "a1")
+        statistics = instrumentation.to_dict()
+        self.assertEqual(1, statistics["moves_made"])
+        self.assertEqual(2, statistics["phases"]["LEGALITY"]["calls"])
+        for phase in PHASES[1:]:
+            self.assertEqual(1, statistics["phases"][phase]["calls"])
+            self.assertGreaterEqual(statistics["phases"][phase]["max_seconds"], 0.0)
+        instrumentation.reset()
+        self.assertEqual(0, instrumentation.to_dict()["phases"]["LEGALITY"]["calls"])
+
+    def test_to_prometheus_text(self):
+        game = HasamiShogiGame()
+        instrumentation = game.enable_instrumentation()
+        game.make_move("i1", "h1")
+        game.make_move("a1", "i1")
+        text = instrumentation.to_prometheus_text()
+        self.assertIn("# TYPE hasami_shogi_make_move_moves_total counter\nhasami_shogi_make_move_moves_total 1\n", text)
+        self.assertIn('hasami_shogi_make_move_rejections_total{reason="PATH_BLOCKED"} 1\n', text)
+        self.assertIn('hasami_shogi_make_move_phase_calls_total{phase="LEGALITY"} 2\n', text)
+        self.assertIn('my_prefix_phase_seconds_total{phase="CORNER_CAPTURE"} ', instrumentation.to_prometheus_text(
+            "my_prefix"
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,346 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: A computer player for the Hasami Shogi game, using Monte Carlo tree search with optional root
+# parallelism across a process pool.
+
+import math
+import multiprocessing
+import random
+import time
+from collections import namedtuple
+
+from hasami_shogi_game import HasamiShogiGame
+
+PLAYOUT_POLICIES = ("RANDOM", "GREEDY_CAPTURE")
+
+MCTSResult = namedtuple(
+    "MCTSResult", ["best_move", "visits", "win_rate", "playouts", "elapsed", "playouts_per_second"]
+)
+
+
+class _Node:
+    """
+    A position in the search tree, reached by a move from its parent.
+    Wins are counted for the player who made the move, with drawn playouts counting as half a win.
+    """
+
+    __slots__ = ("move", "parent", "player", "position_hash", "children", "untried_moves", "visits", "wins")
+
+    def __init__(self, move, parent, player, game):
+        """
+        Takes as parameters the (index moved from, index moved to) move reaching the node, or None for the root, the
+        parent node, the player who made the move and the game in the node's position.
+        Initializes the node with no visits.
+        """
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.position_hash = game.get_position_hash()
+        self.children = []
+        self.untried_moves = list(game.iter_legal_moves_idx())
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MCTSPlayer:
+    """
+    A computer player that chooses moves by Monte Carlo tree search.
+    Children are selected by UCT, each new node is scored by a random or greedy-capture playout, and the move visited
+    most often is chosen. The tree is kept between searches, so that when the next position is already in it, its
+    statistics are reused. With more than one process, each worker process keeps and grows its own tree from the same
+    position, and the visits and wins of the root's moves are summed.
+    """
+
+    def __init__(
+        self,
+        playouts=None,
+        time_limit=1.0,
+        playout_policy="RANDOM",
+        exploration=1.4,
+        processes=1,
+        max_playout_moves=60,
+        seed=None,
+    ):
+        """
+        Takes as optional parameters the number of playouts per search, which takes the place of the time limit when
+        given, the seconds each search may take, the playout policy ("RANDOM" or "GREEDY_CAPTURE"), the UCT exploration
+        constant, the number of processes to search with, the most moves per playout before it is scored by captures,
+        and the seed for random choices.
+        Initializes the player.
+        """
+        if playout_policy not in PLAYOUT_POLICIES:
+            raise ValueError("unknown playout policy: " + str(playout_policy))
+        self._playouts = playouts
+        self._time_limit = time_limit
+        self._playout_policy = playout_policy
+        self._exploration = exploration
+        self._processes = processes
+        self._max_playout_moves = max_playout_moves
+        self._seed = seed
+        self._random = random.Random(seed)
+        self._root = None
+        self._workers = []
+        self._reset_workers = False
+
+    def choose_move(self, game):
+        """
+        Takes as a parameter a HasamiShogiGame.
+        Returns the best move found for the active player as a (square moved from, square moved to) pair in algebraic
+        notation, or None if the active player has no legal moves.
+        """
+        return self.search(game).best_move
+
+    def search(self, game):
+        """
+        Takes as a parameter a HasamiShogiGame.
+        Searches the game's position, leaving the game as it was found.
+        Returns an MCTSResult with the best move in algebraic notation, its visits and win rate, the number of
+        playouts, the seconds taken and the playouts per second.
+        """
+        start_time = time.perf_counter()
+        if self._processes > 1:
+            move_statistics, playouts = self._search_parallel(game)
+        else:
+            root = self._reuse_root(game)
+            playouts = self._grow_tree(game, root)
+            move_statistics = {child.move: (child.visits, child.wins) for child in root.children}
+        elapsed = time.perf_counter() - start_time
+
+        best_move, visits, win_rate = None, 0, 0.0
+        if move_statistics:
+            best_move, (visits, wins) = max(move_statistics.items(), key=lambda item: item[1][0])
+            win_rate = wins / visits if visits else 0.0
+            board_size = game.get_board_size()
+            best_move = (game.idx_to_square(best_move[0], board_size), game.idx_to_square(best_move[1], board_size))
+        return MCTSResult(
+            best_move, visits, win_rate, playouts, elapsed, playouts / elapsed if elapsed > 0 else 0.0
+        )
+
+    def reset(self):
+        """
+        Takes no parameters.
+        Forgets the trees kept from earlier searches, including those of the worker processes.
+        """
+        self._root = None
+        self._reset_workers = True
+
+    def close(self):
+        """
+        Takes no parameters.
+        Shuts down the worker processes, if they have been started, discarding their trees.
+        """
+        for process, connection in self._workers:
+            connection.send(None)
+            connection.close()
+            process.join()
+        self._workers = []
+
+    def _reuse_root(self, game):
+        """
+        Takes as a parameter the game being searched.
+        Returns the node of the kept tree holding the game's position, found among the old root and the positions up
+        to two moves after it, or a new root if there is none.
+        """
+        position_hash = game.get_position_hash()
+        candidates = []
+        if self._root is not None:
+            candidates.append(self._root)
+            for child in self._root.children:
+                candidates.append(child)
+                candidates.extend(child.children)
+
+        for node in candidates:
+            if node.position_hash == position_hash:
+                node.parent = None
+                node.move = None
+                self._root = node
+                return node
+
+        self._root = _Node(None, None, game._get_opponent_player(), game)
+        return self._root
+
+    def _grow_tree(self, game, root):
+        """
+        Takes as parameters the game and the root node for its position.
+        Runs playouts until the playout count or time limit is reached, adding a node to the tree for each one.
+        Returns the number of playouts run.
+        """
+        if not root.untried_moves and not root.children:
+            return 0
+        deadline = time.perf_counter() + self._time_limit
+        history_length = len(game._move_history)
+        playouts = 0
+        while (playouts < self._playouts) if self._playouts is not None else (time.perf_counter() < deadline):
+            node = self._select_and_expand(game, root)
+            winner = self._playout(game)
+            while len(game._move_history) > history_length:
+                game.unmake_move()
+            self._backpropagate(node, winner)
+            playouts += 1
+        return playouts
+
+    def _select_and_expand(self, game, root):
+        """
+        Takes as parameters the game, in the root's position, and the root node.
+        Descends the tree by UCT, making each move on the game, until reaching a node with untried moves or no moves,
+        then adds a child for one untried move.
+        Returns the node reached.
+        """
+        node = root
+        while not node.untried_moves and node.children:
+            log_visits = math.log(node.visits)
+            node = max(
+                node.children,
+                key=lambda child: child.wins / child.visits
+                + self._exploration * math.sqrt(log_visits / child.visits),
+            )
+            game._apply_move(*node.move)
+
+        if node.untried_moves:
+            move = node.untried_moves.pop(self._random.randrange(len(node.untried_moves)))
+            player = game.get_active_player()
+            game._apply_move(*move)
+            child = _Node(move, node, player, game)
+            node.children.append(child)
+            node = child
+        return node
+
+    def _playout(self, game):
+        """
+        Takes as a parameter the game.
+        Plays moves by the playout policy until the game is won, the active player has no legal moves, or the playout
+        move limit is reached.
+        Returns the winning player, scoring an unfinished game by captures, or None if it is drawn.
+        """
+        for _ in range(self._max_playout_moves):
+            if game._game_state != "UNFINISHED":
+                break
+            move = None
+            if self._playout_policy == "GREEDY_CAPTURE":
+                move = self._choose_capturing_move(game)
+            if move is None:
+                move = self._choose_random_move(game)
+                if move is None:
+                    break
+            game._apply_move(*move)
+
+        if game._game_state == "BLACK_WON":
+            return "BLACK"
+        elif game._game_state == "RED_WON":
+            return "RED"
+        black_captures = game.get_num_captured_pieces("BLACK")
+        red_captures = game.get_num_captured_pieces("RED")
+        if black_captures > red_captures:
+            return "BLACK"
+        elif red_captures > black_captures:
+            return "RED"
+        return None
+
+    def _choose_random_move(self, game):
+        """
+        Takes as a parameter the game.
+        Returns a legal move for the active player, chosen by picking a random piece that can move and then a random
+        square it can move to, or None if the active player has no legal moves.
+        """
+        occupied_squares = game._boards["BLACK"] | game._boards["RED"]
+        pieces = list(game._iter_squares(game._boards[game._active_player]))
+        while pieces:
+            index_moved_from = pieces.pop(self._random.randrange(len(pieces)))
+            legal_destinations = list(game._iter_squares(game._legal_destinations(index_moved_from, occupied_squares)))
+            if legal_destinations:
+                return index_moved_from, legal_destinations[self._random.randrange(len(legal_destinations))]
+        return None
+
+    def _choose_capturing_move(self, game):
+        """
+        Takes as a parameter the game.
+        Returns a random legal move capturing the most pieces for the active player, or None if no move captures.
+        """
+        capture_threats = game.capture_threats_idx()
+        if not capture_threats:
+            return None
+        capture_counts = {index: game._count_squares(squares) for index, squares in capture_threats.items()}
+        most_captures = max(capture_counts.values())
+        squares_moved_to = [index for index, captures in capture_counts.items() if captures == most_captures]
+        index_moved_to = squares_moved_to[self._random.randrange(len(squares_moved_to))]
+
+        occupied_squares = game._boards["BLACK"] | game._boards["RED"]
+        pieces = [
+            index_moved_from for index_moved_from in game._iter_squares(game._boards[game._active_player])
+            if game._legal_destinations(index_moved_from, occupied_squares) >> index_moved_to & 1
+        ]
+        return pieces[self._random.randrange(len(pieces))], index_moved_to
+
+    @staticmethod
+    def _backpropagate(node, winner):
+        """
+        Takes as parameters the node a playout started from and the playout's winner, or None for a draw.
+        Adds the playout to the visits and wins of the node and each of its ancestors.
+        """
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.player:
+                node.wins += 1
+            node = node.parent
+
+    def _search_parallel(self, game):
+        """
+        Takes as a parameter the game being searched.
+        Grows each worker process's tree from a snapshot of the game, splitting the playouts exactly between them.
+        Returns a dictionary mapping each of the root's moves to its summed (visits, wins), and the total playouts.
+        """
+        if not self._workers:
+            for _ in range(self._processes):
+                parent_connection, child_connection = multiprocessing.Pipe()
+                settings = (
+                    self._time_limit, self._playout_policy, self._exploration, self._max_playout_moves,
+                    self._random.getrandbits(64),
+                )
+                process = multiprocessing.Process(target=_search_worker, args=(child_connection, settings), daemon=True)
+                process.start()
+                child_connection.close()
+                self._workers.append((process, parent_connection))
+
+        snapshot = (game.to_bytes(), game.get_board_size(), game.get_captures_to_win())
+        for worker_number, (_, connection) in enumerate(self._workers):
+            playouts = None
+            if self._playouts is not None:
+                playouts = self._playouts // self._processes + (worker_number < self._playouts % self._processes)
+            connection.send(snapshot + (playouts, self._reset_workers))
+        self._reset_workers = False
+
+        move_statistics, total_playouts = {}, 0
+        for _, connection in self._workers:
+            worker_statistics, worker_playouts = connection.recv()
+            total_playouts += worker_playouts
+            for move, (visits, wins) in worker_statistics.items():
+                total_visits, total_wins = move_statistics.get(move, (0, 0.0))
+                move_statistics[move] = (total_visits + visits, total_wins + wins)
+        return move_statistics, total_playouts
+
+
+def _search_worker(connection, settings):
+    """
+    Takes as parameters the connection to the searching player and a (time limit, playout policy, exploration
+    constant, maximum playout moves, seed) tuple.
+    Keeps one tree in this process for as long as the player runs. For each (snapshot, board size, captures to win,
+    playouts, reset) task received, forgets the tree if asked to, grows it from the snapshot's position, and sends
+    back a dictionary mapping each of the root's moves to its (visits, wins), and the number of playouts run. Stops
+    when None is received.
+    """
+    time_limit, playout_policy, exploration, max_playout_moves, seed = settings
+    player = MCTSPlayer(None, time_limit, playout_policy, exploration, 1, max_playout_moves, seed)
+    task = connection.recv()
+    while task is not None:
+        snapshot, board_size, captures_to_win, playouts, reset = task
+        if reset:
+            player.reset()
+        player._playouts = playouts
+        game = HasamiShogiGame.from_bytes(snapshot, board_size, captures_to_win)
+        root = player._reuse_root(game)
+        worker_playouts = player._grow_tree(game, root)
+        connection.send(({child.move: (child.visits, child.wins) for child in root.children}, worker_playouts))
+        task = connection.recv()
+    connection.close()
@@ -0,0 +1,109 @@
+import unittest
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_mcts import MCTSPlayer
+
+# Black needs one more capture and wins by moving i2 to a2, capturing the corner.
+WINNING_POSITION = "R7R/B8/9/9/9/9/9/9/1B7 B 7 7"
+
+# Red needs one more capture and threatens i2-a2, capturing Black's corner piece on a1, so Black must look two moves
+# ahead to find one of the moves that stops it.
+DEFENDING_POSITION = "B8/R8/9/9/4B4/9/9/9/1R7 B 7 7"
+
+
+def red_can_win(game):
+    for square_moved_from, square_moved_to in game.legal_moves():
+        game.make_move(square_moved_from, square_moved_to)
+        won = game.get_game_state() == "RED_WON"
+        game.unmake_move()
+        if won:
+            return True
+    return False
+
+
+class MyTestCase(unittest.TestCase):
+
+    def test_finds_winning_move(self):
+        for playout_policy in ("RANDOM", "GREEDY_CAPTURE"):
+            player = MCTSPlayer(playouts=300, playout_policy=playout_policy, seed=1)
+            game = HasamiShogiGame.from_position_notation(WINNING_POSITION)
+            self.assertEqual(("i2", "a2"), player.choose_move(game))
+
+    def test_finds_defending_move(self):
+        game = HasamiShogiGame.from_position_notation(DEFENDING_POSITION)
+        losing_moves = 0
+        for square_moved_from, square_moved_to in game.legal_moves():
+            game.make_move(square_moved_from, square_moved_to)
+            losing_moves += red_can_win(game)
+            game.unmake_move()
+        self.assertGreater(losing_moves, len(game.legal_moves()) // 2)
+
+        game.make_move(*MCTSPlayer(playouts=2000, seed=6).choose_move(game))
+        self.assertFalse(red_can_win(game))
+
+    def test_search_leaves_game_unchanged(self):
+        game = HasamiShogiGame()
+        game.make_move("i1", "h1")
+        snapshot, history_length = game.to_bytes(), len(game._move_history)
+        result = MCTSPlayer(playouts=50, seed=2).search(game)
+        self.assertEqual(50, result.playouts)
+        self.assertIn(result.best_move, game.legal_moves())
+        self.assertEqual(snapshot, game.to_bytes())
+        self.assertEqual(history_length, len(game._move_history))
+
+    def test_time_limit(self):
+        result = MCTSPlayer(time_limit=0.05, seed=3).search(HasamiShogiGame())
+        self.assertGreater(result.playouts, 0)
+        self.assertLess(result.elapsed, 1.0)
+
+    def test_no_move_when_finished(self):
+        game = HasamiShogiGame.from_position_notation("R8/B8/9/9/9/9/9/9/1B7 R 8 0")
+        result = MCTSPlayer(playouts=10).search(game)
+        self.assertIsNone(result.best_move)
+        self.assertEqual(0, result.playouts)
+
+    def test_tree_reuse(self):
+        player = MCTSPlayer(playouts=300, seed=4)
+        game = HasamiShogiGame()
+        player.search(game)
+        child = max(player._root.children, key=lambda node: node.visits)
+        game.make_move_idx(*child.move)
+        previous_visits = child.visits
+
+        player.search(game)
+        self.assertIs(child, player._root)
+        self.assertEqual(previous_visits + 300, player._root.visits)
+        player.reset()
+        player.search(game)
+        self.assertEqual(300, player._root.visits)
+
+    def test_root_parallel_search(self):
+        player = MCTSPlayer(playouts=301, processes=2, seed=5)
+        try:
+            result = player.search(HasamiShogiGame.from_position_notation(WINNING_POSITION))
+        finally:
+            player.close()
+        self.assertEqual(("i2", "a2"), result.best_move)
+        self.assertEqual(301, result.playouts)
+
+    def test_parallel_tree_reuse(self):
+        player = MCTSPlayer(playouts=300, processes=2, seed=7)
+        game = HasamiShogiGame()
+        try:
+            game.make_move(*player.search(game).best_move)
+            move_statistics, playouts = player._search_parallel(game)
+            self.assertEqual(300, playouts)
+            self.assertGreater(sum(visits for visits, _ in move_statistics.values()), 300)
+
+            player.reset()
+            move_statistics, playouts = player._search_parallel(game)
+            self.assertEqual(300, sum(visits for visits, _ in move_statistics.values()))
+        finally:
+            player.close()
+
+    def test_unknown_playout_policy(self):
+        with self.assertRaises(ValueError):
+            MCTSPlayer(playout_policy="ALPHA_BETA")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: Counts the positions reachable in a given number of moves from a Hasami Shogi position, for checking
+# move generation and captures and for measuring engine throughput.
+
+import argparse
+import multiprocessing
+import time
+from collections import namedtuple
+
+from hasami_shogi_game import HasamiShogiGame
+
+PerftResult = namedtuple("PerftResult", ["depth", "nodes", "divide", "elapsed", "nodes_per_second", "cache_hits"])
+
+# The subtree cache of this worker process, kept for all the root moves it counts.
+_worker_cache = None
+
+
+class _SubtreeCache(dict):
+    """
+    A dictionary of subtree counts that counts how many of its lookups find a count.
+    """
+
+    def __init__(self):
+        """
+        Takes no parameters.
+        Initializes an empty cache with no hits.
+        """
+        super().__init__()
+        self.hits = 0
+
+    def get(self, key, default=None):
+        """
+        Takes as parameters a key and, optionally, the value to return if the key is not in the cache.
+        Returns the count cached for the key, counting the hit, or the default if there is none.
+        """
+        nodes = super().get(key)
+        if nodes is None:
+            return default
+        self.hits += 1
+        return nodes
+
+
+def perft(game, depth, cache=None):
+    """
+    Takes as parameters a HasamiShogiGame, the number of moves to look ahead and, optionally, a dictionary to cache
+    subtree counts in, which may be shared between calls.
+    Counts the move sequences of the given length from the game's position, making and taking back each move, and
+    leaving the game as it was found. A sequence ends early, and is not counted, once the game is won or the active
+    player has no legal moves.
+    Returns the number of positions at the end of the sequences.
+    """
+    if depth == 0:
+        return 1
+    if game._game_state != "UNFINISHED":
+        return 0
+
+    if depth == 1:
+        occupied_squares = game._boards["BLACK"] | game._boards["RED"]
+        legal_destinations = game._geometry.legal_destinations
+        return sum(
+            game._count_squares(legal_destinations(index_moved_from, occupied_squares))
+            for index_moved_from in game._iter_squares(game._boards[game._active_player])
+        )
+
+    if cache is not None:
+        key = (game._position_hash, game._black_player_captures, game._red_player_captures, depth)
+        nodes = cache.get(key)
+        if nodes is not None:
+            return nodes
+
+    nodes = 0
+    for index_moved_from, index_moved_to in list(game.iter_legal_moves_idx()):
+        game._apply_move(index_moved_from, index_moved_to)
+        nodes += perft(game, depth - 1, cache)
+        game.unmake_move()
+
+    if cache is not None:
+        cache[key] = nodes
+    return nodes
+
+
+def divide(game, depth, processes=1, use_cache=False):
+    """
+    Takes as parameters a HasamiShogiGame and the number of moves to look ahead, at least 1, and optionally the number
+    of processes to count with and whether to cache subtree counts by position hash.
+    Counts the positions after each of the active player's legal moves as perft does, splitting the moves between
+    worker processes when there is more than one, and leaving the game as it was found. Counting in one process, a
+    single cache is shared by all the moves. Counting in several, each worker process keeps one cache for all the
+    moves it counts, but caches are not shared between processes.
+    Returns a dictionary mapping each legal move, as a (square moved from, square moved to) pair in algebraic notation,
+    to its count.
+    Raises a ValueError if the depth is less than 1.
+    """
+    return _divide(game, depth, processes, use_cache)[0]
+
+
+def _divide(game, depth, processes, use_cache):
+    """
+    Takes as parameters a HasamiShogiGame, the number of moves to look ahead, the number of processes to count with
+    and whether to cache subtree counts by position hash.
+    Counts the positions after each legal move as divide does.
+    Returns the dictionary divide returns, and the number of counts found in the caches.
+    Raises a ValueError if the depth is less than 1.
+    """
+    if depth < 1:
+        raise ValueError("depth must be at least 1")
+
+    moves = list(game.iter_legal_moves_idx())
+    board_size = game.get_board_size()
+    if processes > 1 and len(moves) > 1:
+        snapshot = game.to_bytes()
+        tasks = [(snapshot, board_size, game.get_captures_to_win(), move, depth, use_cache) for move in moves]
+        with multiprocessing.Pool(processes, _start_divide_worker, (use_cache,)) as pool:
+            results = pool.map(_divide_worker, tasks)
+        counts = [count for count, _ in results]
+        cache_hits = sum(hits for _, hits in results)
+    else:
+        cache = _SubtreeCache() if use_cache else None
+        counts = []
+        for index_moved_from, index_moved_to in moves:
+            game._apply_move(index_moved_from, index_moved_to)
+            counts.append(perft(game, depth - 1, cache))
+            game.unmake_move()
+        cache_hits = cache.hits if use_cache else 0
+
+    return {
+        (game.idx_to_square(index_moved_from, board_size), game.idx_to_square(index_moved_to, board_size)): count
+        for (index_moved_from, index_moved_to), count in zip(moves, counts)
+    }, cache_hits
+
+
+def _start_divide_worker(use_cache):
+    """
+    Takes as a parameter whether to cache subtree counts.
+    Gives this worker process an empty cache, to be kept for all the root moves it counts, if caching.
+    """
+    global _worker_cache
+    _worker_cache = _SubtreeCache() if use_cache else None
+
+
+def _divide_worker(task):
+    """
+    Takes as a parameter a (snapshot, board size, captures to win, (index moved from, index moved to) move, depth, use
+    cache) tuple.
+    Returns the count of positions after the move in the snapshot's position, as perft returns for one less move,
+    using this worker process's cache, and the number of counts found in the cache.
+    """
+    snapshot, board_size, captures_to_win, (index_moved_from, index_moved_to), depth, use_cache = task
+    game = HasamiShogiGame.from_bytes(snapshot, board_size, captures_to_win)
+    game._apply_move(index_moved_from, index_moved_to)
+    if not use_cache:
+        return perft(game, depth - 1), 0
+    previous_hits = _worker_cache.hits
+    return perft(game, depth - 1, _worker_cache), _worker_cache.hits - previous_hits
+
+
+def run_perft(game, depth, processes=1, use_cache=False):
+    """
+    Takes as parameters a HasamiShogiGame and the number of moves to look ahead, and optionally the number of processes
+    to count with and whether to cache subtree counts by position hash.
+    Returns a PerftResult with the depth, the total count, the count after each legal move as divide returns it, the
+    seconds taken, the positions counted per second and the number of subtree counts found in the caches.
+    """
+    start_time = time.perf_counter()
+    if depth == 0:
+        counts, cache_hits = {}, 0
+        nodes = 1
+    else:
+        counts, cache_hits = _divide(game, depth, processes, use_cache)
+        nodes = sum(counts.values())
+    elapsed = time.perf_counter() - start_time
+    return PerftResult(depth, nodes, counts, elapsed, nodes / elapsed if elapsed > 0 else 0.0, cache_hits)
+
+
+def main():
+    """
+    Takes no parameters.
+    Counts the positions reachable from the position given on the command line, printing the total, the positions
+    counted per second and, if asked, the count after each legal move.
+    """
+    parser = argparse.ArgumentParser(description="Count the positions reachable from a Hasami Shogi position.")
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--position", help="position notation to start from, defaulting to the starting position")
+    parser.add_argument("--divide", action="store_true", help="print the count after each legal move")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--cache", action="store_true", help="cache subtree counts by position hash")
+    arguments = parser.parse_args()
+
+    if arguments.position:
+        game = HasamiShogiGame.from_position_notation(arguments.position)
+    else:
+        game = HasamiShogiGame()
+    result = run_perft(game, arguments.depth, arguments.processes, arguments.cache)
+
+    if arguments.divide:
+        for (square_moved_from, square_moved_to), count in sorted(result.divide.items()):
+            print("%s-%s %d" % (square_moved_from, square_moved_to, count))
+    print("depth %d: %d positions in %.3f seconds (%.0f positions/sec)" % (
+        result.depth, result.nodes, result.elapsed, result.nodes_per_second
+    ))
+    if arguments.cache:
+        print("%d subtree counts found in the cache" % result.cache_hits)
+
+
+if __name__ == "__main__":
+    main()
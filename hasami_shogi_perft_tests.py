@@ -0,0 +1,87 @@
+import unittest
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_perft import divide, perft, run_perft
+
+# A position with captures available to both players, including a corner capture for black at a2.
+CAPTURE_POSITION = "R1R6/B8/3RBR3/9/4B4/9/9/9/1B2B4 B 6 5"
+
+# A small position in which sequences starting with different moves reach the same positions within five moves.
+TRANSPOSING_POSITION = "B3B/5/5/5/R4 B 0 0"
+
+
+def _brute_force_count(game, depth):
+    """
+    Counts the move sequences of the given length by trying every pair of squares with make_move.
+    """
+    if depth == 0:
+        return 1
+    squares = [HasamiShogiGame.idx_to_square(index) for index in range(81)]
+    nodes = 0
+    for square_moved_from in squares:
+        for square_moved_to in squares:
+            if game.make_move(square_moved_from, square_moved_to):
+                nodes += _brute_force_count(game, depth - 1)
+                game.unmake_move()
+    return nodes
+
+
+class MyTestCase(unittest.TestCase):
+
+    # --- TEST COUNTS ---
+
+    def test_starting_position(self):
+        game = HasamiShogiGame()
+        self.assertEqual(1, perft(game, 0))
+        self.assertEqual(63, perft(game, 1))
+        self.assertEqual(3717, perft(game, 2))
+        self.assertEqual(254219, perft(game, 3))
+
+    def test_matches_make_move(self):
+        game = HasamiShogiGame.from_position_notation(CAPTURE_POSITION)
+        self.assertEqual(_brute_force_count(game, 2), perft(game, 2))
+
+    def test_finished_game(self):
+        game = HasamiShogiGame.from_position_notation("R8/B8/9/9/9/9/9/9/1B7 R 8 0")
+        self.assertEqual(1, perft(game, 0))
+        self.assertEqual(0, perft(game, 2))
+
+    def test_leaves_game_unchanged(self):
+        game = HasamiShogiGame.from_position_notation(CAPTURE_POSITION)
+        snapshot = game.to_bytes()
+        perft(game, 3, {})
+        self.assertEqual(snapshot, game.to_bytes())
+        self.assertEqual([], game._move_history)
+
+    # --- TEST DIVIDE ---
+
+    def test_cache_and_processes_agree(self):
+        game = HasamiShogiGame.from_position_notation(CAPTURE_POSITION)
+        counts = divide(game, 3)
+        self.assertEqual(set(game.legal_moves()), set(counts))
+        self.assertEqual(perft(game, 3), sum(counts.values()))
+        self.assertEqual(counts, divide(game, 3, use_cache=True))
+        self.assertEqual(counts, divide(game, 3, processes=2, use_cache=True))
+
+    def test_cache_shared_between_root_moves(self):
+        game = HasamiShogiGame.from_position_notation(TRANSPOSING_POSITION)
+        nodes = perft(game, 5)
+        self.assertEqual(0, run_perft(game, 5).cache_hits)
+
+        result = run_perft(game, 5, use_cache=True)
+        self.assertEqual(nodes, result.nodes)
+        self.assertGreater(result.cache_hits, 0)
+
+        result = run_perft(game, 5, processes=2, use_cache=True)
+        self.assertEqual(nodes, result.nodes)
+        self.assertGreater(result.cache_hits, 0)
+
+    def test_run_perft(self):
+        result = run_perft(HasamiShogiGame(), 2)
+        self.assertEqual(3717, result.nodes)
+        self.assertEqual(63, len(result.divide))
+        with self.assertRaises(ValueError):
+            divide(HasamiShogiGame(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
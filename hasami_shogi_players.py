@@ -0,0 +1,63 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: Simple computer players for the Hasami Shogi game, for self-play and playouts.
+
+import random
+
+
+class RandomPlayer:
+    """
+    A computer player that chooses uniformly among the active player's legal moves.
+    """
+
+    def __init__(self, seed=None):
+        """
+        Takes as an optional parameter the seed for the player's random choices.
+        Initializes the player.
+        """
+        self._random = random.Random(seed)
+
+    def choose_move(self, game):
+        """
+        Takes as a parameter a HasamiShogiGame.
+        Returns a random legal move for the active player as a (square moved from, square moved to) pair in algebraic
+        notation, or None if the active player has no legal moves.
+        """
+        legal_moves = game.legal_moves()
+        if not legal_moves:
+            return None
+        return self._random.choice(legal_moves)
+
+
+class GreedyCapturePlayer:
+    """
+    A computer player that chooses the legal move capturing the most pieces, choosing randomly among equally good moves.
+    """
+
+    def __init__(self, seed=None):
+        """
+        Takes as an optional parameter the seed for the player's random choices.
+        Initializes the player.
+        """
+        self._random = random.Random(seed)
+
+    def choose_move(self, game):
+        """
+        Takes as a parameter a HasamiShogiGame.
+        Returns a legal move capturing the most pieces for the active player as a (square moved from, square moved to)
+        pair in algebraic notation, or None if the active player has no legal moves.
+        """
+        capture_counts = {
+            index: game._count_squares(captured_squares)
+            for index, captured_squares in game.capture_threats_idx().items()
+        }
+        most_captures = max(capture_counts.values(), default=0)
+        best_moves = [
+            move for move in game.iter_legal_moves_idx() if capture_counts.get(move[1], 0) == most_captures
+        ]
+
+        if not best_moves:
+            return None
+        index_moved_from, index_moved_to = self._random.choice(best_moves)
+        board_size = game.get_board_size()
+        return game.idx_to_square(index_moved_from, board_size), game.idx_to_square(index_moved_to, board_size)
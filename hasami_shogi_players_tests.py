@@ -0,0 +1,35 @@
+import unittest
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_players import GreedyCapturePlayer, RandomPlayer
+
+
+class MyTestCase(unittest.TestCase):
+
+    def test_random_player_chooses_legal_move(self):
+        test_game = HasamiShogiGame()
+        test_player = RandomPlayer(seed=1)
+        for _ in range(20):
+            self.assertEqual(True, test_game.make_move(*test_player.choose_move(test_game)))
+
+    def test_random_player_is_repeatable(self):
+        moves_one = [RandomPlayer(seed=7).choose_move(HasamiShogiGame()) for _ in range(3)]
+        moves_two = [RandomPlayer(seed=7).choose_move(HasamiShogiGame()) for _ in range(3)]
+        self.assertEqual(moves_one, moves_two)
+
+    def test_greedy_capture_player_chooses_capture(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i1", "c1")
+        test_game.make_move("a2", "b2")
+        test_game.make_move("c1", "b1")
+        test_game.make_move("a3", "b3")
+        self.assertEqual(("i4", "b4"), GreedyCapturePlayer(seed=1).choose_move(test_game))
+
+    def test_no_move_after_game_over(self):
+        test_game = HasamiShogiGame()
+        test_game._game_state = "BLACK_WON"
+        self.assertEqual(None, RandomPlayer().choose_move(test_game))
+        self.assertEqual(None, GreedyCapturePlayer().choose_move(test_game))
+
+
+if __name__ == '__main__':
+    unittest.main()
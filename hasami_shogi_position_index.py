@@ -0,0 +1,498 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: Indexes the positions reached in archives of Hasami Shogi games, so that the games reaching a position
+# can be found without replaying the archive. The index is a directory of sorted segment files that are searched in
+# place through memory maps, with new games added as new segments that are merged as they accumulate.
+
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_replay import ReplayError, replay_games
+
+IndexReport = namedtuple("IndexReport", ["games", "positions", "segments", "elapsed", "positions_per_second"])
+
+# A segment file starts with a header giving the key size, whether keys are mirrored, the number of records and one
+# more than the largest game id, followed by its records sorted by key: each is the position key, then the game id as
+# a 32-bit and the ply as a 16-bit little-endian integer.
+_MAGIC = b"HSPI"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBB5xQQ")
+_GAME_AND_PLY = struct.Struct("<IH")
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".idx"
+_MAX_GAME_ID = (1 << 32) - 1
+_MAX_PLY = (1 << 16) - 1
+# The manifest names the index's live segments, one per line. It is replaced in a single rename after each segment is
+# added or merged, and segment files it does not name are left over from an interrupted write or merge and removed.
+_MANIFEST = "MANIFEST"
+# After a segment is written, the newest two are merged while the older holds at most this many times as many records
+# as the newer, which keeps the number of segments, and of open memory maps, logarithmic in the size of the index.
+_MERGE_RATIO = 2
+
+# The reversed bits of each row seen so far, by board size and row, for mirroring positions.
+_REVERSED_ROWS = {}
+
+
+def _reverse_row(row, board_size):
+    """
+    Takes as parameters the mask of a row's squares, with bit 0 for column 1, and the number of columns.
+    Returns the mask with the columns in reverse order.
+    """
+    reversed_row = _REVERSED_ROWS.get((board_size, row))
+    if reversed_row is None:
+        reversed_row = int(format(row, "0%db" % board_size)[::-1], 2)
+        _REVERSED_ROWS[(board_size, row)] = reversed_row
+    return reversed_row
+
+
+def _mirror_board(board, board_size):
+    """
+    Takes as parameters a mask of squares and the number of rows and columns on the board.
+    Returns the mask reflected left to right, so that column 1 becomes the last column.
+    """
+    row_mask = (1 << board_size) - 1
+    mirrored_board = 0
+    for row in range(board_size):
+        shift = row * board_size
+        mirrored_board |= _reverse_row(board >> shift & row_mask, board_size) << shift
+    return mirrored_board
+
+
+def _pack_key(black_board, red_board, active_player, board_size):
+    """
+    Takes as parameters the masks of the black and red pieces, the active player and the number of rows and columns on
+    the board.
+    Returns the position's key: each mask as little-endian bytes, then a byte of 0 for black to move or 1 for red.
+    """
+    num_bytes = (board_size * board_size + 7) // 8
+    return (
+        black_board.to_bytes(num_bytes, "little")
+        + red_board.to_bytes(num_bytes, "little")
+        + (b"\0" if active_player == "BLACK" else b"\1")
+    )
+
+
+def position_key(position, mirror=False):
+    """
+    Takes as parameters a HasamiShogiGame or GameState and optionally whether to treat a position and its left-right
+    mirror image as the same.
+    Returns the key the index stores the position under, made from the board and the side to move. When mirroring, the
+    smaller of the keys of the position and its mirror image is returned.
+    """
+    state = position.to_state() if isinstance(position, HasamiShogiGame) else position
+    key = _pack_key(state.black_board, state.red_board, state.active_player, state.board_size)
+    if mirror:
+        mirrored_key = _pack_key(
+            _mirror_board(state.black_board, state.board_size),
+            _mirror_board(state.red_board, state.board_size),
+            state.active_player,
+            state.board_size,
+        )
+        key = min(key, mirrored_key)
+    return key
+
+
+class _Segment:
+    """
+    A segment file of the index, mapped into memory and searched in place.
+    """
+
+    def __init__(self, path):
+        """
+        Takes as a parameter the path to a segment file.
+        Maps the file into memory and reads its header, closing the file once mapped, so that the segment holds only the
+        map's file descriptor.
+        Raises a ValueError if the file is not an index segment.
+        """
+        self.path = path
+        with open(path, "rb") as segment_file:
+            self._map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError("file is not a position index segment: " + str(path))
+        magic, version, self.key_size, self.mirror, self.num_records, self.next_game_id = _HEADER.unpack_from(
+            self._map, 0
+        )
+        self.record_size = self.key_size + _GAME_AND_PLY.size
+        if (
+            magic != _MAGIC
+            or version != _VERSION
+            or len(self._map) != _HEADER.size + self.num_records * self.record_size
+        ):
+            self.close()
+            raise ValueError("file is not a position index segment: " + str(path))
+
+    def close(self):
+        """
+        Takes no parameters.
+        Unmaps the file.
+        """
+        self._map.close()
+
+    def _key_at(self, record):
+        """
+        Takes as a parameter the number of a record.
+        Returns the record's key.
+        """
+        offset = _HEADER.size + record * self.record_size
+        return self._map[offset:offset + self.key_size]
+
+    def _game_and_ply_at(self, record):
+        """
+        Takes as a parameter the number of a record.
+        Returns the record's (game id, ply) pair.
+        """
+        return _GAME_AND_PLY.unpack_from(self._map, _HEADER.size + record * self.record_size + self.key_size)
+
+    def lookup(self, key):
+        """
+        Takes as a parameter a position key.
+        Returns a list of the (game id, ply) pair of each record with the key, found by binary search.
+        """
+        low, high = 0, self.num_records
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        matches = []
+        while low < self.num_records and self._key_at(low) == key:
+            matches.append(self._game_and_ply_at(low))
+            low += 1
+        return matches
+
+    def __iter__(self):
+        """
+        Takes no parameters.
+        Yields each (key, game id, ply) record in order.
+        """
+        for record in range(self.num_records):
+            yield (self._key_at(record),) + self._game_and_ply_at(record)
+
+
+def _write_segment(path, records, num_records, next_game_id, key_size, mirror):
+    """
+    Takes as parameters the path to write to, an iterable of (key, game id, ply) records sorted by key, the number of
+    records, one more than the largest game id, the size of each key and whether the keys are mirrored.
+    Writes the records to a new segment file, first under a temporary name so that a partly written segment is never
+    read.
+    """
+    record_struct = struct.Struct("<%dsIH" % key_size)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as segment_file:
+        segment_file.write(_HEADER.pack(_MAGIC, _VERSION, key_size, mirror, num_records, next_game_id))
+        for record in records:
+            segment_file.write(record_struct.pack(*record))
+    os.replace(temporary_path, path)
+
+
+class PositionIndex:
+    """
+    An index from positions to the games that reached them, stored as a directory of segment files.
+    Each segment holds (position key, game id, ply) records sorted by key, and is searched by binary search through a
+    memory map, so a lookup reads only the few pages it touches. Adding games writes new segments rather than
+    rewriting old ones, and the newest segments are merged whenever they grow close in size to the one before them, so
+    games can be added one at a time while lookups search only a few segments. compact merges every segment into one.
+    """
+
+    def __init__(self, directory, mirror=False, segment_size=1 << 16):
+        """
+        Takes as parameters the directory holding the index, which is created if it does not exist, and optionally
+        whether to treat a position and its left-right mirror image as the same and the most records to write to one
+        segment.
+        Opens the segments named in the index's manifest, removing any other segment files, which were left by an
+        interrupted write or merge. An index without a manifest opens every segment file in the directory.
+        Raises a ValueError if the existing segments were built with a different mirror setting or key size.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._mirror = mirror
+        self._segment_size = segment_size
+        self._segments = []
+        self._next_game_id = 0
+
+        segment_names = sorted(name for name in os.listdir(directory) if name.startswith(_SEGMENT_PREFIX))
+        manifest_path = os.path.join(directory, _MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as manifest:
+                live_names = manifest.read().split()
+            for name in segment_names:
+                if name not in live_names:
+                    os.remove(os.path.join(directory, name))
+        else:
+            live_names = [name for name in segment_names if name.endswith(_SEGMENT_SUFFIX)]
+        for name in live_names:
+            self._open_segment(os.path.join(directory, name))
+
+    def _open_segment(self, path):
+        """
+        Takes as a parameter the path to a segment file.
+        Opens the segment and adds it to the index.
+        Raises a ValueError if it was built with a different mirror setting or key size than the index's other
+        segments.
+        """
+        segment = _Segment(path)
+        if segment.mirror != self._mirror:
+            segment.close()
+            self.close()
+            raise ValueError("index was built with mirror=%s: %s" % (bool(segment.mirror), path))
+        if self._segments and segment.key_size != self._segments[0].key_size:
+            segment.close()
+            self.close()
+            raise ValueError("segment has a different key size from the index: " + str(path))
+        self._segments.append(segment)
+        self._next_game_id = max(self._next_game_id, segment.next_game_id)
+
+    def _write_manifest(self):
+        """
+        Takes no parameters.
+        Replaces the manifest with one naming the index's open segments, first writing it under a temporary name so
+        that the manifest read on opening is always complete.
+        """
+        manifest_path = os.path.join(self._directory, _MANIFEST)
+        temporary_path = manifest_path + ".tmp"
+        with open(temporary_path, "w") as manifest:
+            for segment in self._segments:
+                manifest.write(os.path.basename(segment.path) + "\n")
+        os.replace(temporary_path, manifest_path)
+
+    def close(self):
+        """
+        Takes no parameters.
+        Closes every segment.
+        """
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+    def __enter__(self):
+        """
+        Takes no parameters.
+        Returns the index, for use in a with statement.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Takes as parameters the details of any exception raised in the with statement.
+        Closes the index.
+        """
+        self.close()
+
+    def __len__(self):
+        """
+        Takes no parameters.
+        Returns the number of positions indexed, counting each time a game reached a position.
+        """
+        return sum(segment.num_records for segment in self._segments)
+
+    def get_num_segments(self):
+        """
+        Takes no parameters.
+        Returns the number of segment files in the index.
+        """
+        return len(self._segments)
+
+    def get_next_game_id(self):
+        """
+        Takes no parameters.
+        Returns one more than the largest game id indexed, or 0 if the index is empty.
+        """
+        return self._next_game_id
+
+    def lookup(self, position):
+        """
+        Takes as a parameter a HasamiShogiGame or GameState.
+        Returns a sorted list of the (game id, ply) pair of each time an indexed game reached the position, or its
+        mirror image if the index treats them as the same, where the ply is the number of moves made before it.
+        """
+        key = position_key(position, self._mirror)
+        matches = []
+        for segment in self._segments:
+            if segment.key_size == len(key):
+                matches.extend(segment.lookup(key))
+        return sorted(matches)
+
+    def _new_segment_path(self):
+        """
+        Takes no parameters.
+        Returns the path for the next segment file, numbered after the existing ones.
+        """
+        number = 0
+        if self._segments:
+            name = os.path.basename(self._segments[-1].path)
+            number = int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]) + 1
+        return os.path.join(self._directory, "%s%08d%s" % (_SEGMENT_PREFIX, number, _SEGMENT_SUFFIX))
+
+    def _flush(self, records):
+        """
+        Takes as a parameter a list of (key, game id, ply) records.
+        Sorts the records and writes them to a new segment, then merges the newest segments while the older of the two
+        holds at most _MERGE_RATIO times as many records as the newer.
+        """
+        records.sort()
+        path = self._new_segment_path()
+        next_game_id = max(game_id for _, game_id, _ in records) + 1
+        _write_segment(path, records, len(records), next_game_id, len(records[0][0]), self._mirror)
+        self._open_segment(path)
+        self._write_manifest()
+        while (
+            len(self._segments) > 1
+            and self._segments[-2].num_records <= _MERGE_RATIO * self._segments[-1].num_records
+        ):
+            self._merge_segments(self._segments[-2:])
+
+    def _merge_segments(self, segments):
+        """
+        Takes as a parameter a list of the index's segments.
+        Merges the segments into a single new segment, records the change in the manifest, then removes them, so that
+        an interrupted merge leaves either the old segments or the new one in the index, never both.
+        Raises a ValueError if the segments' keys are of different sizes.
+        """
+        if any(segment.key_size != segments[0].key_size for segment in segments):
+            raise ValueError("cannot merge segments with different key sizes")
+        path = self._new_segment_path()
+        _write_segment(
+            path,
+            heapq.merge(*segments),
+            sum(segment.num_records for segment in segments),
+            max(segment.next_game_id for segment in segments),
+            segments[0].key_size,
+            self._mirror,
+        )
+        for segment in segments:
+            segment.close()
+            self._segments.remove(segment)
+        self._open_segment(path)
+        self._write_manifest()
+        for segment in segments:
+            os.remove(segment.path)
+
+    def _add_positions(self, positions):
+        """
+        Takes as a parameter an iterable of (game id, ply, position) tuples.
+        Indexes the positions, writing a new segment each time the segment size is reached.
+        Returns an IndexReport with the number of games and positions added, the number of segments written before any
+        merging, the seconds taken and the positions added per second.
+        Raises a ValueError if a game id is not from 0 to 2 ** 32 - 1 or a ply is not from 0 to 2 ** 16 - 1, as they are
+        stored in 32 and 16 bits, leaving any segments already written in the index.
+        """
+        start_time = time.perf_counter()
+        game_ids, num_positions, num_segments, records = set(), 0, 0, []
+        for game_id, ply, position in positions:
+            if not 0 <= game_id <= _MAX_GAME_ID:
+                raise ValueError("game id must be from 0 to %d: %r" % (_MAX_GAME_ID, game_id))
+            if not 0 <= ply <= _MAX_PLY:
+                raise ValueError("game %d is longer than %d moves" % (game_id, _MAX_PLY))
+            records.append((position_key(position, self._mirror), game_id, ply))
+            game_ids.add(game_id)
+            if len(records) == self._segment_size:
+                self._flush(records)
+                num_positions += len(records)
+                num_segments += 1
+                records = []
+        if records:
+            self._flush(records)
+            num_positions += len(records)
+            num_segments += 1
+
+        elapsed = time.perf_counter() - start_time
+        return IndexReport(
+            len(game_ids),
+            num_positions,
+            num_segments,
+            elapsed,
+            num_positions / elapsed if elapsed > 0 else 0.0,
+        )
+
+    def add_log(self, path, first_game_id=None, trusted=False):
+        """
+        Takes as parameters the path to a move log and optionally the id of its first game, defaulting to the next game
+        id, and whether to skip checking that moves are legal.
+        Replays the log's games, indexing every position each reached from the start, with each game's id being the
+        first game id plus its zero-based line in the log.
+        Returns an IndexReport as for the games added.
+        Raises a ReplayError if a move is badly formed or, unless trusted, not legal, or a ValueError if a game id does
+        not fit in 32 bits or a game is longer than 65535 moves, leaving any segments already written in the index.
+        """
+        if first_game_id is None:
+            first_game_id = self._next_game_id
+        return self._add_positions(
+            (first_game_id + game_number, ply, game)
+            for game_number, ply, game in replay_games(path, trusted, True)
+        )
+
+    def add_games(self, games):
+        """
+        Takes as a parameter an iterable of (game id, moves) pairs, where the moves are a list of (square moved from,
+        square moved to) pairs in algebraic notation, such as finished games to add as they end.
+        Replays each game from the starting position, indexing every position it reached.
+        Returns an IndexReport as for the games added.
+        Raises a ReplayError if a move is not legal, or a ValueError if a game id does not fit in 32 bits or a game is
+        longer than 65535 moves, leaving any segments already written in the index.
+        """
+        return self._add_positions(
+            (game_id, ply, game) for game_id, moves in games for ply, game in self._replay_moves(game_id, moves)
+        )
+
+    @staticmethod
+    def _replay_moves(game_id, moves):
+        """
+        Takes as parameters a game id and a list of (square moved from, square moved to) pairs.
+        Yields (ply, game) pairs for the starting position and after each move, sharing one game object between them.
+        Raises a ReplayError if a move is not legal.
+        """
+        game = HasamiShogiGame()
+        yield 0, game
+        for ply, (square_moved_from, square_moved_to) in enumerate(moves):
+            if not game.make_move(square_moved_from, square_moved_to):
+                raise ReplayError(game_id, ply, "illegal move %s-%s" % (square_moved_from, square_moved_to))
+            yield ply + 1, game
+
+    def compact(self):
+        """
+        Takes no parameters.
+        Merges every segment into a single new segment, then removes the old ones, so that lookups search one file.
+        """
+        if len(self._segments) > 1:
+            self._merge_segments(list(self._segments))
+
+
+def main():
+    """
+    Takes no parameters.
+    Adds the move logs named on the command line to an index, compacts it if asked, and prints the games reaching each
+    position asked about.
+    """
+    parser = argparse.ArgumentParser(description="Index the positions reached in Hasami Shogi move logs.")
+    parser.add_argument("directory")
+    parser.add_argument("--add", action="append", default=[], help="move log to add to the index")
+    parser.add_argument("--query", action="append", default=[], help="position notation to look up")
+    parser.add_argument("--mirror", action="store_true", help="treat mirror-image positions as the same")
+    parser.add_argument("--compact", action="store_true", help="merge the index's segments into one")
+    arguments = parser.parse_args()
+
+    with PositionIndex(arguments.directory, arguments.mirror) as index:
+        for path in arguments.add:
+            report = index.add_log(path)
+            print("%s: %d games, %d positions in %.3f seconds (%.0f positions/sec)" % (
+                path, report.games, report.positions, report.elapsed, report.positions_per_second
+            ))
+        if arguments.compact:
+            index.compact()
+        for notation in arguments.query:
+            matches = index.lookup(HasamiShogiGame.from_position_notation(notation))
+            print("%s: %d games" % (notation, len({game_id for game_id, _ in matches})))
+            for game_id, ply in matches:
+                print("  game %d, move %d" % (game_id, ply))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+from hasami_shogi_game import GameState, HasamiShogiGame
+from hasami_shogi_position_index import PositionIndex, _Segment, _write_segment, position_key
+from hasami_shogi_replay import ReplayError
+
+MOVE_LOG = [
+    "i1-b1 a2-b2 i3-b3",
+    "i1-c1 a2-b2 c1-b1 a3-b3 i4-b4",
+    "i9-b9 a8-b8",
+    "i1-b1 a2-b2 i2-h2 b2-b3 h2-a2",
+]
+
+
+def _game_after(moves):
+    """
+    Returns a new game with the given "from-to" moves made.
+    """
+    game = HasamiShogiGame()
+    for move in moves:
+        game.make_move(*move.split("-"))
+    return game
+
+
+def _segment_files(directory):
+    """
+    Returns the names of the segment files in an index directory.
+    """
+    return [name for name in os.listdir(directory) if name.startswith("segment-")]
+
+
+def _state_from_key(key):
+    """
+    Returns a GameState, without captures, of the position a key made without mirroring was made from.
+    """
+    return GameState(
+        int.from_bytes(key[:11], "little"), int.from_bytes(key[11:22], "little"),
+        active_player="BLACK" if key[22] == 0 else "RED",
+    )
+
+
+class MyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index_directory = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.index_directory.name, "index")
+        self.log_path = os.path.join(self.index_directory.name, "games.txt")
+        with open(self.log_path, "w") as move_log:
+            move_log.write("\n".join(MOVE_LOG) + "\n")
+
+    def tearDown(self):
+        self.index_directory.cleanup()
+
+    # --- TEST KEYS ---
+
+    def test_position_key(self):
+        game = _game_after(["i1-b1"])
+        self.assertEqual(23, len(position_key(game)))
+        self.assertEqual(position_key(game), position_key(game.to_state()))
+        self.assertNotEqual(position_key(game), position_key(_game_after(["i9-b9"])))
+        self.assertEqual(position_key(game, mirror=True), position_key(_game_after(["i9-b9"]), mirror=True))
+        self.assertNotEqual(position_key(HasamiShogiGame()), position_key(HasamiShogiGame.from_position_notation(
+            "RRRRRRRRR/9/9/9/9/9/9/9/BBBBBBBBB R 0 0"
+        )))
+
+    # --- TEST LOOKUPS ---
+
+    def test_lookup(self):
+        with PositionIndex(self.index_path) as index:
+            report = index.add_log(self.log_path)
+            self.assertEqual((4, 19, 1), (report.games, report.positions, report.segments))
+            self.assertEqual(19, len(index))
+            self.assertEqual([(0, 0), (1, 0), (2, 0), (3, 0)], index.lookup(HasamiShogiGame()))
+            self.assertEqual([(0, 1), (3, 1)], index.lookup(_game_after(["i1-b1"])))
+            self.assertEqual([(0, 2), (3, 2)], index.lookup(_game_after(["i1-b1", "a2-b2"])))
+            self.assertEqual([], index.lookup(_game_after(["i1-h1"])))
+
+    def test_lookup_mirrored(self):
+        with PositionIndex(self.index_path, mirror=True) as index:
+            index.add_log(self.log_path)
+            self.assertEqual([(0, 1), (2, 1), (3, 1)], index.lookup(_game_after(["i9-b9"])))
+            self.assertEqual([(0, 1), (2, 1), (3, 1)], index.lookup(_game_after(["i1-b1"])))
+        with self.assertRaises(ValueError):
+            PositionIndex(self.index_path)
+
+    def test_matches_replay(self):
+        random_moves = random.Random(5)
+        games, expected = [], {}
+        for game_id in range(30):
+            game, moves = HasamiShogiGame(), []
+            expected.setdefault(position_key(game), []).append((game_id, 0))
+            for ply in range(30):
+                move = random_moves.choice(game.legal_moves())
+                game.make_move(*move)
+                moves.append(move)
+                expected.setdefault(position_key(game), []).append((game_id, ply + 1))
+                if game.get_game_state() != "UNFINISHED":
+                    break
+            games.append((game_id, moves))
+
+        with PositionIndex(self.index_path, segment_size=100) as index:
+            report = index.add_games(games)
+            self.assertGreater(report.segments, 1)
+            for key, matches in expected.items():
+                self.assertEqual(matches, index.lookup(_state_from_key(key)))
+
+    # --- TEST APPENDS ---
+
+    def test_append_reopen_and_compact(self):
+        with PositionIndex(self.index_path) as index:
+            index.add_log(self.log_path)
+            self.assertEqual(4, index.get_next_game_id())
+            report = index.add_games([(10, [("i1", "b1"), ("a2", "b2")])])
+            self.assertEqual((1, 3, 1), (report.games, report.positions, report.segments))
+            self.assertEqual(2, index.get_num_segments())
+
+        with PositionIndex(self.index_path) as index:
+            self.assertEqual(11, index.get_next_game_id())
+            expected = [(0, 1), (3, 1), (10, 1)]
+            self.assertEqual(expected, index.lookup(_game_after(["i1-b1"])))
+            index.compact()
+            self.assertEqual(1, index.get_num_segments())
+            self.assertEqual(22, len(index))
+            self.assertEqual(expected, index.lookup(_game_after(["i1-b1"])))
+            self.assertEqual(1, len(_segment_files(self.index_path)))
+
+        with PositionIndex(self.index_path) as index:
+            self.assertEqual(expected, index.lookup(_game_after(["i1-b1"])))
+            index.add_log(self.log_path)
+            self.assertEqual(1, index.get_num_segments())
+            self.assertEqual(15, index.get_next_game_id())
+            self.assertEqual(41, len(index))
+            expected = [(0, 1), (3, 1), (10, 1), (11, 1), (14, 1)]
+            self.assertEqual(expected, index.lookup(_game_after(["i1-b1"])))
+            self.assertEqual(1, len(_segment_files(self.index_path)))
+
+    def test_merges_segments_added_one_game_at_a_time(self):
+        num_descriptors = len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else None
+        with PositionIndex(self.index_path) as index:
+            for game_id in range(600):
+                index.add_games([(game_id, [("i1", "b1"), ("a2", "b2")])])
+                self.assertLessEqual(index.get_num_segments(), (game_id + 1).bit_length())
+            self.assertEqual(1800, len(index))
+            self.assertEqual(len(_segment_files(self.index_path)), index.get_num_segments())
+            if num_descriptors is not None:
+                self.assertLessEqual(len(os.listdir("/proc/self/fd")), num_descriptors + index.get_num_segments())
+            self.assertEqual([(game_id, 1) for game_id in range(600)], index.lookup(_game_after(["i1-b1"])))
+
+    # --- TEST INTERRUPTED MERGES ---
+
+    def test_merge_interrupted_before_manifest(self):
+        with PositionIndex(self.index_path) as index:
+            index.add_log(self.log_path)
+            index.add_games([(10, [("i1", "b1"), ("a2", "b2")])])
+            with mock.patch.object(PositionIndex, "_write_manifest", side_effect=OSError):
+                with self.assertRaises(OSError):
+                    index.compact()
+        self.assertEqual(3, len(_segment_files(self.index_path)))
+
+        with PositionIndex(self.index_path) as index:
+            self.assertEqual(2, index.get_num_segments())
+            self.assertEqual(22, len(index))
+            self.assertEqual([(0, 1), (3, 1), (10, 1)], index.lookup(_game_after(["i1-b1"])))
+        self.assertEqual(2, len(_segment_files(self.index_path)))
+
+    def test_merge_interrupted_after_manifest(self):
+        with PositionIndex(self.index_path) as index:
+            index.add_log(self.log_path)
+            index.add_games([(10, [("i1", "b1"), ("a2", "b2")])])
+            with mock.patch("os.remove", side_effect=OSError):
+                with self.assertRaises(OSError):
+                    index.compact()
+        self.assertEqual(3, len(_segment_files(self.index_path)))
+
+        with PositionIndex(self.index_path) as index:
+            self.assertEqual(1, index.get_num_segments())
+            self.assertEqual(22, len(index))
+            self.assertEqual([(0, 1), (3, 1), (10, 1)], index.lookup(_game_after(["i1-b1"])))
+        self.assertEqual(1, len(_segment_files(self.index_path)))
+
+    # --- TEST INVALID INPUT ---
+
+    def test_game_ids_and_plies_out_of_range(self):
+        with PositionIndex(self.index_path) as index:
+            for game_id in (-1, 1 << 32):
+                with self.assertRaises(ValueError):
+                    index.add_games([(game_id, [])])
+            with self.assertRaises(ValueError):
+                index.add_log(self.log_path, first_game_id=(1 << 32) - 2)
+            with self.assertRaises(ValueError):
+                index._add_positions([(0, 1 << 16, HasamiShogiGame())])
+            index.add_games([((1 << 32) - 1, [])])
+            self.assertEqual([((1 << 32) - 1, 0)], index.lookup(HasamiShogiGame()))
+
+    def test_key_sizes_must_match(self):
+        os.makedirs(self.index_path)
+        for number, key_size in ((0, 23), (1, 7)):
+            path = os.path.join(self.index_path, "segment-%08d.idx" % number)
+            _write_segment(path, [(b"\0" * key_size, 0, 0)], 1, 1, key_size, False)
+        with self.assertRaises(ValueError):
+            PositionIndex(self.index_path)
+
+        with PositionIndex(os.path.join(self.index_directory.name, "other")) as index:
+            segments = [
+                _Segment(os.path.join(self.index_path, name)) for name in sorted(_segment_files(self.index_path))
+            ]
+            try:
+                with self.assertRaises(ValueError):
+                    index._merge_segments(segments)
+            finally:
+                for segment in segments:
+                    segment.close()
+
+    def test_invalid_games(self):
+        with PositionIndex(self.index_path) as index:
+            with self.assertRaises(ReplayError):
+                index.add_games([(0, [("i1", "b1"), ("i2", "b2")])])
+        with open(os.path.join(self.index_path, "segment-00000009.idx"), "wb") as segment_file:
+            segment_file.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            PositionIndex(self.index_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
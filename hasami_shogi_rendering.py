@@ -0,0 +1,158 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: Renders Hasami Shogi boards as text, caching each row between renders, and describes each move as a
+# compact diff for spectators.
+
+import string
+from collections import namedtuple
+
+from hasami_shogi_game import HasamiShogiGame
+
+BoardDiff = namedtuple("BoardDiff", ["player", "square_moved_from", "square_moved_to", "captured_squares"])
+
+
+def _render_header(board_size):
+    """
+    Takes as a parameter the number of rows and columns on the board.
+    Returns the line of text numbering the columns.
+    """
+    width = len(str(board_size))
+    return "  " + " ".join(str(col).rjust(width) for col in range(1, board_size + 1)) + "\n"
+
+
+def _render_row(row, black_row, red_row, board_size):
+    """
+    Takes as parameters a row number, the masks of the black and red pieces in the row, with bit 0 for column 1, and
+    the number of rows and columns on the board.
+    Returns the row's line of text.
+    """
+    width = len(str(board_size))
+    squares = [string.ascii_lowercase[row]]
+    for col in range(board_size):
+        if black_row >> col & 1:
+            squares.append("B".rjust(width))
+        elif red_row >> col & 1:
+            squares.append("R".rjust(width))
+        else:
+            squares.append(".".rjust(width))
+    return " ".join(squares) + "\n"
+
+
+class BoardRenderer:
+    """
+    Renders the board of a game, or of a GameState, as text, in the format printed by HasamiShogiGame.print_board.
+    The text of each row is kept between renders and rebuilt only when a square in that row has changed, so that
+    rendering after a move rebuilds at most the rows the move and its captures touched. Rendering a board of another
+    size starts the cache over.
+    """
+
+    def __init__(self):
+        """
+        Takes no parameters.
+        Initializes the renderer with nothing rendered.
+        """
+        self._board_size = None
+        self._header = None
+        self._black_board = 0
+        self._red_board = 0
+        self._row_texts = []
+        self._text = None
+
+    def _reset(self, board_size):
+        """
+        Takes as a parameter the number of rows and columns on the board.
+        Starts the cache over with an empty board of that size.
+        """
+        self._board_size = board_size
+        self._header = _render_header(board_size)
+        self._black_board = 0
+        self._red_board = 0
+        self._row_texts = [_render_row(row, 0, 0, board_size) for row in range(board_size)]
+        self._text = None
+
+    def update(self, position):
+        """
+        Takes as a parameter a HasamiShogiGame or GameState.
+        Brings the cached rows up to date with the position.
+        Returns a dictionary mapping the label of each row that changed since the last update to its new line of text.
+        """
+        board_size = position.get_board_size()
+        if board_size != self._board_size:
+            self._reset(board_size)
+        black_board, red_board = position.get_board_masks()
+        changed_squares = (black_board ^ self._black_board) | (red_board ^ self._red_board)
+        if not changed_squares:
+            return {}
+
+        changed_rows = {}
+        row_mask = (1 << board_size) - 1
+        for row in range(board_size):
+            shift = row * board_size
+            if changed_squares >> shift & row_mask:
+                row_text = _render_row(row, black_board >> shift & row_mask, red_board >> shift & row_mask, board_size)
+                self._row_texts[row] = row_text
+                changed_rows[string.ascii_lowercase[row]] = row_text
+        self._black_board = black_board
+        self._red_board = red_board
+        self._text = None
+        return changed_rows
+
+    def render(self, position, buffer=None):
+        """
+        Takes as parameters a HasamiShogiGame or GameState and, optionally, a buffer with a write method, such as a file
+        or io.StringIO.
+        Writes the board's text to the buffer, if one is given.
+        Returns the board's text, with the column numbers on the first line and one line per row.
+        """
+        self.update(position)
+        if self._text is None:
+            self._text = self._header + "".join(self._row_texts)
+        if buffer is not None:
+            buffer.write(self._text)
+        return self._text
+
+
+def get_move_diff(game):
+    """
+    Takes as a parameter a HasamiShogiGame.
+    Returns a BoardDiff of the most recent move, with the player who made it, the squares moved from and to, and a
+    tuple of the squares it captured, all in algebraic notation, or None if no moves have been made.
+    """
+    last_move = game.get_last_move()
+    if last_move is None:
+        return None
+    player, square_moved_from, square_moved_to, captured_squares = last_move
+    return BoardDiff(player, square_moved_from, square_moved_to, tuple(captured_squares))
+
+
+def format_move_diff(diff):
+    """
+    Takes as a parameter a BoardDiff.
+    Returns the diff as a short line of text, such as "B i1-b1 x b2 b3": the player's initial, the move, and the squares
+    captured, if any.
+    """
+    text = "%s %s-%s" % (diff.player[0], diff.square_moved_from, diff.square_moved_to)
+    if diff.captured_squares:
+        text += " x " + " ".join(diff.captured_squares)
+    return text
+
+
+def parse_move_diff(text, board_size=9):
+    """
+    Takes as parameters a line of text returned by format_move_diff and, optionally, the number of rows and columns on
+    the board.
+    Returns the BoardDiff it describes.
+    Raises a ValueError if the text is not a valid diff for a board of that size.
+    """
+    square_names = HasamiShogiGame.get_square_names(board_size)
+    fields = text.split()
+    if len(fields) < 2 or fields[0] not in ("B", "R") or fields[1].count("-") != 1:
+        raise ValueError("move diff is not valid: " + text)
+    square_moved_from, square_moved_to = fields[1].split("-")
+    captured_squares = tuple(fields[3:])
+    if len(fields) > 2 and (fields[2] != "x" or not captured_squares):
+        raise ValueError("move diff is not valid: " + text)
+    squares = (square_moved_from, square_moved_to) + captured_squares
+    if any(square not in square_names for square in squares):
+        raise ValueError("move diff is not valid: " + text)
+    return BoardDiff("BLACK" if fields[0] == "B" else "RED", square_moved_from, square_moved_to, captured_squares)
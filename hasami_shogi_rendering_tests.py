@@ -0,0 +1,92 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from hasami_shogi_game import STARTING_STATE, HasamiShogiGame
+from hasami_shogi_rendering import BoardDiff, BoardRenderer, format_move_diff, get_move_diff, parse_move_diff
+
+
+class MyTestCase(unittest.TestCase):
+
+    # --- TEST RENDERING ---
+
+    def test_render_starting_position(self):
+        text = BoardRenderer().render(HasamiShogiGame())
+        lines = text.splitlines()
+        self.assertEqual(10, len(lines))
+        self.assertEqual("  1 2 3 4 5 6 7 8 9", lines[0])
+        self.assertEqual("a R R R R R R R R R", lines[1])
+        self.assertEqual("e . . . . . . . . .", lines[5])
+        self.assertEqual("i B B B B B B B B B", lines[9])
+        self.assertEqual(text, BoardRenderer().render(STARTING_STATE))
+
+    def test_update_changed_rows(self):
+        renderer = BoardRenderer()
+        test_game = HasamiShogiGame()
+        self.assertEqual(["a", "i"], sorted(renderer.update(test_game)))
+        self.assertEqual({}, renderer.update(test_game))
+        test_game.make_move("i1", "b1")
+        self.assertEqual({"b": "b B . . . . . . . .\n", "i": "i . B B B B B B B B\n"}, renderer.update(test_game))
+        test_game.make_move("a2", "c2")
+        self.assertEqual(["a", "c"], sorted(renderer.update(test_game)))
+
+    def test_render_matches_fresh_render(self):
+        renderer = BoardRenderer()
+        test_game = HasamiShogiGame()
+        for move in (("i1", "c1"), ("a2", "b2"), ("c1", "b1"), ("a3", "b3"), ("i4", "b4")):
+            test_game.make_move(*move)
+            self.assertEqual(BoardRenderer().render(test_game), renderer.render(test_game))
+
+    def test_render_into_buffer(self):
+        test_game = HasamiShogiGame()
+        output = io.StringIO()
+        text = BoardRenderer().render(test_game, output)
+        self.assertEqual(text, output.getvalue())
+
+    def test_render_other_board_sizes(self):
+        renderer = BoardRenderer()
+        self.assertEqual("  1 2 3 4 5\na R R R R R\n", renderer.render(HasamiShogiGame(5))[:24])
+        self.assertEqual(BoardRenderer().render(HasamiShogiGame()), renderer.render(HasamiShogiGame()))
+        lines = renderer.render(HasamiShogiGame(11)).splitlines()
+        self.assertEqual("   1  2  3  4  5  6  7  8  9 10 11", lines[0])
+        self.assertEqual("k  B  B  B  B  B  B  B  B  B  B  B", lines[11])
+
+    def test_render_matches_print_board(self):
+        for board_size in (5, 9, 11):
+            test_game = HasamiShogiGame(board_size)
+            test_game.make_move(test_game.get_square_names(board_size)[-1], "c1")
+            output = io.StringIO()
+            with redirect_stdout(output):
+                test_game.print_board()
+            self.assertEqual(output.getvalue(), BoardRenderer().render(test_game))
+
+    # --- TEST MOVE DIFFS ---
+
+    def test_move_diff(self):
+        test_game = HasamiShogiGame()
+        self.assertIsNone(get_move_diff(test_game))
+        for move in (("i1", "c1"), ("a2", "b2"), ("c1", "b1"), ("a3", "b3"), ("i4", "b4")):
+            test_game.make_move(*move)
+        diff = get_move_diff(test_game)
+        self.assertEqual(BoardDiff("BLACK", "i4", "b4", ("b2", "b3")), diff)
+        self.assertEqual("B i4-b4 x b2 b3", format_move_diff(diff))
+        self.assertEqual(diff, parse_move_diff(format_move_diff(diff)))
+        test_game.make_move("a4", "a3")
+        self.assertEqual("R a4-a3", format_move_diff(get_move_diff(test_game)))
+
+    def test_move_diff_other_board_size(self):
+        test_game = HasamiShogiGame(11)
+        test_game.make_move("k1", "c1")
+        diff = get_move_diff(test_game)
+        self.assertEqual("B k1-c1", format_move_diff(diff))
+        self.assertEqual(diff, parse_move_diff("B k1-c1", 11))
+        with self.assertRaises(ValueError):
+            parse_move_diff("B k1-c1")
+
+    def test_invalid_move_diff(self):
+        for text in ("", "X i1-h1", "B i1h1", "B i1-j1", "B i1-h1 b2", "B i1-h1 x"):
+            with self.assertRaises(ValueError):
+                parse_move_diff(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: Streams Hasami Shogi games from move-log archives, replaying them in this process or across a process
+# pool.
+
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque, namedtuple
+
+from hasami_shogi_game import HasamiShogiGame
+
+ValidationReport = namedtuple("ValidationReport", ["games", "moves", "invalid_games", "elapsed", "games_per_second"])
+
+# The chunks of a log waiting for or being replayed by each worker, so that finished results waiting to be yielded
+# never hold more than a few chunks' worth of games.
+_CHUNKS_IN_FLIGHT_PER_PROCESS = 2
+
+
+class ReplayError(ValueError):
+    """
+    Raised when a game in a move log contains a move that is badly formed or not legal.
+    """
+
+    def __init__(self, game_number, ply, message):
+        """
+        Takes as parameters the number of the game (its zero-based line in the log), the number of moves replayed before
+        the bad move and a description of the problem.
+        Initializes the error.
+        """
+        super().__init__("game %d, move %d: %s" % (game_number, ply + 1, message))
+        self.game_number = game_number
+        self.ply = ply
+        self.message = message
+
+
+def _decode_line(line):
+    """
+    Takes as a parameter a line of a move log, as bytes.
+    Returns the line as text, with any byte that is not ASCII replaced, so that it makes its move badly formed.
+    """
+    return line.decode("ascii", "replace")
+
+
+def _parse_moves(line):
+    """
+    Takes as a parameter a line of a move log.
+    Returns a list of the line's moves as (index moved from, index moved to) pairs.
+    Raises a ValueError, with the number of moves parsed as its second argument, if a move is badly formed.
+    """
+    moves = []
+    for move in line.split():
+        squares = move.split("-")
+        try:
+            if len(squares) != 2:
+                raise ValueError("move is not in from-to form: " + move)
+            moves.append((HasamiShogiGame.square_to_idx(squares[0]), HasamiShogiGame.square_to_idx(squares[1])))
+        except ValueError as error:
+            raise ValueError(str(error), len(moves)) from None
+    return moves
+
+
+def _replay_line(line, game_number, trusted, intermediate):
+    """
+    Takes as parameters a line of a move log, its game number, whether to skip checking that moves are legal and whether
+    to yield the game after every move.
+    Yields (game number, moves replayed, game) tuples, sharing one game object between them.
+    Raises a ReplayError if a move is badly formed or, unless trusted, not legal.
+    """
+    try:
+        moves = _parse_moves(line)
+    except ValueError as error:
+        raise ReplayError(game_number, error.args[1], error.args[0]) from None
+
+    game = HasamiShogiGame()
+    if intermediate:
+        yield game_number, 0, game
+    for ply, (index_moved_from, index_moved_to) in enumerate(moves):
+        if trusted:
+            game._apply_move(index_moved_from, index_moved_to)
+        elif not game._make_move_index(index_moved_from, index_moved_to):
+            square_moved_from = HasamiShogiGame.idx_to_square(index_moved_from)
+            square_moved_to = HasamiShogiGame.idx_to_square(index_moved_to)
+            raise ReplayError(game_number, ply, "illegal move %s-%s" % (square_moved_from, square_moved_to))
+        if intermediate:
+            yield game_number, ply + 1, game
+    if not intermediate:
+        yield game_number, len(moves), game
+
+
+def replay_games(path, trusted=False, intermediate=False):
+    """
+    Takes as parameters the path to a move log, holding one game per line as space-separated "from-to" moves in
+    algebraic notation, and optionally whether to skip checking that moves are legal, for logs that have already been
+    validated, and whether to yield the game after every move rather than only at the end.
+    Reads the log one line at a time, decoding it as replay_games_parallel does, yielding (game number, moves replayed,
+    game) tuples, where the game number is the zero-based line of the game. When yielding after every move, the same
+    game object is updated in place, so copy it with to_bytes to keep a position.
+    Raises a ReplayError if a move is badly formed or, unless trusted, not legal.
+    """
+    with open(path, "rb") as move_log:
+        for game_number, line in enumerate(move_log):
+            yield from _replay_line(_decode_line(line), game_number, trusted, intermediate)
+
+
+def _split_log(path, chunk_size):
+    """
+    Takes as parameters the path to a move log and the number of bytes in each chunk.
+    Yields (start, end) byte ranges covering the file. A line belongs to the chunk in which it starts.
+    """
+    file_size = os.path.getsize(path)
+    for start in range(0, file_size, chunk_size):
+        yield start, min(start + chunk_size, file_size)
+
+
+def _iter_chunk_lines(path, start, end):
+    """
+    Takes as parameters the path to a move log and a byte range in it.
+    Yields each line that starts within the range.
+    """
+    with open(path, "rb") as move_log:
+        if start:
+            move_log.seek(start - 1)
+            move_log.readline()
+        while move_log.tell() < end:
+            line = move_log.readline()
+            if not line:
+                break
+            yield _decode_line(line)
+
+
+def _replay_chunk(task):
+    """
+    Takes as a parameter a (path, start, end, trusted) tuple describing a byte range of a move log.
+    Replays every game that starts within the range, continuing past bad games.
+    Returns a list with a (moves replayed, snapshot, error message) tuple for each game, in order, where the snapshot is
+    None and the error message is set if the game could not be replayed.
+    """
+    path, start, end, trusted = task
+    results = []
+    for line in _iter_chunk_lines(path, start, end):
+        try:
+            for _, ply, game in _replay_line(line, 0, trusted, False):
+                results.append((ply, game.to_bytes(), None))
+        except ReplayError as error:
+            results.append((error.ply, None, error.message))
+    return results
+
+
+def _iter_chunk_results(path, processes, trusted, chunk_size):
+    """
+    Takes as parameters the path to a move log, the number of worker processes, whether to skip checking that moves
+    are legal and the number of bytes of the log in each chunk.
+    Splits the log into chunks and hands them to the workers, keeping only a few chunks per worker in flight, and yields
+    a (game number, moves replayed, snapshot, error message) tuple for each game, in log order, as each chunk finishes.
+    Raises a ValueError if the chunk size is less than 1.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk size must be at least 1")
+    if processes is None:
+        processes = os.cpu_count() or 1
+    tasks = ((path, start, end, trusted) for start, end in _split_log(path, chunk_size))
+    max_chunks_in_flight = processes * _CHUNKS_IN_FLIGHT_PER_PROCESS
+
+    game_number = 0
+    with multiprocessing.Pool(processes) as pool:
+        chunks_in_flight = deque()
+        while True:
+            while len(chunks_in_flight) < max_chunks_in_flight:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                chunks_in_flight.append(pool.apply_async(_replay_chunk, (task,)))
+            if not chunks_in_flight:
+                break
+            for ply, snapshot, error_message in chunks_in_flight.popleft().get():
+                yield game_number, ply, snapshot, error_message
+                game_number += 1
+
+
+def replay_games_parallel(path, processes=None, trusted=False, chunk_size=1 << 20):
+    """
+    Takes as parameters the path to a move log, and optionally the number of worker processes, defaulting to one per
+    core, whether to skip checking that moves are legal and the number of bytes of the log each worker replays at a
+    time.
+    Replays the games across a process pool, each worker handling a chunk of the file at a time, with only a few chunks
+    per worker read or replayed ahead of the games yielded, so that memory use does not grow with the size of the log.
+    Yields a (game number, moves replayed, game) tuple with the final position of each game, in log order.
+    Raises a ReplayError if a move is badly formed or, unless trusted, not legal.
+    Raises a ValueError if the chunk size is less than 1.
+    """
+    for game_number, ply, snapshot, error_message in _iter_chunk_results(path, processes, trusted, chunk_size):
+        if error_message is not None:
+            raise ReplayError(game_number, ply, error_message)
+        yield game_number, ply, HasamiShogiGame.from_bytes(snapshot)
+
+
+def validate_archive(path, processes=None, chunk_size=1 << 20):
+    """
+    Takes as parameters the path to a move log and optionally the number of worker processes, defaulting to one per
+    core, and the number of bytes of the log each worker checks at a time.
+    Checks every move of every game across a process pool, as replay_games_parallel replays them, continuing past bad
+    games.
+    Returns a ValidationReport with the number of games and moves, a list of (game number, move number, message)
+    tuples for the bad games, the seconds taken and the games checked per second.
+    Raises a ValueError if the chunk size is less than 1.
+    """
+    start_time = time.perf_counter()
+    games, moves, invalid_games = 0, 0, []
+    for game_number, ply, _, error_message in _iter_chunk_results(path, processes, False, chunk_size):
+        games += 1
+        moves += ply
+        if error_message is not None:
+            invalid_games.append((game_number, ply + 1, error_message))
+
+    elapsed = time.perf_counter() - start_time
+    return ValidationReport(games, moves, invalid_games, elapsed, games / elapsed if elapsed > 0 else 0.0)
+
+
+def main():
+    """
+    Takes no parameters.
+    Validates the move log named on the command line and prints the report.
+    """
+    parser = argparse.ArgumentParser(description="Validate a Hasami Shogi move log.")
+    parser.add_argument("path")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1 << 20, help="bytes of the log each worker checks at a time")
+    arguments = parser.parse_args()
+
+    report = validate_archive(arguments.path, arguments.processes, arguments.chunk_size)
+    print("games: %d, moves: %d, elapsed: %.2fs" % (report.games, report.moves, report.elapsed))
+    print("games/sec: %.2f" % report.games_per_second)
+    print("invalid games: %d" % len(report.invalid_games))
+    for game_number, move_number, message in report.invalid_games:
+        print("game %d, move %d: %s" % (game_number, move_number, message))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_replay import ReplayError, replay_games, replay_games_parallel, validate_archive
+
+MOVE_LOG = [
+    "i1-b1 a2-b2 i3-b3",
+    "i1-c1 a2-b2 c1-b1 a3-b3 i4-b4",
+    "",
+    "i1-b1 a2-b2 i2-h2 b2-b3 h2-a2",
+    "i8-h8 a9-h9 h8-h2 a8-i8",
+]
+
+
+class MyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.log_directory = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.log_directory.name, "games.txt")
+        self.write_log(MOVE_LOG)
+
+    def tearDown(self):
+        self.log_directory.cleanup()
+
+    def write_log(self, lines):
+        with open(self.log_path, "w") as move_log:
+            move_log.write("\n".join(lines) + "\n")
+
+    def expected_game(self, line):
+        test_game = HasamiShogiGame()
+        for move in line.split():
+            test_game.make_move(*move.split("-"))
+        return test_game
+
+    def test_replay_final_positions(self):
+        replayed_games = list(replay_games(self.log_path))
+        self.assertEqual([0, 1, 2, 3, 4], [game_number for game_number, _, _ in replayed_games])
+        self.assertEqual([3, 5, 0, 5, 4], [ply for _, ply, _ in replayed_games])
+        for line, (_, _, replayed_game) in zip(MOVE_LOG, replayed_games):
+            self.assertEqual(self.expected_game(line).to_bytes(), replayed_game.to_bytes())
+
+    def test_replay_intermediate_positions(self):
+        positions = [
+            (game_number, ply, replayed_game.get_num_captured_pieces("BLACK"))
+            for game_number, ply, replayed_game in replay_games(self.log_path, intermediate=True)
+            if game_number == 0
+        ]
+        self.assertEqual([(0, 0, 0), (0, 1, 0), (0, 2, 0), (0, 3, 1)], positions)
+
+    def test_trusted_replay(self):
+        trusted_games = [replayed_game.to_bytes() for _, _, replayed_game in replay_games(self.log_path, trusted=True)]
+        checked_games = [replayed_game.to_bytes() for _, _, replayed_game in replay_games(self.log_path)]
+        self.assertEqual(checked_games, trusted_games)
+
+    def test_illegal_move(self):
+        self.write_log(MOVE_LOG[:2] + ["i1-h1 h1-g1"])
+        with self.assertRaises(ReplayError) as context:
+            list(replay_games(self.log_path))
+        self.assertEqual(2, context.exception.game_number)
+        self.assertEqual(1, context.exception.ply)
+
+    def test_badly_formed_move(self):
+        self.write_log(["i1-h1 a1-a2 z1-b1"])
+        with self.assertRaises(ReplayError) as context:
+            list(replay_games(self.log_path, trusted=True))
+        self.assertEqual(2, context.exception.ply)
+
+    def test_parallel_replay_matches_serial_replay(self):
+        self.write_log(MOVE_LOG * 7)
+        serial_games = [(number, ply, game.to_bytes()) for number, ply, game in replay_games(self.log_path)]
+        parallel_games = [
+            (number, ply, game.to_bytes()) for number, ply, game in replay_games_parallel(self.log_path, processes=2)
+        ]
+        self.assertEqual(serial_games, parallel_games)
+
+    def test_parallel_replay_small_chunks(self):
+        self.write_log(MOVE_LOG * 7)
+        serial_games = [(number, ply, game.to_bytes()) for number, ply, game in replay_games(self.log_path)]
+        for chunk_size in (1, 7, 64):
+            parallel_games = [
+                (number, ply, game.to_bytes())
+                for number, ply, game in replay_games_parallel(self.log_path, processes=2, chunk_size=chunk_size)
+            ]
+            self.assertEqual(serial_games, parallel_games)
+        with self.assertRaises(ValueError):
+            list(replay_games_parallel(self.log_path, chunk_size=0))
+
+    def test_same_decoding_in_parallel(self):
+        with open(self.log_path, "wb") as move_log:
+            move_log.write(b"i1-b1 a2-b2\r\ni1-h1 a1-a2 \xe9-b1\n")
+        for replay in (replay_games, replay_games_parallel):
+            with self.assertRaises(ReplayError) as context:
+                list(replay(self.log_path))
+            self.assertEqual((1, 2), (context.exception.game_number, context.exception.ply))
+
+    def test_validate_archive(self):
+        self.write_log(MOVE_LOG + ["i1-h1 h1-g1"] + MOVE_LOG + ["i1-h1 a1-a2 zz-b1"])
+        report = validate_archive(self.log_path, processes=2)
+        self.assertEqual(12, report.games)
+        self.assertEqual(37, report.moves)
+        self.assertEqual([5, 11], [game_number for game_number, _, _ in report.invalid_games])
+        self.assertEqual((5, 2, "illegal move h1-g1"), report.invalid_games[0])
+        small_chunk_report = validate_archive(self.log_path, processes=2, chunk_size=10)
+        self.assertEqual(report[:3], small_chunk_report[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
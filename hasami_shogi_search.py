@@ -0,0 +1,348 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: A computer player for the Hasami Shogi game, using alpha-beta search with iterative deepening.
+
+import time
+from collections import namedtuple
+
+from hasami_shogi_transposition_table import TranspositionTable
+
+_WIN_SCORE = 1000000
+_WIN_THRESHOLD = _WIN_SCORE - 1000
+_PIECE_SCORE = 100
+_QUIESCENCE_DEPTH = 4
+# A node costs tens of microseconds, mostly ordering moves by their captures, so checking the clock every 32 nodes
+# keeps a search within a few milliseconds of its time limit.
+_NODES_BETWEEN_CLOCK_CHECKS = 32
+# Random odd multipliers that fold each player's captures into a position's transposition table key, as the position
+# hash covers only the pieces and the active player.
+_BLACK_CAPTURES_KEY = 0x9E3779B97F4A7C15
+_RED_CAPTURES_KEY = 0xC2B2AE3D27D4EB4F
+_KEY_MASK = (1 << 64) - 1
+
+SearchResult = namedtuple("SearchResult", ["best_move", "score", "depth", "nodes", "elapsed", "nodes_per_second"])
+
+
+def _count_squares(squares):
+    """
+    Takes as a parameter a mask of squares.
+    Returns the number of squares in the mask.
+    """
+    return bin(squares).count("1")
+
+
+class _SearchTimeout(Exception):
+    """
+    Raised inside the search when the time limit for the move has been reached.
+    """
+
+
+class AlphaBetaPlayer:
+    """
+    A computer player that chooses moves by negamax alpha-beta search with iterative deepening.
+    Moves are ordered with the transposition table's best move first, then captures from most to fewest pieces, and
+    each search stops at a hard wall-clock time limit, returning the best move from the deepest completed iteration.
+    Positions are scored as the difference in captures between the active player and their opponent, unless they are
+    in the endgame tablebase, if one is given, which scores them exactly.
+    The search uses only the game's public methods, making and taking back each move with make_move_idx and
+    unmake_move.
+    """
+
+    def __init__(self, time_limit=1.0, max_depth=64, transposition_table=None, tablebase=None):
+        """
+        Takes as optional parameters the number of seconds each search may take, the deepest iteration to search, the
+        transposition table to use, defaulting to a new table, and an endgame Tablebase to look positions up in.
+        Initializes the player.
+        """
+        self._time_limit = time_limit
+        self._max_depth = max_depth
+        if transposition_table is None:
+            transposition_table = TranspositionTable()
+        self._transposition_table = transposition_table
+        self._tablebase = tablebase
+        self._deadline = 0.0
+        self._nodes = 0
+
+    def choose_move(self, game):
+        """
+        Takes as a parameter a HasamiShogiGame.
+        Returns the best move found for the active player as a (square moved from, square moved to) pair in algebraic
+        notation, or None if the active player has no legal moves.
+        """
+        return self.search(game).best_move
+
+    def search(self, game):
+        """
+        Takes as a parameter a HasamiShogiGame.
+        Searches the game's position in place, leaving it as it was found.
+        Returns a SearchResult with the best move in algebraic notation, its score for the active player, the deepest
+        completed depth, the number of nodes searched, the seconds taken and the nodes searched per second.
+        """
+        start_time = time.perf_counter()
+        self._deadline = start_time + self._time_limit
+        self._nodes = 0
+        self._transposition_table.new_search()
+
+        if self._tablebase is not None:
+            tablebase_result = self._tablebase.probe(game)
+            if tablebase_result is not None:
+                elapsed = time.perf_counter() - start_time
+                best_move = self._tablebase.best_move(game)
+                best_score = self._score_tablebase_result(tablebase_result, 0)
+                return SearchResult(best_move, best_score, 0, 0, elapsed, 0.0)
+
+        root_moves = self._ordered_moves(game, None)
+        best_move, best_score, completed_depth = None, 0, 0
+        if root_moves:
+            best_move = root_moves[0]
+
+        try:
+            for depth in range(1, self._max_depth + 1):
+                if not root_moves:
+                    break
+                best_score, best_move = self._search_root(game, root_moves, best_move, depth)
+                completed_depth = depth
+                if abs(best_score) >= _WIN_THRESHOLD:
+                    break
+        except _SearchTimeout:
+            pass
+
+        elapsed = time.perf_counter() - start_time
+        if best_move is not None:
+            board_size = game.get_board_size()
+            best_move = (game.idx_to_square(best_move[0], board_size), game.idx_to_square(best_move[1], board_size))
+        return SearchResult(
+            best_move,
+            best_score,
+            completed_depth,
+            self._nodes,
+            elapsed,
+            self._nodes / elapsed if elapsed > 0 else 0.0,
+        )
+
+    def _search_root(self, game, root_moves, previous_best_move, depth):
+        """
+        Takes as parameters the game, its ordered legal moves, the best move from the previous iteration and the depth
+        to search.
+        Returns the best score and move found at that depth.
+        """
+        root_moves.remove(previous_best_move)
+        root_moves.insert(0, previous_best_move)
+
+        alpha, beta = -_WIN_SCORE, _WIN_SCORE
+        best_move = root_moves[0]
+        for index_moved_from, index_moved_to in root_moves:
+            game.make_move_idx(index_moved_from, index_moved_to)
+            try:
+                score = -self._negamax(game, depth - 1, -beta, -alpha, 1)
+            finally:
+                game.unmake_move()
+            if score > alpha:
+                alpha = score
+                best_move = (index_moved_from, index_moved_to)
+
+        self._transposition_table.store(self._table_key(game), depth, alpha, "EXACT", best_move)
+        return alpha, best_move
+
+    def _negamax(self, game, depth, alpha, beta, ply):
+        """
+        Takes as parameters the game, the remaining depth, the alpha and beta bounds and the distance from the root.
+        Returns the score of the position for the active player.
+        """
+        self._count_node()
+
+        if game.get_game_state() != "UNFINISHED":
+            return -_WIN_SCORE + ply
+        if depth <= 0:
+            return self._quiescence(game, alpha, beta, ply, _QUIESCENCE_DEPTH)
+
+        if self._tablebase is not None:
+            tablebase_result = self._tablebase.probe(game)
+            if tablebase_result is not None:
+                return self._score_tablebase_result(tablebase_result, ply)
+
+        original_alpha = alpha
+        table_key = self._table_key(game)
+        table_move = None
+        entry = self._transposition_table.probe(table_key)
+        if entry is not None:
+            entry_depth, entry_score, bound, table_move = entry
+            entry_score = self._score_from_table(entry_score, ply)
+            if entry_depth >= depth:
+                if bound == "EXACT":
+                    return entry_score
+                elif bound == "LOWER_BOUND":
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score
+
+        moves = self._ordered_moves(game, table_move)
+        if not moves:
+            return self._evaluate(game)
+
+        best_score, best_move = -_WIN_SCORE, None
+        for index_moved_from, index_moved_to in moves:
+            game.make_move_idx(index_moved_from, index_moved_to)
+            try:
+                score = -self._negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move()
+            if score > best_score:
+                best_score, best_move = score, (index_moved_from, index_moved_to)
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+
+        if best_score <= original_alpha:
+            bound = "UPPER_BOUND"
+        elif best_score >= beta:
+            bound = "LOWER_BOUND"
+        else:
+            bound = "EXACT"
+        self._transposition_table.store(table_key, depth, self._score_to_table(best_score, ply), bound, best_move)
+        return best_score
+
+    def _quiescence(self, game, alpha, beta, ply, depth):
+        """
+        Takes as parameters the game, the alpha and beta bounds, the distance from the root and the remaining number of
+        capturing moves to search.
+        Returns the score of the position for the active player once no captures remain, or the depth runs out.
+        """
+        if game.get_game_state() != "UNFINISHED":
+            return -_WIN_SCORE + ply
+
+        stand_pat = self._evaluate(game)
+        if depth <= 0 or stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        for index_moved_from, index_moved_to in self._capturing_moves(game):
+            self._count_node()
+            game.make_move_idx(index_moved_from, index_moved_to)
+            try:
+                score = -self._quiescence(game, -beta, -alpha, ply + 1, depth - 1)
+            finally:
+                game.unmake_move()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+
+        return alpha
+
+    def _count_node(self):
+        """
+        Takes no parameters.
+        Counts a searched node, checking the clock periodically.
+        Raises a _SearchTimeout if the time limit has been reached.
+        """
+        self._nodes += 1
+        if self._nodes % _NODES_BETWEEN_CLOCK_CHECKS == 0 and time.perf_counter() >= self._deadline:
+            raise _SearchTimeout()
+
+    @staticmethod
+    def _table_key(game):
+        """
+        Takes as a parameter the game.
+        Returns the key of the game's position in the transposition table: its position hash combined with each
+        player's captures, so that positions with the same pieces but different captures, as may be loaded from
+        position notation or snapshots, do not share entries.
+        """
+        capture_key = (
+            game.get_num_captured_pieces("BLACK") * _BLACK_CAPTURES_KEY
+            + game.get_num_captured_pieces("RED") * _RED_CAPTURES_KEY
+        )
+        return game.get_position_hash() ^ (capture_key & _KEY_MASK)
+
+    @staticmethod
+    def _ordered_moves(game, table_move):
+        """
+        Takes as parameters the game and the transposition table's best move for the position, if any.
+        Returns the active player's legal moves as index pairs, with the table move first, then moves that capture
+        from most to fewest pieces, then the remaining moves.
+        """
+        capture_counts = {
+            index: _count_squares(captured_squares) for index, captured_squares in game.capture_threats_idx().items()
+        }
+        capturing_moves, quiet_moves = [], []
+        for move in game.iter_legal_moves_idx():
+            if move == table_move:
+                continue
+            num_captured = capture_counts.get(move[1])
+            if num_captured:
+                capturing_moves.append((num_captured, move))
+            else:
+                quiet_moves.append(move)
+
+        capturing_moves.sort(key=lambda capturing_move: -capturing_move[0])
+        moves = [move for _, move in capturing_moves] + quiet_moves
+        if table_move is not None and table_move in game.iter_legal_moves_idx(table_move[0]):
+            moves.insert(0, table_move)
+        return moves
+
+    @staticmethod
+    def _capturing_moves(game):
+        """
+        Takes as a parameter the game.
+        Returns the active player's capturing moves as index pairs, from most to fewest pieces captured.
+        """
+        capture_threats = game.capture_threats_idx()
+        capturing_moves = []
+        if capture_threats:
+            for move in game.iter_legal_moves_idx():
+                captured_squares = capture_threats.get(move[1])
+                if captured_squares:
+                    capturing_moves.append((_count_squares(captured_squares), move))
+        capturing_moves.sort(key=lambda capturing_move: -capturing_move[0])
+        return [move for _, move in capturing_moves]
+
+    @staticmethod
+    def _evaluate(game):
+        """
+        Takes as a parameter the game.
+        Returns the difference in captures between the active player and their opponent, scaled by the piece score,
+        which in a game played from the start is also the difference in pieces left on the board.
+        """
+        black_captures = game.get_num_captured_pieces("BLACK")
+        red_captures = game.get_num_captured_pieces("RED")
+        if game.get_active_player() == "BLACK":
+            return (black_captures - red_captures) * _PIECE_SCORE
+        return (red_captures - black_captures) * _PIECE_SCORE
+
+    @staticmethod
+    def _score_tablebase_result(tablebase_result, ply):
+        """
+        Takes as parameters a (result, distance) pair from the tablebase and the distance from the root.
+        Returns the score of the position for the active player, measured from the root.
+        """
+        result, distance = tablebase_result
+        if result == "WIN":
+            return _WIN_SCORE - ply - distance
+        elif result == "LOSS":
+            return -_WIN_SCORE + ply + distance
+        return 0
+
+    @staticmethod
+    def _score_to_table(score, ply):
+        """
+        Takes as parameters a score and the distance from the root.
+        Returns the score with any win or loss measured from the position rather than the root, for storing.
+        """
+        if score >= _WIN_THRESHOLD:
+            return score + ply
+        elif score <= -_WIN_THRESHOLD:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_table(score, ply):
+        """
+        Takes as parameters a stored score and the distance from the root.
+        Returns the score with any win or loss measured from the root again.
+        """
+        if score >= _WIN_THRESHOLD:
+            return score - ply
+        elif score <= -_WIN_THRESHOLD:
+            return score + ply
+        return score
@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+import hasami_shogi_search
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_search import AlphaBetaPlayer
+from hasami_shogi_transposition_table import TranspositionTable
+
+WINNING_MOVES = [
+    ("i1", "b1"), ("a2", "b2"), ("i2", "h2"), ("a3", "b3"), ("i3", "h3"), ("a4", "b4"), ("i4", "h4"), ("a5", "b5"),
+    ("i5", "h5"), ("a6", "b6"), ("i6", "h6"), ("a7", "b7"), ("i7", "h7"), ("a8", "b8"), ("i9", "b9"), ("a1", "a2"),
+    ("b1", "a1"), ("a9", "a3"), ("h4", "a4"),
+]
+
+
+class MyTestCase(unittest.TestCase):
+
+    # --- TEST MOVE CHOICE ---
+
+    def test_chooses_capture(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i1", "b1")
+        test_game.make_move("a2", "b2")
+        test_player = AlphaBetaPlayer(time_limit=5.0, max_depth=2)
+        self.assertEqual(("i3", "b3"), test_player.choose_move(test_game))
+
+    def test_finds_winning_move(self):
+        test_game = HasamiShogiGame()
+        for square_moved_from, square_moved_to in WINNING_MOVES[:-1]:
+            test_game.make_move(square_moved_from, square_moved_to)
+        search_result = AlphaBetaPlayer(time_limit=5.0, max_depth=3).search(test_game)
+        test_game.make_move(*search_result.best_move)
+        self.assertEqual("BLACK_WON", test_game.get_game_state())
+        self.assertGreater(search_result.score, 0)
+        self.assertEqual(1, search_result.depth)
+
+    def test_no_move_after_game_over(self):
+        test_game = HasamiShogiGame()
+        for square_moved_from, square_moved_to in WINNING_MOVES:
+            test_game.make_move(square_moved_from, square_moved_to)
+        search_result = AlphaBetaPlayer(time_limit=1.0).search(test_game)
+        self.assertEqual(None, search_result.best_move)
+        self.assertEqual(0, search_result.depth)
+
+    # --- TEST SEARCH LIMITS ---
+
+    def test_search_leaves_game_unchanged(self):
+        test_game = HasamiShogiGame()
+        test_game.make_move("i5", "e5")
+        position_hash = test_game.get_position_hash()
+        AlphaBetaPlayer(time_limit=0.2).search(test_game)
+        self.assertEqual(position_hash, test_game.get_position_hash())
+        self.assertEqual("RED", test_game.get_active_player())
+        self.assertEqual(1, len(test_game._move_history))
+
+    def test_search_respects_time_limit(self):
+        test_game = HasamiShogiGame()
+        search_result = AlphaBetaPlayer(time_limit=0.02).search(test_game)
+        self.assertLess(search_result.elapsed, 0.02 + 0.25)
+        self.assertGreater(search_result.nodes, 0)
+        self.assertGreater(search_result.nodes_per_second, 0)
+        self.assertIn(search_result.best_move, test_game.legal_moves())
+
+    def test_search_checks_clock_regularly(self):
+        clock_readings = []
+
+        def clock():
+            clock_readings.append(len(clock_readings) * 0.001)
+            return clock_readings[-1]
+
+        with mock.patch.object(hasami_shogi_search.time, "perf_counter", clock):
+            search_result = AlphaBetaPlayer(time_limit=0.05).search(HasamiShogiGame())
+        self.assertLessEqual(search_result.elapsed, 0.05 + 0.0015)
+        self.assertGreater(search_result.nodes, 0)
+        # Each reading moves the clock on a millisecond, so the search should stop at the 51st reading, then read it
+        # once more for the elapsed time, having read it at least once every 64 nodes.
+        self.assertLessEqual(len(clock_readings), 52)
+        self.assertLessEqual(search_result.nodes, len(clock_readings) * 64)
+
+    # --- TEST TRANSPOSITION TABLE ---
+
+    def test_table_keys_include_captures(self):
+        board = "1R7/1B7/8R/9/9/9/9/9/B7B B"
+        fresh_result = AlphaBetaPlayer(time_limit=5.0, max_depth=3).search(
+            HasamiShogiGame.from_position_notation(board + " 0 7")
+        )
+        test_player = AlphaBetaPlayer(time_limit=5.0, max_depth=3, transposition_table=TranspositionTable())
+        test_player.search(HasamiShogiGame.from_position_notation(board + " 0 0"))
+        shared_result = test_player.search(HasamiShogiGame.from_position_notation(board + " 0 7"))
+        self.assertEqual(fresh_result.score, shared_result.score)
+        self.assertLess(shared_result.score, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
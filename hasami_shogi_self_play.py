@@ -0,0 +1,163 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: Plays Hasami Shogi games between computer players across a process pool, streaming the game records to
+# disk and reporting throughput.
+
+import argparse
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_mcts import MCTSPlayer
+from hasami_shogi_players import GreedyCapturePlayer, RandomPlayer
+from hasami_shogi_search import AlphaBetaPlayer
+
+POLICIES = ("RANDOM", "GREEDY_CAPTURE", "SEARCH", "MCTS")
+
+SelfPlayReport = namedtuple(
+    "SelfPlayReport",
+    ["games", "moves", "results", "elapsed", "games_per_second", "moves_per_second", "worker_utilization"],
+)
+
+
+def create_player(policy, seed=None, search_time_limit=0.05):
+    """
+    Takes as parameters the policy, which can be "RANDOM", "GREEDY_CAPTURE", "SEARCH" or "MCTS", and optionally the
+    seed for random choices and the seconds a search may take per move.
+    Returns a computer player following the policy.
+    """
+    if policy == "RANDOM":
+        return RandomPlayer(seed)
+    elif policy == "GREEDY_CAPTURE":
+        return GreedyCapturePlayer(seed)
+    elif policy == "SEARCH":
+        return AlphaBetaPlayer(time_limit=search_time_limit)
+    elif policy == "MCTS":
+        return MCTSPlayer(time_limit=search_time_limit, playout_policy="GREEDY_CAPTURE", seed=seed)
+    raise ValueError("unknown policy: " + str(policy))
+
+
+def _play_game(task):
+    """
+    Takes as a parameter a (seed, black policy, red policy, maximum moves, search time limit) tuple.
+    Plays one game until it is won, the active player has no legal moves, or the maximum number of moves is reached.
+    Returns a (move log line, game state, number of moves, seconds taken, process ID) tuple.
+    """
+    seed, black_policy, red_policy, max_moves, search_time_limit = task
+    start_time = time.perf_counter()
+    players = {
+        "BLACK": create_player(black_policy, seed, search_time_limit),
+        "RED": create_player(red_policy, seed + 1 if seed is not None else None, search_time_limit),
+    }
+
+    game = HasamiShogiGame()
+    moves = []
+    while game.get_game_state() == "UNFINISHED" and len(moves) < max_moves:
+        move = players[game.get_active_player()].choose_move(game)
+        if move is None:
+            break
+        game.make_move(*move)
+        moves.append(move[0] + "-" + move[1])
+
+    return " ".join(moves), game.get_game_state(), len(moves), time.perf_counter() - start_time, os.getpid()
+
+
+def play_games(
+    num_games,
+    output_path,
+    black_policy="RANDOM",
+    red_policy="RANDOM",
+    processes=None,
+    max_moves=400,
+    search_time_limit=0.05,
+    seed=0,
+):
+    """
+    Takes as parameters the number of games to play and the path to write their records to, and optionally each side's
+    policy, the number of worker processes (defaulting to one per core, with 1 playing in this process), the maximum
+    moves per game, the seconds a search may take per move and the seed for the first game.
+    Plays the games, writing each record to the file as one line of space-separated "from-to" moves as soon as the game
+    finishes, so records are not in game order when more than one process is used.
+    Returns a SelfPlayReport with the games and moves played, a count of each final game state, the seconds taken, the
+    games and moves per second, and each worker's fraction of the elapsed time spent playing.
+    """
+    if black_policy not in POLICIES or red_policy not in POLICIES:
+        raise ValueError("unknown policy: " + str(black_policy if black_policy not in POLICIES else red_policy))
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    tasks = [
+        (seed + 2 * game_number, black_policy, red_policy, max_moves, search_time_limit)
+        for game_number in range(num_games)
+    ]
+    results, total_moves, busy_seconds = {}, 0, {}
+    start_time = time.perf_counter()
+
+    with open(output_path, "w") as output_file:
+        if processes == 1:
+            records = map(_play_game, tasks)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(processes)
+            chunk_size = max(1, num_games // (processes * 16))
+            records = pool.imap_unordered(_play_game, tasks, chunk_size)
+        try:
+            for move_log, game_state, num_moves, seconds, process_id in records:
+                output_file.write(move_log + "\n")
+                results[game_state] = results.get(game_state, 0) + 1
+                total_moves += num_moves
+                busy_seconds[process_id] = busy_seconds.get(process_id, 0.0) + seconds
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    elapsed = time.perf_counter() - start_time
+    return SelfPlayReport(
+        num_games,
+        total_moves,
+        results,
+        elapsed,
+        num_games / elapsed if elapsed > 0 else 0.0,
+        total_moves / elapsed if elapsed > 0 else 0.0,
+        {process_id: seconds / elapsed for process_id, seconds in busy_seconds.items()} if elapsed > 0 else {},
+    )
+
+
+def main():
+    """
+    Takes no parameters.
+    Plays games as described by the command line arguments and prints the report.
+    """
+    parser = argparse.ArgumentParser(description="Play Hasami Shogi games between computer players.")
+    parser.add_argument("num_games", type=int)
+    parser.add_argument("output_path")
+    parser.add_argument("--black", choices=POLICIES, default="RANDOM")
+    parser.add_argument("--red", choices=POLICIES, default="RANDOM")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--max-moves", type=int, default=400)
+    parser.add_argument("--search-time-limit", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    report = play_games(
+        arguments.num_games,
+        arguments.output_path,
+        arguments.black,
+        arguments.red,
+        arguments.processes,
+        arguments.max_moves,
+        arguments.search_time_limit,
+        arguments.seed,
+    )
+    print("games: %d, moves: %d, elapsed: %.2fs" % (report.games, report.moves, report.elapsed))
+    print("games/sec: %.2f, moves/sec: %.2f" % (report.games_per_second, report.moves_per_second))
+    print("results: " + ", ".join("%s %d" % (state, count) for state, count in sorted(report.results.items())))
+    for process_id, utilization in sorted(report.worker_utilization.items()):
+        print("worker %d utilization: %.1f%%" % (process_id, utilization * 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from hasami_shogi_game import HasamiShogiGame
+from hasami_shogi_self_play import create_player, play_games
+
+
+class MyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.output_directory = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.output_directory.name, "games.txt")
+
+    def tearDown(self):
+        self.output_directory.cleanup()
+
+    def replay_records(self):
+        final_games = []
+        with open(self.output_path) as record_file:
+            for line in record_file:
+                test_game = HasamiShogiGame()
+                for move in line.split():
+                    self.assertEqual(True, test_game.make_move(*move.split("-")))
+                final_games.append(test_game)
+        return final_games
+
+    def test_play_games_in_process(self):
+        report = play_games(3, self.output_path, "GREEDY_CAPTURE", "RANDOM", processes=1, seed=5)
+        final_games = self.replay_records()
+        self.assertEqual(3, len(final_games))
+        self.assertEqual(3, report.games)
+        self.assertEqual(3, sum(report.results.values()))
+        final_game_states = [final_game.get_game_state() for final_game in final_games]
+        self.assertEqual(report.results.get("BLACK_WON", 0), final_game_states.count("BLACK_WON"))
+        self.assertEqual(1, len(report.worker_utilization))
+        self.assertGreater(report.moves_per_second, 0)
+
+    def test_play_games_in_pool(self):
+        report = play_games(4, self.output_path, "RANDOM", "RANDOM", processes=2, max_moves=30)
+        final_games = self.replay_records()
+        self.assertEqual(4, len(final_games))
+        self.assertEqual(120, report.moves)
+        self.assertEqual({"UNFINISHED": 4}, report.results)
+
+    def test_games_are_repeatable(self):
+        play_games(2, self.output_path, "RANDOM", "GREEDY_CAPTURE", processes=1, seed=3)
+        with open(self.output_path) as record_file:
+            first_records = record_file.read()
+        play_games(2, self.output_path, "RANDOM", "GREEDY_CAPTURE", processes=1, seed=3)
+        with open(self.output_path) as record_file:
+            self.assertEqual(first_records, record_file.read())
+
+    def test_mcts_policy(self):
+        report = play_games(1, self.output_path, "MCTS", "RANDOM", processes=1, max_moves=6, search_time_limit=0.01)
+        self.assertEqual(1, len(self.replay_records()))
+        self.assertEqual(6, report.moves)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            create_player("MINIMAX")
+        with self.assertRaises(ValueError):
+            play_games(1, self.output_path, "MINIMAX")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,357 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: An asyncio server hosting many Hasami Shogi games over a line-based JSON protocol.
+
+import argparse
+import asyncio
+import itertools
+import json
+
+from hasami_shogi_game import HasamiShogiGame
+
+
+class _Session:
+    """
+    A game hosted by the server, with the number of moves made, the time it was last used and the connections
+    subscribed to it.
+    Requests change a session without awaiting anything, so each runs to completion on the event loop before the next
+    starts, and no lock is needed. Moves are never taken back, so the game forgets each move once it is made, rather
+    than holding every move for as long as it is hosted.
+    """
+
+    def __init__(self, game_id, now):
+        """
+        Takes as parameters the game's id and the current event loop time.
+        Initializes the session with a new game.
+        """
+        self.game_id = game_id
+        self.game = HasamiShogiGame()
+        self.num_moves = 0
+        self.last_active = now
+        self.subscribers = set()
+
+
+class _Connection:
+    """
+    A client connection, with the bounded queue of lines waiting to be written to it, its stream writer and the games it
+    is subscribed to.
+    """
+
+    def __init__(self, queue_size, writer=None):
+        """
+        Takes as parameters the most lines that may wait to be written before the connection counts as slow and,
+        optionally, its stream writer.
+        Initializes the connection.
+        """
+        self.outgoing = asyncio.Queue(queue_size)
+        self.writer = writer
+        self.subscriptions = set()
+
+    def send_now(self, message):
+        """
+        Takes as a parameter a message object.
+        Writes the message to the client straight away, ahead of any lines still queued, without waiting for the client
+        to read it.
+        """
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write((json.dumps(message) + "\n").encode())
+
+
+class GameServer:
+    """
+    Hosts Hasami Shogi games for clients connected over TCP.
+    Each request is a line holding a JSON object with an "op" of "create", "move", "state", "subscribe" or
+    "unsubscribe", and is answered with a line holding a JSON object with "ok" set, and "error" if it failed. Any "id"
+    in the request is copied to its response.
+    Subscribed connections are also sent an "event" line for each move made and when the game is evicted. A connection
+    that falls too far behind on its events is unsubscribed rather than holding up the game, and games that go unused
+    for the idle timeout are evicted.
+    """
+
+    def __init__(self, idle_timeout=600.0, subscriber_queue_size=256, eviction_interval=None):
+        """
+        Takes as optional parameters the seconds a game may go unused before it is evicted, the most lines that may wait
+        to be written to a connection before it is unsubscribed from its games, and the seconds between checks for
+        idle games, defaulting to a tenth of the idle timeout.
+        Initializes the server with no games.
+        """
+        self._idle_timeout = idle_timeout
+        self._subscriber_queue_size = subscriber_queue_size
+        self._eviction_interval = eviction_interval if eviction_interval is not None else idle_timeout / 10
+        self._sessions = {}
+        self._game_ids = itertools.count(1)
+        self._server = None
+        self._eviction_task = None
+        self._connection_tasks = set()
+
+    def __len__(self):
+        """
+        Takes no parameters.
+        Returns the number of games being hosted.
+        """
+        return len(self._sessions)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Takes as optional parameters the host and port to listen on, with port 0 choosing a free port.
+        Starts listening for connections and evicting idle games.
+        Returns the port being listened on.
+        """
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self._eviction_task = asyncio.ensure_future(self._evict_idle_sessions_forever())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Takes no parameters.
+        Stops listening for connections and evicting idle games, and closes every open connection.
+        """
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+            try:
+                await self._eviction_task
+            except asyncio.CancelledError:
+                pass
+            self._eviction_task = None
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._connection_tasks):
+                task.cancel()
+            await asyncio.gather(*self._connection_tasks, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self, host="127.0.0.1", port=0):
+        """
+        Takes as optional parameters the host and port to listen on.
+        Serves clients until cancelled.
+        """
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    def evict_idle_sessions(self):
+        """
+        Takes no parameters.
+        Removes every game that has gone unused for the idle timeout, telling its subscribers.
+        Returns the number of games evicted.
+        """
+        now = asyncio.get_running_loop().time()
+        idle_sessions = [
+            session for session in self._sessions.values()
+            if now - session.last_active >= self._idle_timeout
+        ]
+        for session in idle_sessions:
+            del self._sessions[session.game_id]
+            for connection in session.subscribers:
+                connection.subscriptions.discard(session.game_id)
+            self._publish(session, {"event": "evicted", "game_id": session.game_id})
+            session.subscribers.clear()
+        return len(idle_sessions)
+
+    async def _evict_idle_sessions_forever(self):
+        """
+        Takes no parameters.
+        Evicts idle games every eviction interval until cancelled.
+        """
+        while True:
+            await asyncio.sleep(self._eviction_interval)
+            self.evict_idle_sessions()
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Takes as parameters the stream reader and writer of a new connection.
+        Answers each request line in turn until the client disconnects, while a separate task writes the responses and
+        events queued for the connection.
+        """
+        connection = _Connection(self._subscriber_queue_size, writer)
+        writer_task = asyncio.ensure_future(self._write_lines(connection, writer))
+        handler_task = asyncio.current_task()
+        self._connection_tasks.add(handler_task)
+        cancelled = False
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self._handle_line(connection, line)
+                await connection.outgoing.put(response)
+        except (ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            self._connection_tasks.discard(handler_task)
+            for game_id in connection.subscriptions:
+                if game_id in self._sessions:
+                    self._sessions[game_id].subscribers.discard(connection)
+            connection.subscriptions.clear()
+            if cancelled:
+                writer_task.cancel()
+            elif not writer_task.done():
+                await connection.outgoing.put(None)
+                await writer_task
+            writer.close()
+
+    @staticmethod
+    async def _write_lines(connection, writer):
+        """
+        Takes as parameters a connection and its stream writer.
+        Writes each message queued for the connection as a line of JSON, waiting for the client to keep up. Stops at
+        None.
+        """
+        while True:
+            message = await connection.outgoing.get()
+            if message is None:
+                return
+            try:
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+            except ConnectionError:
+                return
+
+    async def _handle_line(self, connection, line):
+        """
+        Takes as parameters the connection and a request line it sent.
+        Returns the response to the request.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "request is not valid JSON"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "request is not a JSON object"}
+
+        try:
+            response = await self.handle_request(request, connection)
+        except (ValueError, TypeError) as error:
+            response = {"ok": False, "error": str(error)}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    async def handle_request(self, request, connection=None):
+        """
+        Takes as parameters a request object and optionally the connection that sent it, needed to subscribe.
+        Returns the response object.
+        Raises a ValueError if the request is not valid or names a game that is not being hosted.
+        """
+        operation = request.get("op")
+        if operation == "create":
+            game_id = str(next(self._game_ids))
+            session = _Session(game_id, asyncio.get_running_loop().time())
+            self._sessions[game_id] = session
+            return {"ok": True, "game_id": game_id, "state": self._describe(session)}
+
+        if operation not in ("move", "state", "subscribe", "unsubscribe"):
+            raise ValueError("unknown op: %r" % (operation,))
+        session = self._get_session(self._get_field(request, "game_id"))
+        session.last_active = asyncio.get_running_loop().time()
+
+        if operation == "move":
+            square_moved_from = self._get_field(request, "from")
+            square_moved_to = self._get_field(request, "to")
+            for square in (square_moved_from, square_moved_to):
+                HasamiShogiGame.square_to_idx(square, session.game.get_board_size())
+            made = session.game.make_move(square_moved_from, square_moved_to)
+            if made:
+                session.num_moves += 1
+                session.game.forget_moves()
+            state = self._describe(session)
+            if made:
+                self._publish(session, {
+                    "event": "move", "game_id": session.game_id, "from": square_moved_from, "to": square_moved_to,
+                    "state": state,
+                })
+            return {"ok": True, "made": made, "state": state}
+
+        if operation == "state":
+            return {"ok": True, "state": self._describe(session)}
+
+        if connection is None:
+            raise ValueError("subscriptions need a connection")
+        if operation == "subscribe":
+            session.subscribers.add(connection)
+            connection.subscriptions.add(session.game_id)
+        else:
+            session.subscribers.discard(connection)
+            connection.subscriptions.discard(session.game_id)
+        return {"ok": True, "game_id": session.game_id, "state": self._describe(session)}
+
+    @staticmethod
+    def _get_field(request, name):
+        """
+        Takes as parameters a request object and the name of a field.
+        Returns the value of the field.
+        Raises a ValueError if the request does not have the field.
+        """
+        if name not in request:
+            raise ValueError("request has no %s" % name)
+        return request[name]
+
+    def _get_session(self, game_id):
+        """
+        Takes as a parameter a game id.
+        Returns the game's session.
+        Raises a ValueError if no such game is being hosted.
+        """
+        try:
+            return self._sessions[str(game_id)]
+        except KeyError:
+            raise ValueError("unknown game: %s" % game_id) from None
+
+    def _publish(self, session, event):
+        """
+        Takes as parameters a session and an event object.
+        Queues the event for each of the session's subscribers without waiting. Any whose queue is full is unsubscribed
+        and sent an "unsubscribed" event straight away, rather than behind the lines it has yet to read.
+        """
+        for connection in list(session.subscribers):
+            try:
+                connection.outgoing.put_nowait(event)
+            except asyncio.QueueFull:
+                session.subscribers.discard(connection)
+                connection.subscriptions.discard(session.game_id)
+                connection.send_now({"event": "unsubscribed", "game_id": session.game_id, "reason": "SLOW_SUBSCRIBER"})
+
+    @staticmethod
+    def _describe(session):
+        """
+        Takes as a parameter a session.
+        Returns an object describing its game's position.
+        """
+        game = session.game
+        return {
+            "position": game.to_position_notation(),
+            "game_state": game.get_game_state(),
+            "active_player": game.get_active_player(),
+            "black_captures": game.get_num_captured_pieces("BLACK"),
+            "red_captures": game.get_num_captured_pieces("RED"),
+            "moves": session.num_moves,
+        }
+
+
+def main():
+    """
+    Takes no parameters.
+    Runs a game server on the host and port given on the command line until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Host Hasami Shogi games over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--idle-timeout", type=float, default=600.0)
+    parser.add_argument("--subscriber-queue-size", type=int, default=256)
+    arguments = parser.parse_args()
+
+    server = GameServer(arguments.idle_timeout, arguments.subscriber_queue_size)
+    try:
+        asyncio.run(server.serve_forever(arguments.host, arguments.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import unittest
+from hasami_shogi_server import GameServer, _Connection
+
+
+class _RecordingWriter:
+    """
+    A stream writer that keeps the lines written to it.
+    """
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, data):
+        self.lines += [json.loads(line) for line in data.decode().splitlines()]
+
+    def is_closing(self):
+        return False
+
+
+class MyTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = GameServer(idle_timeout=60.0, subscriber_queue_size=4)
+        self.port = await self.server.start()
+        self.streams = []
+
+    async def asyncTearDown(self):
+        for _, writer in self.streams:
+            writer.close()
+        await self.server.close()
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.streams.append((reader, writer))
+        return reader, writer
+
+    @staticmethod
+    async def send(stream, request):
+        reader, writer = stream
+        writer.write((json.dumps(request) + "\n").encode())
+        await writer.drain()
+        return json.loads(await asyncio.wait_for(reader.readline(), 5))
+
+    @staticmethod
+    async def receive(stream):
+        return json.loads(await asyncio.wait_for(stream[0].readline(), 5))
+
+    # --- TEST REQUESTS ---
+    async def test_create_move_and_state(self):
+        stream = await self.connect()
+        response = await self.send(stream, {"op": "create", "id": 7})
+        self.assertTrue(response["ok"])
+        self.assertEqual(7, response["id"])
+        game_id = response["game_id"]
+        self.assertEqual("BLACK", response["state"]["active_player"])
+
+        response = await self.send(stream, {"op": "move", "game_id": game_id, "from": "i1", "to": "h1"})
+        self.assertEqual((True, True), (response["ok"], response["made"]))
+        response = await self.send(stream, {"op": "move", "game_id": game_id, "from": "i2", "to": "h2"})
+        self.assertEqual((True, False), (response["ok"], response["made"]))
+
+        response = await self.send(stream, {"op": "state", "game_id": game_id})
+        self.assertEqual("RED", response["state"]["active_player"])
+        self.assertEqual(1, response["state"]["moves"])
+        self.assertEqual("RRRRRRRRR/9/9/9/9/9/9/B8/1BBBBBBBB R 0 0", response["state"]["position"])
+        self.assertEqual(False, self.server._sessions[game_id].game.unmake_move())
+
+    async def test_bad_requests(self):
+        stream = await self.connect()
+        self.assertEqual("request is not valid JSON", (await self.send_line(stream, b"{nope\n"))["error"])
+        self.assertEqual("unknown op: 'jump'", (await self.send(stream, {"op": "jump"}))["error"])
+        self.assertEqual("unknown game: 99", (await self.send(stream, {"op": "state", "game_id": 99}))["error"])
+        game_id = (await self.send(stream, {"op": "create"}))["game_id"]
+        response = await self.send(stream, {"op": "move", "game_id": game_id, "from": "i1"})
+        self.assertEqual((False, "request has no to"), (response["ok"], response["error"]))
+        response = await self.send(stream, {"op": "move", "game_id": game_id, "from": "z1", "to": "h1"})
+        self.assertEqual("square is not on the board: z1", response["error"])
+
+    async def send_line(self, stream, line):
+        stream[1].write(line)
+        return await self.receive(stream)
+
+    # --- TEST SUBSCRIPTIONS ---
+    async def test_subscribers_receive_moves(self):
+        player, watcher = await self.connect(), await self.connect()
+        game_id = (await self.send(player, {"op": "create"}))["game_id"]
+        self.assertTrue((await self.send(watcher, {"op": "subscribe", "game_id": game_id}))["ok"])
+
+        await self.send(player, {"op": "move", "game_id": game_id, "from": "i1", "to": "h1"})
+        await self.send(player, {"op": "move", "game_id": game_id, "from": "i1", "to": "h1"})
+        await self.send(player, {"op": "move", "game_id": game_id, "from": "a1", "to": "b1"})
+        events = [await self.receive(watcher), await self.receive(watcher)]
+        self.assertEqual([("i1", "h1", 1), ("a1", "b1", 2)], [
+            (event["from"], event["to"], event["state"]["moves"]) for event in events
+        ])
+
+        await self.send(watcher, {"op": "unsubscribe", "game_id": game_id})
+        await self.send(player, {"op": "move", "game_id": game_id, "from": "h1", "to": "g1"})
+        response = await self.send(watcher, {"op": "state", "game_id": game_id})
+        self.assertEqual(3, response["state"]["moves"])
+
+    async def test_concurrent_moves_are_serialized(self):
+        streams = [await self.connect() for _ in range(8)]
+        game_id = (await self.send(streams[0], {"op": "create"}))["game_id"]
+        responses = await asyncio.gather(*[
+            self.send(stream, {"op": "move", "game_id": game_id, "from": "i5", "to": "e5"}) for stream in streams
+        ])
+        self.assertEqual(1, sum(response["made"] for response in responses))
+
+    async def test_slow_subscriber_is_unsubscribed(self):
+        slow_connection = _Connection(2, _RecordingWriter())
+        game_id = (await self.server.handle_request({"op": "create"}))["game_id"]
+        await self.server.handle_request({"op": "subscribe", "game_id": game_id}, slow_connection)
+
+        moves = [("i1", "h1"), ("a1", "b1"), ("h1", "i1")]
+        for square_moved_from, square_moved_to in moves:
+            self.assertEqual([], slow_connection.writer.lines)
+            response = await self.server.handle_request(
+                {"op": "move", "game_id": game_id, "from": square_moved_from, "to": square_moved_to}
+            )
+            self.assertTrue(response["made"])
+        self.assertEqual(set(), self.server._sessions[game_id].subscribers)
+        self.assertEqual(set(), slow_connection.subscriptions)
+        self.assertEqual(
+            [{"event": "unsubscribed", "game_id": game_id, "reason": "SLOW_SUBSCRIBER"}], slow_connection.writer.lines
+        )
+        self.assertEqual(2, slow_connection.outgoing.qsize())
+
+    # --- TEST EVICTION ---
+    async def test_idle_games_are_evicted(self):
+        player, watcher = await self.connect(), await self.connect()
+        game_id = (await self.send(player, {"op": "create"}))["game_id"]
+        await self.send(watcher, {"op": "subscribe", "game_id": game_id})
+        self.assertEqual(0, self.server.evict_idle_sessions())
+
+        self.server._sessions[game_id].last_active -= 60.0
+        self.assertEqual(1, self.server.evict_idle_sessions())
+        self.assertEqual(0, len(self.server))
+        self.assertEqual({"event": "evicted", "game_id": game_id}, await self.receive(watcher))
+        response = await self.send(player, {"op": "state", "game_id": game_id})
+        self.assertFalse(response["ok"])
+
+
+if __name__ == '__main__':
+    unittest.main()
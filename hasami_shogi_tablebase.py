@@ -0,0 +1,510 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: Generates endgame tablebases for the Hasami Shogi game by retrograde analysis, and looks positions up in
+# them through a memory-mapped file.
+
+import argparse
+import math
+import mmap
+import struct
+import time
+from array import array
+from collections import namedtuple
+from itertools import combinations
+
+from hasami_shogi_game import HasamiShogiGame, _MAX_BOARD_SIZE, _get_captures_to_win, _get_geometry
+
+_MAX_DISTANCE = 255
+
+_MAGIC = b"HSTB"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBBBH")
+_TABLE_ENTRY = struct.Struct("<BBQQ")
+
+_BINOMIALS = [
+    [math.comb(n, k) for k in range(_MAX_BOARD_SIZE + 2)] for n in range(_MAX_BOARD_SIZE * _MAX_BOARD_SIZE + 1)
+]
+# Maps each value to 1 if it is a win for the side to move, for counting wins with bytearray.translate.
+_WIN_VALUES = bytes(value % 2 for value in range(_MAX_DISTANCE + 1))
+
+TablebaseReport = namedtuple("TablebaseReport", ["positions", "wins", "losses", "draws", "elapsed"])
+
+
+def _get_min_pieces(board_size, captures_to_win):
+    """
+    Takes as parameters the number of rows and columns on the board and the captures needed to win.
+    Returns the fewest pieces a side can have without having lost, as their opponent has made enough captures to win
+    once they have fewer.
+    """
+    return board_size - captures_to_win + 1
+
+
+def table_size(num_black, num_red, board_size=9):
+    """
+    Takes as parameters the number of black and red pieces and, optionally, the number of rows and columns on the board.
+    Returns the number of positions, counting each side to move, in the table for that material.
+    """
+    num_squares = board_size * board_size
+    return _BINOMIALS[num_squares][num_black] * _BINOMIALS[num_squares - num_black][num_red] * 2
+
+
+def _rank_squares(squares):
+    """
+    Takes as a parameter an ascending list of square numbers.
+    Returns the rank of the set of squares among all sets of the same size, in the combinatorial number system.
+    """
+    return sum(_BINOMIALS[square][count + 1] for count, square in enumerate(squares))
+
+
+def _unrank_squares(rank, num_squares, num_pieces):
+    """
+    Takes as parameters a rank, the number of squares to choose from and the number of squares chosen.
+    Returns the ascending list of square numbers with that rank.
+    """
+    squares = []
+    square = num_squares - 1
+    for count in range(num_pieces, 0, -1):
+        while _BINOMIALS[square][count] > rank:
+            square -= 1
+        squares.append(square)
+        rank -= _BINOMIALS[square][count]
+        square -= 1
+    squares.reverse()
+    return squares
+
+
+def _compress_squares(black_board, red_board):
+    """
+    Takes as parameters the masks of the black and red pieces.
+    Returns an ascending list of the red pieces' square numbers counted over the squares without black pieces.
+    """
+    black_squares = list(HasamiShogiGame._iter_squares(black_board))
+    return [
+        index - sum(1 for black_index in black_squares if black_index < index)
+        for index in HasamiShogiGame._iter_squares(red_board)
+    ]
+
+
+def position_index(black_board, red_board, active_player, num_black, num_red, board_size=9):
+    """
+    Takes as parameters the masks of the black and red pieces, the active player, the number of pieces of each and,
+    optionally, the number of rows and columns on the board.
+    Returns the index of the position in the table for its material.
+    """
+    black_rank = _rank_squares(list(HasamiShogiGame._iter_squares(black_board)))
+    red_rank = _rank_squares(_compress_squares(black_board, red_board))
+    position = black_rank * _BINOMIALS[board_size * board_size - num_black][num_red] + red_rank
+    return position * 2 + (0 if active_player == "BLACK" else 1)
+
+
+def position_from_index(index, num_black, num_red, board_size=9):
+    """
+    Takes as parameters an index in the table for a material, the number of black and red pieces and, optionally, the
+    number of rows and columns on the board.
+    Returns the (black mask, red mask, active player) position at that index.
+    """
+    num_squares = board_size * board_size
+    position, side = divmod(index, 2)
+    black_rank, red_rank = divmod(position, _BINOMIALS[num_squares - num_black][num_red])
+    black_squares = _unrank_squares(black_rank, num_squares, num_black)
+    empty_squares = [index for index in range(num_squares) if index not in black_squares]
+    red_squares = [empty_squares[square] for square in _unrank_squares(red_rank, num_squares - num_black, num_red)]
+    return (
+        sum(1 << square for square in black_squares),
+        sum(1 << square for square in red_squares),
+        "BLACK" if side == 0 else "RED",
+    )
+
+
+class _TableSolver:
+    """
+    Solves the table for one material by retrograde analysis, given the already-solved tables for less material.
+    Each value is 0 for a draw, or the number of moves to the end of the game with perfect play, which is odd when the
+    active player wins and even when they lose.
+    """
+
+    def __init__(self, num_black, num_red, solved_tables, board_size=9, captures_to_win=None):
+        """
+        Takes as parameters the number of black and red pieces, a dictionary mapping each already-solved material to
+        its values and, optionally, the number of rows and columns on the board and the captures needed to win.
+        Initializes the solver.
+        """
+        self._num_black = num_black
+        self._num_red = num_red
+        self._solved_tables = solved_tables
+        self._geometry = _get_geometry(board_size)
+        self._board_size = board_size
+        self._num_squares = board_size * board_size
+        self._min_pieces = _get_min_pieces(board_size, _get_captures_to_win(board_size, captures_to_win))
+        size = table_size(num_black, num_red, board_size)
+        self.values = bytearray(size)
+        self._quiet_moves_left = bytearray(size)
+        self._capture_loss_distances = bytearray(size)
+        self._pending = {}
+
+    def solve(self):
+        """
+        Takes no parameters.
+        Solves every position, first scoring the captures out of each one, then working back from decided positions
+        through the moves that do not capture, in order of distance.
+        Returns the table's values.
+        """
+        self._score_captures()
+        distance = 1
+        while self._pending:
+            indexes = self._pending.pop(distance, ())
+            for index in indexes:
+                if self.values[index] == distance:
+                    self._propagate(index, distance)
+            distance += 1
+        return self.values
+
+    def _decide(self, index, distance):
+        """
+        Takes as parameters a position's index and its distance.
+        Records the value and queues the position for working back from.
+        Raises a ValueError if the distance does not fit in a byte.
+        """
+        if distance > _MAX_DISTANCE:
+            raise ValueError("distance to the end of the game does not fit in the table: %d" % distance)
+        self.values[index] = distance
+        self._pending.setdefault(distance, array("I")).append(index)
+
+    def _score_captures(self):
+        """
+        Takes no parameters.
+        For every position, counts the moves that do not capture and scores those that do, deciding positions that can
+        win by capturing, that can only lose, or that have no moves, which are drawn.
+        """
+        num_black, num_red, num_squares = self._num_black, self._num_red, self._num_squares
+        for black_squares in combinations(range(num_squares), num_black):
+            black_board = sum(1 << square for square in black_squares)
+            empty_squares = [index for index in range(num_squares) if not black_board >> index & 1]
+            black_base = _rank_squares(black_squares) * _BINOMIALS[num_squares - num_black][num_red]
+            for red_squares in combinations(range(num_squares - num_black), num_red):
+                red_board = sum(1 << empty_squares[square] for square in red_squares)
+                index = (black_base + _rank_squares(red_squares)) * 2
+                self._score_position(index, black_board, red_board, "BLACK")
+                self._score_position(index + 1, red_board, black_board, "RED")
+
+    def _score_position(self, index, active_board, opponent_board, active_player):
+        """
+        Takes as parameters a position's index, the masks of the active player's and their opponent's pieces, and the
+        active player.
+        Scores the position's captures as described in _score_captures.
+        """
+        occupied_squares = active_board | opponent_board
+        opponent_count = self._num_red if active_player == "BLACK" else self._num_black
+        quiet_moves, best_win, worst_loss, can_draw = 0, 0, 0, False
+        geometry = self._geometry
+
+        for index_moved_from in HasamiShogiGame._iter_squares(active_board):
+            remaining_board = active_board ^ (1 << index_moved_from)
+            legal_destinations = geometry.legal_destinations(index_moved_from, occupied_squares)
+            for index_moved_to in HasamiShogiGame._iter_squares(legal_destinations):
+                moved_board = remaining_board | (1 << index_moved_to)
+                captured_squares = geometry.captures(index_moved_to, moved_board, opponent_board)
+                if not captured_squares:
+                    quiet_moves += 1
+                    continue
+
+                remaining_count = opponent_count - HasamiShogiGame._count_squares(captured_squares)
+                if remaining_count < self._min_pieces:
+                    self._decide(index, 1)
+                    return
+                value = self._lookup(moved_board, opponent_board & ~captured_squares, active_player, remaining_count)
+                if value == 0:
+                    can_draw = True
+                elif value % 2 == 0:
+                    if not best_win or value + 1 < best_win:
+                        best_win = value + 1
+                else:
+                    worst_loss = max(worst_loss, value + 1)
+
+        if best_win:
+            self._decide(index, best_win)
+        elif quiet_moves or can_draw:
+            self._quiet_moves_left[index] = quiet_moves + can_draw
+            self._capture_loss_distances[index] = min(worst_loss, _MAX_DISTANCE)
+        elif worst_loss:
+            self._decide(index, worst_loss)
+
+    def _lookup(self, active_board, opponent_board, active_player, opponent_count):
+        """
+        Takes as parameters the masks of the pieces of the player who just captured and of their opponent, the player
+        who captured and the opponent's remaining number of pieces.
+        Returns the value of the resulting position, with the opponent to move, from the already-solved tables.
+        """
+        opponent = "RED" if active_player == "BLACK" else "BLACK"
+        if active_player == "BLACK":
+            black_board, red_board, num_black, num_red = active_board, opponent_board, self._num_black, opponent_count
+        else:
+            black_board, red_board, num_black, num_red = opponent_board, active_board, opponent_count, self._num_red
+        values = self._solved_tables[(num_black, num_red)]
+        return values[position_index(black_board, red_board, opponent, num_black, num_red, self._board_size)]
+
+    def _propagate(self, index, distance):
+        """
+        Takes as parameters the index of a decided position and its distance.
+        Updates each position that reaches it by a move that does not capture: a move to a lost position wins, and a
+        position whose every move reaches a won position, or a losing capture, is lost.
+        """
+        num_black, num_red, board_size = self._num_black, self._num_red, self._board_size
+        black_board, red_board, active_player = position_from_index(index, num_black, num_red, board_size)
+        if active_player == "BLACK":
+            mover, mover_board, other_board = "RED", red_board, black_board
+        else:
+            mover, mover_board, other_board = "BLACK", black_board, red_board
+        occupied_squares = black_board | red_board
+        previous_distance = distance + 1
+
+        geometry = self._geometry
+
+        for index_moved_to in HasamiShogiGame._iter_squares(mover_board):
+            if geometry.captures(index_moved_to, mover_board, other_board):
+                continue
+            remaining_board = mover_board ^ (1 << index_moved_to)
+            for index_moved_from in HasamiShogiGame._iter_squares(
+                geometry.legal_destinations(index_moved_to, occupied_squares)
+            ):
+                previous_board = remaining_board | (1 << index_moved_from)
+                if mover == "BLACK":
+                    previous_index = position_index(previous_board, other_board, mover, num_black, num_red, board_size)
+                else:
+                    previous_index = position_index(other_board, previous_board, mover, num_black, num_red, board_size)
+
+                previous_value = self.values[previous_index]
+                if distance % 2 == 0:
+                    if previous_value == 0 or (previous_value % 2 == 1 and previous_value > previous_distance):
+                        self._decide(previous_index, previous_distance)
+                elif previous_value == 0:
+                    self._quiet_moves_left[previous_index] -= 1
+                    if self._quiet_moves_left[previous_index] == 0:
+                        self._decide(
+                            previous_index, max(previous_distance, self._capture_loss_distances[previous_index])
+                        )
+
+
+def _iter_materials(min_pieces, max_pieces):
+    """
+    Takes as parameters the fewest and most pieces per side.
+    Yields each (black pieces, red pieces) material in that range, with less material first.
+    """
+    materials = [
+        (num_black, num_red)
+        for num_black in range(min_pieces, max_pieces + 1)
+        for num_red in range(min_pieces, max_pieces + 1)
+    ]
+    for material in sorted(materials, key=lambda material: (sum(material), material)):
+        yield material
+
+
+def write_tablebase(path, tables, max_pieces, board_size=9, captures_to_win=None):
+    """
+    Takes as parameters the path to write to, a dictionary mapping each (black pieces, red pieces) material to its
+    values, the most pieces per side it covers and, optionally, the number of rows and columns on the board and the
+    captures needed to win.
+    Writes the tables to the file, after a header giving the board size, the captures needed to win and each table's
+    offset.
+    """
+    captures_to_win = _get_captures_to_win(board_size, captures_to_win)
+    data_offset = _HEADER.size + _TABLE_ENTRY.size * len(tables)
+    entries = []
+    for material in sorted(tables):
+        entries.append(_TABLE_ENTRY.pack(material[0], material[1], data_offset, len(tables[material])))
+        data_offset += len(tables[material])
+
+    with open(path, "wb") as tablebase_file:
+        tablebase_file.write(_HEADER.pack(_MAGIC, _VERSION, board_size, captures_to_win, max_pieces, len(tables)))
+        tablebase_file.write(b"".join(entries))
+        for material in sorted(tables):
+            tablebase_file.write(tables[material])
+
+
+def generate_tablebase(path, max_pieces=2, board_size=9, captures_to_win=None):
+    """
+    Takes as parameters the path to write the tablebase to and optionally the most pieces per side to solve, the number
+    of rows and columns on the board and the captures needed to win.
+    Solves every position with at most that many pieces per side, and at least as many as a side can have without
+    having lost, which is two on the standard board, and writes the tables to the file.
+    Returns a TablebaseReport with the number of positions, wins, losses and draws for the side to move, and the
+    seconds taken.
+    Raises a ValueError if the most pieces per side is fewer than a side can have without having lost, or more than
+    each side starts with.
+    """
+    captures_to_win = _get_captures_to_win(board_size, captures_to_win)
+    min_pieces = _get_min_pieces(board_size, captures_to_win)
+    if not min_pieces <= max_pieces <= board_size:
+        raise ValueError("a tablebase needs from %d to %d pieces per side" % (min_pieces, board_size))
+    start_time = time.perf_counter()
+    tables = {}
+    for num_black, num_red in _iter_materials(min_pieces, max_pieces):
+        solver = _TableSolver(num_black, num_red, tables, board_size, captures_to_win)
+        tables[(num_black, num_red)] = solver.solve()
+    write_tablebase(path, tables, max_pieces, board_size, captures_to_win)
+
+    positions = sum(len(values) for values in tables.values())
+    wins = sum(values.translate(_WIN_VALUES).count(1) for values in tables.values())
+    draws = sum(values.count(0) for values in tables.values())
+    return TablebaseReport(positions, wins, positions - wins - draws, draws, time.perf_counter() - start_time)
+
+
+class Tablebase:
+    """
+    A tablebase written by generate_tablebase, read through a memory map so that only the pages looked up are loaded.
+    """
+
+    def __init__(self, path):
+        """
+        Takes as a parameter the path to the tablebase.
+        Opens and maps the file.
+        Raises a ValueError if the file is not a tablebase.
+        """
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, board_size, captures_to_win, max_pieces, num_tables = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError("file is not a tablebase: " + str(path))
+        self._board_size = board_size
+        self._captures_to_win = captures_to_win
+        self._max_pieces = max_pieces
+        self._tables = {}
+        for table in range(num_tables):
+            num_black, num_red, offset, size = _TABLE_ENTRY.unpack_from(
+                self._map, _HEADER.size + table * _TABLE_ENTRY.size
+            )
+            self._tables[(num_black, num_red)] = offset
+
+    def __enter__(self):
+        """
+        Takes no parameters.
+        Returns the tablebase, for use in a with statement.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Takes as parameters the details of any exception raised in the with statement.
+        Closes the tablebase.
+        """
+        self.close()
+
+    def close(self):
+        """
+        Takes no parameters.
+        Unmaps and closes the file.
+        """
+        self._map.close()
+        self._file.close()
+
+    def get_max_pieces(self):
+        """
+        Takes no parameters.
+        Returns the most pieces per side the tablebase covers.
+        """
+        return self._max_pieces
+
+    def get_board_size(self):
+        """
+        Takes no parameters.
+        Returns the number of rows and columns on the board of the games the tablebase covers.
+        """
+        return self._board_size
+
+    def probe(self, game):
+        """
+        Takes as a parameter a HasamiShogiGame.
+        Returns a (result, distance) pair for the active player, where the result is "WIN", "LOSS" or "DRAW" and the
+        distance is the number of moves to the end of the game with perfect play, or 0 for a draw.
+        Returns None if the position is not in the tablebase, because the game is finished, is played on another size of
+        board or to another number of captures, either side has too many pieces, or the captures do not match the
+        pieces left on the board.
+        """
+        value = self._probe_value(game)
+        if value is None:
+            return None
+        elif value == 0:
+            return "DRAW", 0
+        elif value % 2 == 1:
+            return "WIN", value
+        return "LOSS", value
+
+    def best_move(self, game):
+        """
+        Takes as a parameter a HasamiShogiGame.
+        Returns a move that keeps the best result for the active player, winning as quickly or losing as slowly as
+        possible, as a (square moved from, square moved to) pair in algebraic notation.
+        Returns None if the position is not in the tablebase or the active player has no legal moves.
+        """
+        if self._probe_value(game) is None:
+            return None
+
+        best_move, best_score = None, None
+        for index_moved_from, index_moved_to in list(game.iter_legal_moves_idx()):
+            game._apply_move(index_moved_from, index_moved_to)
+            if game.get_game_state() != "UNFINISHED":
+                score = (2, 0)
+            else:
+                value = self._probe_value(game)
+                if value == 0:
+                    score = (1, 0)
+                elif value % 2 == 0:
+                    score = (2, -value)
+                else:
+                    score = (0, value)
+            game.unmake_move()
+            if best_score is None or score > best_score:
+                best_move, best_score = (index_moved_from, index_moved_to), score
+
+        if best_move is None:
+            return None
+        return game.idx_to_square(best_move[0], self._board_size), game.idx_to_square(best_move[1], self._board_size)
+
+    def _probe_value(self, game):
+        """
+        Takes as a parameter a HasamiShogiGame.
+        Returns the position's value, as stored by generate_tablebase, or None if it is not in the tablebase.
+        """
+        if (
+            game.get_game_state() != "UNFINISHED"
+            or game.get_board_size() != self._board_size
+            or game.get_captures_to_win() != self._captures_to_win
+        ):
+            return None
+        black_board, red_board = game._boards["BLACK"], game._boards["RED"]
+        num_black, num_red = game._count_squares(black_board), game._count_squares(red_board)
+        offset = self._tables.get((num_black, num_red))
+        if offset is None:
+            return None
+        if (
+            game.get_num_captured_pieces("BLACK") != self._board_size - num_red
+            or game.get_num_captured_pieces("RED") != self._board_size - num_black
+        ):
+            return None
+        return self._map[
+            offset + position_index(
+                black_board, red_board, game.get_active_player(), num_black, num_red, self._board_size
+            )
+        ]
+
+
+def main():
+    """
+    Takes no parameters.
+    Generates a tablebase as described by the command line arguments and prints a summary.
+    """
+    parser = argparse.ArgumentParser(description="Generate a Hasami Shogi endgame tablebase.")
+    parser.add_argument("path")
+    parser.add_argument("--max-pieces", type=int, default=2)
+    parser.add_argument("--board-size", type=int, default=9)
+    parser.add_argument("--captures-to-win", type=int)
+    arguments = parser.parse_args()
+
+    report = generate_tablebase(arguments.path, arguments.max_pieces, arguments.board_size, arguments.captures_to_win)
+    print("positions: %d, elapsed: %.2fs" % (report.positions, report.elapsed))
+    print("wins: %d, losses: %d, draws: %d" % (report.wins, report.losses, report.draws))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import os
+import random
+import tempfile
+import unittest
+from itertools import combinations
+from hasami_shogi_game import GameState, HasamiShogiGame
+from hasami_shogi_search import AlphaBetaPlayer
+from hasami_shogi_tablebase import (
+    Tablebase, _rank_squares, generate_tablebase, position_from_index, position_index, table_size, write_tablebase
+)
+
+# Black and red have two pieces each, far enough apart that no move captures.
+ENDGAME_POSITION = "7RR/9/9/9/9/9/9/9/BB7 B 7 7"
+
+
+def _can_win(game, depth):
+    """
+    Returns whether the active player can win within the given number of moves, whatever their opponent does.
+    """
+    if depth < 1:
+        return False
+    for move in game.legal_moves():
+        game.make_move(*move)
+        won = game.get_game_state() != "UNFINISHED" or _must_lose(game, depth - 1)
+        game.unmake_move()
+        if won:
+            return True
+    return False
+
+
+def _must_lose(game, depth):
+    """
+    Returns whether the active player loses within the given number of moves, whatever they do.
+    """
+    moves = game.legal_moves()
+    if depth < 2 or not moves:
+        return False
+    for move in moves:
+        game.make_move(*move)
+        lost = game.get_game_state() == "UNFINISHED" and _can_win(game, depth - 1)
+        game.unmake_move()
+        if not lost:
+            return False
+    return True
+
+
+class MyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tablebase_directory = tempfile.TemporaryDirectory()
+        self.tablebase_path = os.path.join(self.tablebase_directory.name, "tablebase.bin")
+
+    def tearDown(self):
+        self.tablebase_directory.cleanup()
+
+    def write_endgame_table(self, values):
+        table = bytearray(table_size(2, 2))
+        for notation, value in values.items():
+            game = HasamiShogiGame.from_position_notation(notation)
+            table[position_index(game._boards["BLACK"], game._boards["RED"], game.get_active_player(), 2, 2)] = value
+        write_tablebase(self.tablebase_path, {(2, 2): table}, 2)
+
+    # --- TEST INDEXING ---
+    def test_ranks_are_dense(self):
+        ranks = sorted(_rank_squares(squares) for squares in combinations(range(10), 3))
+        self.assertEqual(list(range(120)), ranks)
+
+    def test_index_round_trip(self):
+        random_squares = random.Random(7)
+        for num_black, num_red in ((2, 2), (3, 2), (2, 3), (3, 3)):
+            for _ in range(200):
+                squares = random_squares.sample(range(81), num_black + num_red)
+                black_board = sum(1 << square for square in squares[:num_black])
+                red_board = sum(1 << square for square in squares[num_black:])
+                for active_player in ("BLACK", "RED"):
+                    index = position_index(black_board, red_board, active_player, num_black, num_red)
+                    self.assertLess(index, table_size(num_black, num_red))
+                    self.assertEqual(
+                        (black_board, red_board, active_player), position_from_index(index, num_black, num_red)
+                    )
+
+    def test_first_and_last_index(self):
+        self.assertEqual((0b11, 0b1100, "BLACK"), position_from_index(0, 2, 2))
+        black_board, red_board, active_player = position_from_index(table_size(2, 2) - 1, 2, 2)
+        self.assertEqual((0b11 << 79, 0b11 << 77, "RED"), (black_board, red_board, active_player))
+
+    # --- TEST LOOKUP ---
+    def test_probe(self):
+        self.write_endgame_table({ENDGAME_POSITION: 3, "7RR/9/9/9/9/9/9/9/BB7 R 7 7": 4})
+        with Tablebase(self.tablebase_path) as tablebase:
+            self.assertEqual(2, tablebase.get_max_pieces())
+            self.assertEqual(("WIN", 3), tablebase.probe(HasamiShogiGame.from_position_notation(ENDGAME_POSITION)))
+            self.assertEqual(
+                ("LOSS", 4), tablebase.probe(HasamiShogiGame.from_position_notation("7RR/9/9/9/9/9/9/9/BB7 R 7 7"))
+            )
+            self.assertEqual(
+                ("DRAW", 0), tablebase.probe(HasamiShogiGame.from_position_notation("7RR/9/9/9/9/9/9/9/B1B6 B 7 7"))
+            )
+
+    def test_probe_outside_tablebase(self):
+        self.write_endgame_table({})
+        with Tablebase(self.tablebase_path) as tablebase:
+            self.assertIsNone(tablebase.probe(HasamiShogiGame()))
+            self.assertIsNone(tablebase.probe(HasamiShogiGame.from_position_notation("7RR/9/9/9/9/9/9/9/BBB6 B 7 6")))
+            self.assertIsNone(tablebase.probe(HasamiShogiGame.from_position_notation("7RR/9/9/9/9/9/9/9/BB7 B 6 7")))
+            self.assertIsNone(tablebase.best_move(HasamiShogiGame()))
+
+    def test_best_move(self):
+        self.write_endgame_table({ENDGAME_POSITION: 3, "7RR/9/9/9/9/9/9/B8/1B7 R 7 7": 2})
+        with Tablebase(self.tablebase_path) as tablebase:
+            game = HasamiShogiGame.from_position_notation(ENDGAME_POSITION)
+            self.assertEqual(("i1", "h1"), tablebase.best_move(game))
+            result = AlphaBetaPlayer(time_limit=1.0, tablebase=tablebase).search(game)
+            self.assertEqual(("i1", "h1"), result.best_move)
+            self.assertEqual(0, result.depth)
+            self.assertGreater(result.score, 0)
+
+    def test_not_a_tablebase(self):
+        with open(self.tablebase_path, "wb") as tablebase_file:
+            tablebase_file.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            Tablebase(self.tablebase_path)
+
+    def test_too_few_pieces(self):
+        with self.assertRaises(ValueError):
+            generate_tablebase(self.tablebase_path, max_pieces=1)
+        with self.assertRaises(ValueError):
+            generate_tablebase(self.tablebase_path, max_pieces=5, board_size=4)
+
+    # --- TEST BOARD SIZES ---
+    def test_small_board_matches_search(self):
+        report = generate_tablebase(self.tablebase_path, board_size=4)
+        self.assertEqual(table_size(2, 2, 4), report.positions)
+        random_indexes = random.Random(11)
+        with Tablebase(self.tablebase_path) as tablebase:
+            self.assertEqual(4, tablebase.get_board_size())
+            self.assertIsNone(tablebase.probe(HasamiShogiGame.from_position_notation(ENDGAME_POSITION)))
+            checked = {"WIN": 0, "LOSS": 0, "DRAW": 0}
+            while min(checked.values()) < 5:
+                index = random_indexes.randrange(report.positions)
+                black_board, red_board, active_player = position_from_index(index, 2, 2, 4)
+                game = HasamiShogiGame.from_state(GameState(black_board, red_board, 2, 2, active_player, board_size=4))
+                result, distance = tablebase.probe(game)
+                if result == "WIN" and distance <= 5:
+                    self.assertTrue(_can_win(game, distance))
+                    self.assertFalse(_can_win(game, distance - 2))
+                elif result == "LOSS" and distance <= 4:
+                    self.assertTrue(_must_lose(game, distance))
+                    self.assertFalse(_must_lose(game, distance - 2))
+                elif result == "DRAW":
+                    self.assertFalse(_can_win(game, 3))
+                    self.assertFalse(_must_lose(game, 4))
+                else:
+                    continue
+                checked[result] += 1
+
+
+if __name__ == '__main__':
+    unittest.main()
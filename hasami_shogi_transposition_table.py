@@ -0,0 +1,131 @@
+# Author: Christopher Wirth
+# Date: 12/02/2021
+# Description: A fixed-size transposition table for storing search results by Hasami Shogi position hash.
+
+# The approximate number of bytes used by one stored entry, counting its slot, its tuple and the values it holds.
+_ENTRY_SIZE = 160
+
+
+class TranspositionTable:
+    """
+    A fixed-size table of search results, keyed by the 64-bit hash returned by HasamiShogiGame.get_position_hash.
+    Each hash maps to a single slot, so a new entry may displace an older one according to the replacement policy:
+    "DEPTH_PREFERRED" keeps the deeper of the two results unless the stored one is from an earlier search, while
+    "ALWAYS_REPLACE" keeps the newest result.
+    """
+
+    def __init__(self, memory_budget=16 * 1024 * 1024, replacement_policy="DEPTH_PREFERRED"):
+        """
+        Takes as optional parameters the number of bytes the table may use and the replacement policy, which can be
+        "DEPTH_PREFERRED" or "ALWAYS_REPLACE".
+        Initializes an empty table with the largest power-of-two number of slots that fits in the memory budget.
+        """
+        if replacement_policy not in ("DEPTH_PREFERRED", "ALWAYS_REPLACE"):
+            raise ValueError("unknown replacement policy: " + str(replacement_policy))
+
+        num_slots = 1
+        while num_slots * 2 * _ENTRY_SIZE <= memory_budget:
+            num_slots *= 2
+
+        self._replacement_policy = replacement_policy
+        self._slots = [None] * num_slots
+        self._slot_mask = num_slots - 1
+        self._search_generation = 0
+        self._filled_slots = 0
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._replacements = 0
+        self._rejected_stores = 0
+
+    def __len__(self):
+        """
+        Takes no parameters.
+        Returns the number of slots holding an entry.
+        """
+        return self._filled_slots
+
+    def get_num_slots(self):
+        """
+        Takes no parameters.
+        Returns the number of slots in the table.
+        """
+        return len(self._slots)
+
+    def probe(self, position_hash):
+        """
+        Takes as a parameter a position hash.
+        Returns the stored (depth, value, bound, best move) entry for the position, or None if it is not in the table.
+        """
+        entry = self._slots[position_hash & self._slot_mask]
+        if entry is not None and entry[0] == position_hash:
+            self._hits += 1
+            return entry[1:5]
+        self._misses += 1
+        return None
+
+    def store(self, position_hash, depth, value, bound, best_move=None):
+        """
+        Takes as parameters a position hash, the depth searched, the value found, the bound the value represents
+        ("EXACT", "LOWER_BOUND" or "UPPER_BOUND") and, optionally, the best move found.
+        Stores the entry unless the replacement policy keeps the entry already in its slot.
+        Returns True if the entry was stored, else returns False.
+        """
+        slot = position_hash & self._slot_mask
+        existing_entry = self._slots[slot]
+
+        if existing_entry is None:
+            self._filled_slots += 1
+        elif (
+            self._replacement_policy == "DEPTH_PREFERRED"
+            and existing_entry[0] != position_hash
+            and existing_entry[5] == self._search_generation
+            and existing_entry[1] > depth
+        ):
+            self._rejected_stores += 1
+            return False
+        elif existing_entry[0] != position_hash:
+            self._replacements += 1
+
+        self._slots[slot] = (position_hash, depth, value, bound, best_move, self._search_generation)
+        self._stores += 1
+        return True
+
+    def new_search(self):
+        """
+        Takes no parameters.
+        Marks the start of a new search, so that entries from earlier searches can be replaced regardless of depth.
+        """
+        self._search_generation += 1
+
+    def clear(self):
+        """
+        Takes no parameters.
+        Removes every entry and resets the statistics.
+        """
+        self._slots = [None] * len(self._slots)
+        self._search_generation = 0
+        self._filled_slots = 0
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._replacements = 0
+        self._rejected_stores = 0
+
+    def get_statistics(self):
+        """
+        Takes no parameters.
+        Returns a dictionary of the table's hits, misses, hit rate, stores, replacements of other positions' entries,
+        stores rejected by the replacement policy, filled slots and total slots.
+        """
+        probes = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / probes if probes else 0.0,
+            "stores": self._stores,
+            "replacements": self._replacements,
+            "rejected_stores": self._rejected_stores,
+            "filled_slots": self._filled_slots,
+            "slots": len(self._slots),
+        }
@@ -0,0 +1,65 @@
+import unittest
+from hasami_shogi_transposition_table import TranspositionTable
+
+
+class MyTestCase(unittest.TestCase):
+
+    # --- TEST TABLE SIZE ---
+
+    def test_num_slots_fits_memory_budget(self):
+        test_table = TranspositionTable(memory_budget=100000)
+        self.assertEqual(512, test_table.get_num_slots())
+        self.assertEqual(1, TranspositionTable(memory_budget=0).get_num_slots())
+
+    def test_unknown_replacement_policy(self):
+        with self.assertRaises(ValueError):
+            TranspositionTable(replacement_policy="NEVER_REPLACE")
+
+    # --- TEST PROBES AND STORES ---
+
+    def test_probe_hit_and_miss(self):
+        test_table = TranspositionTable(memory_budget=100000)
+        test_table.store(12345, 3, 100, "EXACT", (72, 9))
+        self.assertEqual((3, 100, "EXACT", (72, 9)), test_table.probe(12345))
+        self.assertEqual(None, test_table.probe(54321))
+        statistics = test_table.get_statistics()
+        self.assertEqual(1, statistics["hits"])
+        self.assertEqual(1, statistics["misses"])
+        self.assertEqual(0.5, statistics["hit_rate"])
+        self.assertEqual(1, len(test_table))
+
+    def test_depth_preferred_keeps_deeper_entry(self):
+        test_table = TranspositionTable(memory_budget=0)
+        test_table.store(1, 5, 10, "EXACT")
+        self.assertEqual(False, test_table.store(2, 2, 20, "EXACT"))
+        self.assertEqual((5, 10, "EXACT", None), test_table.probe(1))
+        self.assertEqual(True, test_table.store(1, 1, 30, "LOWER_BOUND"))
+        self.assertEqual((1, 30, "LOWER_BOUND", None), test_table.probe(1))
+        self.assertEqual(1, test_table.get_statistics()["rejected_stores"])
+
+    def test_depth_preferred_replaces_entry_from_earlier_search(self):
+        test_table = TranspositionTable(memory_budget=0)
+        test_table.store(1, 5, 10, "EXACT")
+        test_table.new_search()
+        self.assertEqual(True, test_table.store(2, 2, 20, "EXACT"))
+        self.assertEqual(None, test_table.probe(1))
+        self.assertEqual(1, test_table.get_statistics()["replacements"])
+
+    def test_always_replace(self):
+        test_table = TranspositionTable(memory_budget=0, replacement_policy="ALWAYS_REPLACE")
+        test_table.store(1, 5, 10, "EXACT")
+        self.assertEqual(True, test_table.store(2, 2, 20, "UPPER_BOUND"))
+        self.assertEqual((2, 20, "UPPER_BOUND", None), test_table.probe(2))
+
+    def test_clear(self):
+        test_table = TranspositionTable(memory_budget=100000)
+        test_table.store(1, 5, 10, "EXACT")
+        test_table.probe(1)
+        test_table.clear()
+        self.assertEqual(None, test_table.probe(1))
+        self.assertEqual(0, len(test_table))
+        self.assertEqual(0, test_table.get_statistics()["hits"])
+
+
+if __name__ == '__main__':
+    unittest.main()